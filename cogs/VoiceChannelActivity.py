@@ -1,26 +1,32 @@
 # import.standard
 import os
-from datetime import datetime
-from typing import Any, Dict, List, Optional, Tuple, Union
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 # import.thirdparty
 import discord
-from discord.ext import commands, tasks
+import pytz
+from discord.ext import commands
 from pytz import timezone
 
 # import.local
 from extra import utils
-from extra.menu import PaginatorView
+from extra.menu import PaginatorView, QueryPaginatorView
 from extra.tool.voice_channel_history import (VoiceChannelHistorySystem,
                                               VoiceChannelHistoryTable)
+from extra.tool.voice_presence import VoicePresenceSystem, VoicePresenceTable
 from mysqldb import DatabaseCore
 
 # variables.role
 allowed_roles = [int(os.getenv('OWNER_ROLE_ID', 123)), int(os.getenv('ADMIN_ROLE_ID', 123)), int(os.getenv('MOD_ROLE_ID', 123))]
 analyst_debugger_role_id: int = int(os.getenv('ANALYST_DEBUGGER_ROLE_ID', 123))
 
+# variables.voicechannel
+presence_page_size = 50
+
 tool_cogs: List[commands.Cog] = [
-    VoiceChannelHistoryTable, VoiceChannelHistorySystem
+    VoiceChannelHistoryTable, VoiceChannelHistorySystem,
+    VoicePresenceTable, VoicePresenceSystem
 ]
 
 class VoiceChannelActivity(*tool_cogs):
@@ -29,6 +35,9 @@ class VoiceChannelActivity(*tool_cogs):
     def __init__(self, client) -> None:
         """ Cog's initializing method. """
 
+        for tool_cog in tool_cogs:
+            tool_cog.__init__(self, client)
+
         self.client = client
         self.server_id = int(os.getenv('SERVER_ID', 123))
         self.db = DatabaseCore()
@@ -37,262 +46,47 @@ class VoiceChannelActivity(*tool_cogs):
     async def on_ready(self) -> None:
         """ Tells when the cog is ready to use. """
 
-        self.calculate.start()
-        self.check_old_record_deletion_time.start()
-        self.check_exceeding_voice_channels_from_history.start()
+        if guild := self.client.get_guild(self.server_id):
+            await self.rebuild_voice_presences(guild)
+        if not self.delete_old_voice_presences_loop.is_running():
+            self.delete_old_voice_presences_loop.start()
 
         print('[.cogs] VoiceChannelActivity cog is ready!')
 
-    @commands.Cog.listener()
-    async def on_voice_state_update(self, member, before, after):
-        """ Registers a member whenever they join a channel. """
-
-        # === Checks whether the user just changed their state being in the same VC. ===
-        if before.self_mute != after.self_mute:
-            return
-        if before.self_deaf != after.self_deaf:
-            return
-        if before.self_stream != after.self_stream:
-            return
-        if before.self_video != after.self_video:
-            return
-
-        if before.mute != after.mute:
-            return
-        if before.deaf != after.deaf:
-            return
-
-        if channel := after.channel:
-
-            tzone = timezone('Europe/Berlin')
-            date_and_time = datetime.now().astimezone(tzone)
-            the_time = date_and_time.strftime('%H:%M')
-
-            await self.insert_row(the_time, channel.id, channel.name, member.id, member.name)
-
-    @tasks.loop(seconds=60)
-    async def calculate(self) -> None:
-        """ Calculates all members that are in a voice channel. """
-        tzone = timezone('Europe/Berlin')
-        date_and_time = datetime.now().astimezone(tzone)
-        the_time = date_and_time.strftime('%H:%M')
-
-        print(f'Calculate VC at {the_time}')
-        guild = self.client.get_guild(self.server_id)
-        channels = [c for c in guild.voice_channels]
-
-        all_channel_members = []
-
-        for channel in channels:
-            if channel.members:
-                channel_members = [(the_time, channel.id, channel.name, m.id, m.name) for m in channel.members]
-                all_channel_members.append(channel_members)
-
-        all_channel_members = [m for c in all_channel_members for m in c]
-        if all_channel_members:
-            await self.insert_first_row(all_channel_members)
-
-    @commands.command(hidden=True)
-    @commands.has_permissions(administrator=True)
-    async def create_table_voice_channel_activity(self, ctx):
-        """ Creates the VoiceChannelActivity table. """
-
-        if await self.table_voice_channel_activity_exists():
-            return await ctx.send("**The __VoiceChannelActivity__ already exists!**")
-
-        await self.db.execute_query("""
-            CREATE TABLE VoiceChannelActivity (
-                the_time TIME NOT NULL, channel_id BIGINT NOT NULL,
-                channel_name VARCHAR(50) NOT NULL, member_id BIGINT NOT NULL,
-                member_name VARCHAR(50) NOT NULL) DEFAULT CHARSET utf8mb4
-        """)
-        await ctx.send("**Table __VoiceChannelActivity__ created!**")
-
-    @commands.command(hidden=True)
-    @commands.has_permissions(administrator=True)
-    async def drop_table_voice_channel_activity(self, ctx):
-        """ Drops the VoiceChannelActivity table. """
-
-        if not await self.table_voice_channel_activity_exists():
-            return await ctx.send("**The __VoiceChannelActivity__ doesn't exist!**")
-
-        await self.db.execute_query("DROP TABLE VoiceChannelActivity")
-        await ctx.send("**Table __VoiceChannelActivity__ dropped!**")
-
-    @commands.command(hidden=True)
-    @commands.has_permissions(administrator=True)
-    async def reset_table_voice_channel_activity(self, ctx):
-        """ Resets the VoiceChannelActivity table. """
-
-        if not await self.table_voice_channel_activity_exists():
-            return await ctx.send("**The __VoiceChannelActivity__ doesn't exist yet!**")
-
-        await self.db.execute_query("DELETE FROM VoiceChannelActivity")
-        await ctx.send("**Table __VoiceChannelActivity__ reset!**")
-
-    async def insert_first_row(self, channel_members: List[Tuple[Union[int, str]]]) -> None:
-        """ Inserts the first row of the minute with the info of all users who are in voice channels.
-        :param channel_members: A list of tuples containing the individual members and their info. """
-
-        await self.db.execute_query("""
-            INSERT INTO VoiceChannelActivity (the_time, channel_id, channel_name, member_id, member_name)
-            VALUES (%s, %s, %s, %s, %s)""", channel_members, execute_many=True)
-
-    async def insert_row(self, the_time: datetime, channel_id: int, channel_name: str, member_id: int, member_name: str) -> None:
-        """ Inserts a row containing info of member and the voice channel that they're currently in.
-        :param the_time: The current time.
-        :param: channel_id: The ID channel that the member is in.
-        :param channel_name: The name of the channel that the member is in.
-        :param member_id: The ID of the member.
-        :param member_name: The name of the member. """
-
-        await self.db.execute_query("""
-            INSERT INTO VoiceChannelActivity (the_time, channel_id, channel_name, member_id, member_name)
-            VALUES (%s, %s, %s, %s, %s)""", (the_time, channel_id, channel_name, member_id, member_name))
-
-    @tasks.loop(seconds=60)
-    async def check_old_record_deletion_time(self, limit_hours: int = 6) -> None:
-        """ Checks whether it's time to delete old records.
-        :param limit_hours: The limit of hours that the DB needs to store,
-        PS: If the number of registered hours in the DB is exceeded, the oldest records will be deleted,
-        so the limit is satisfied again. """
-
-        hours = await self.db.execute_query("SELECT DISTINCT HOUR(the_time) FROM VoiceChannelActivity", fetch="all")
-        hours = [h[0] for h in hours]
-
-        if limit_hours < len(hours):
-            await self.db.execute_query("DELETE FROM VoiceChannelActivity WHERE HOUR(the_time) = %s", (hours.pop(0),))
-
-    async def get_hour_record_by_channel(self, channel: discord.TextChannel, time: str, time2: str = None) -> List[List[Union[datetime, str, int]]]:
-        """ Gets all user records at a given hour and channel.
-        :param channel_id: The ID of the channel to which you are filtering.
-        :param time: The time to which you are filtering the search. """
-
-        records = []
-        text = ""
-
-        if len(time) < 3:
-            time = datetime.strptime(time, '%H')
-
-            # Checks whether user provided two values
-            if time2:
-                time2 = datetime.strptime(time2, '%H')
-                records = await self.db.execute_query("""
-                    SELECT DISTINCT HOUR(the_time), member_name, member_id
-                    FROM VoiceChannelActivity WHERE channel_id = %s AND HOUR(the_time) BETWEEN %s AND %s""",
-                    (channel.id, time.hour, time2.hour), fetch="all")
-
-                text = f"Users who joined `{channel}` between `{time.hour}:00` and `{time2.hour}:59`:"
-            else:
-                records = await self.db.execute_query("""
-                    SELECT DISTINCT HOUR(the_time), member_name, member_id
-                    FROM VoiceChannelActivity WHERE channel_id = %s AND HOUR(the_time) = %s""",
-                    (channel.id, time.hour), fetch="all")
-
-                text = f"Users who joined `{channel}` between `{time.hour}:00` and `{time.hour}:59`:"
-
-        else:
-            time = datetime.strptime(time, '%H:%M')
-
-            # Checks whether two values were passed
-            if time2:
-                time2 = datetime.strptime(time2, '%H:%M')
-                the_time1 = f"{time.hour}:{time.minute}"
-                the_time2 = f"{time2.hour}:{time2.minute}"
-
-                text = f"Users who joined `{channel}` between `{the_time1}` and `{the_time2}`:"
-
-                records = await self.db.execute_query("""
-                    SELECT DISTINCT the_time, member_name, member_id
-                    FROM VoiceChannelActivity WHERE channel_id = %s AND the_time BETWEEN %s AND %s""",
-                    (channel.id, the_time1, the_time2), fetch="all")
-
-            # If not, assumes the second value
-            else:
-                if time.minute >= 0 and time.minute <= 29:
-                    the_time1 = f"{time.hour}:00"
-                    the_time2 = f"{time.hour}:29"
-                else:
-                    the_time1 = f"{time.hour}:30"
-                    the_time2 = f"{time.hour}:59"
-
-                text = f"Users who joined `{channel}` between `{the_time1}` and `{the_time2}`:"
-                records = await self.db.execute_query("""
-                    SELECT DISTINCT the_time, member_name, member_id
-                    FROM VoiceChannelActivity WHERE channel_id = %s AND the_time BETWEEN %s AND %s""",
-                    (channel.id, the_time1, the_time2), fetch="all")
-
-        return records, time, text
+    async def get_time_window(self, time: str, time2: str = None) -> Tuple[datetime, datetime, str, str]:
+        """ Gets the time window of the last occurrence of the given Europe/Berlin times, in UTC.
+        :param time: The time, in the format HOUR or HOUR:MINUTE.
+        :param time2: The end time, in the same format. [Optional]
+        :returns: The start and end of the window, and their labels. """
 
-    async def get_user_record_by_time(self, member: discord.Member, time: str, time2: str = None) -> List[Union[int, str]]:
-        """ Gets user records by the given hour.
-        :param member: The member from whom you want to fetch information.
-        :param time: The time at around the user that you are looking for has to have information. """
-
-        records = []
-        text = ""
+        tzone = timezone('Europe/Berlin')
+        now = datetime.now(tzone)
 
-        # If in format (HOUR)
         if len(time) < 3:
+            # HOUR [HOUR]: from the start of the first hour to the end of the last one
             time = datetime.strptime(time, '%H')
-            # Checks whether user provided two values
-            if time2:
-                time2 = datetime.strptime(time2, '%H')
-                records = await self.db.execute_query("""
-                    SELECT DISTINCT HOUR(the_time), channel_id, channel_name,  member_id
-                    FROM VoiceChannelActivity WHERE HOUR(the_time) BETWEEN %s AND %s AND member_id = %s""",
-                    (time.hour, time2.hour, member.id), fetch="all")
-
-                text = f"User between `{time.hour}` and `{time2.hour}` was in:"
-
-            # If not, gets all values from that hour.
-            else:
-                records = await self.db.execute_query("""
-                    SELECT DISTINCT HOUR(the_time), channel_id, channel_name,  member_id
-                    FROM VoiceChannelActivity WHERE HOUR(the_time) = %s AND member_id = %s""",
-                    (time.hour, member.id), fetch="all")
-
-                text = f"User between `{time.hour}` and `{time.hour}` was in:"
-
+            time2 = datetime.strptime(time2, '%H') if time2 else time
+            label1, label2 = f"{time.hour}:00", f"{time2.hour}:59"
+            length = timedelta(hours=(time2.hour - time.hour) % 24, minutes=59, seconds=59)
         else:
-            # If in format (HOUR:MINUTE)
             time = datetime.strptime(time, '%H:%M')
-
-            # Checks whether user provided two values
             if time2:
                 time2 = datetime.strptime(time2, '%H:%M')
-                the_time1 = f"{time.hour}:{time.minute}"
-                the_time2 = f"{time2.hour}:{time2.minute}"
-
-                records = await self.db.execute_query("""
-                    SELECT DISTINCT the_time, channel_id, channel_name, member_id
-                    FROM VoiceChannelActivity
-                    WHERE the_time BETWEEN %s AND %s AND member_id = %s""",
-                    (the_time1, the_time2, member.id), fetch="all")
-
-                text = f"{member} between `{the_time1}` and `{the_time2}` was in:"
-
-            # If not, gets values from either (HOUR:00 - HOUR:29) or (HOUR:30 - HOUR:59)
             else:
-                # If it's between HOUR:00 and HOUR:29
-                if time.minute >= 0 and time.minute <= 29:
-                    the_time1 = f"{time.hour}:00"
-                    the_time2 = f"{time.hour}:29"
-                    text = f"{member} between `{the_time1}` and `{the_time2}` was in:"
+                # Assumes either (HOUR:00 - HOUR:29) or (HOUR:30 - HOUR:59)
+                time = time.replace(minute=0 if time.minute <= 29 else 30)
+                time2 = time.replace(minute=time.minute + 29)
 
-                # If it's between HOUR:30 and HOUR:30
-                else:
-                    the_time1 = f"{time.hour}:30"
-                    the_time2 = f"{time.hour}:59"
-                    text = f"{member} between `{the_time1}` and `{the_time2}` was in:"
+            label1, label2 = f"{time.hour}:{time.minute:02d}", f"{time2.hour}:{time2.minute:02d}"
+            minutes = ((time2.hour * 60 + time2.minute) - (time.hour * 60 + time.minute)) % 1440
+            length = timedelta(minutes=minutes, seconds=59)
 
-                records = await self.db.execute_query("""
-                    SELECT DISTINCT the_time, channel_id, channel_name, member_id
-                    FROM VoiceChannelActivity
-                    WHERE the_time BETWEEN %s AND %s AND member_id = %s""",
-                    (the_time1, the_time2, member.id), fetch="all")
+        start = tzone.localize(datetime.combine(now.date(), time.time()))
+        if start > now:
+            start -= timedelta(days=1)
 
-        return records, time, text
+        start = start.astimezone(pytz.utc).replace(tzinfo=None)
+        return start, start + length, label1, label2
 
     async def format_time(self, time: str) -> str:
         """ Formats the time if needed.
@@ -320,18 +114,23 @@ class VoiceChannelActivity(*tool_cogs):
         time = await self.format_time(time)
         time2 = await self.format_time(time2) if time2 else None
 
-        records, ftime, text = await self.get_hour_record_by_channel(channel, time, time2)
-        if not records:
+        start, end, label1, label2 = await self.get_time_window(time, time2)
+        text = f"Users who joined `{channel}` between `{label1}` and `{label2}`:"
+
+        total = await self.count_channel_presences(channel.id, start, end)
+        if not total:
             return await ctx.send("**Nothing found for the given channel and/or time!**")
 
-        users = set([m.mention if (m := discord.utils.get(ctx.guild.members, id=member[2])) else member[1] for member in records])
+        async def fetch_page(limit: int, offset: int) -> List[Tuple[int, str]]:
+            return await self.get_channel_presences(channel.id, start, end, limit, offset)
 
-        embed = discord.Embed(
-            title=text,
-            description=f"{', '.join(users)}"
-            )
+        async def make_embed(records: List[Tuple[int, str]], page: int, pages: int) -> discord.Embed:
+            users = [m.mention if (m := ctx.guild.get_member(member[0])) else str(member[1] or member[0]) for member in records]
+            embed = discord.Embed(title=text, description=', '.join(users))
+            embed.set_footer(text=f"{total} members | Page {page}/{pages}")
+            return embed
 
-        await ctx.send(embed=embed)
+        await self.send_presence_pages(ctx, fetch_page, make_embed, total)
 
     @commands.command(aliases=['wherejoined', 'joined_where', 'wj2', 'where', 'onde'])
     @commands.has_any_role(*allowed_roles)
@@ -349,19 +148,37 @@ class VoiceChannelActivity(*tool_cogs):
         time = await self.format_time(time)
         time2 = await self.format_time(time2) if time2 else None
 
-        records, ftime, text = await self.get_user_record_by_time(member, time, time2)
+        start, end, label1, label2 = await self.get_time_window(time, time2)
+        text = f"{member} between `{label1}` and `{label2}` was in:"
 
-        if not records:
+        total = await self.count_member_presences(member.id, start, end)
+        if not total:
             return await ctx.send("**Nothing found for the given time and/or member!**")
 
-        channels = set([c.mention if (c := discord.utils.get(ctx.guild.channels, id=channel[1])) else channel[2] for channel in records])
+        async def fetch_page(limit: int, offset: int) -> List[Tuple[int, str]]:
+            return await self.get_member_presences(member.id, start, end, limit, offset)
 
-        embed = discord.Embed(
-            title=text,
-            description=f"{', '.join(channels)}"
-            )
+        async def make_embed(records: List[Tuple[int, str]], page: int, pages: int) -> discord.Embed:
+            channels = [c.mention if (c := ctx.guild.get_channel(channel[0])) else str(channel[1] or channel[0]) for channel in records]
+            embed = discord.Embed(title=text, description=', '.join(channels))
+            embed.set_footer(text=f"{total} channels | Page {page}/{pages}")
+            return embed
+
+        await self.send_presence_pages(ctx, fetch_page, make_embed, total)
+
+    async def send_presence_pages(self, ctx: commands.Context, fetch_page: Callable, make_embed: Callable, total: int) -> None:
+        """ Sends the first page of a presence lookup, with buttons to flip through the others if there are more.
+        :param ctx: The context of the command.
+        :param fetch_page: Coroutine function that fetches a page of records, given a limit and an offset.
+        :param make_embed: Coroutine function that makes the embed of a page.
+        :param total: The total amount of records. """
+
+        view = QueryPaginatorView(fetch_page, total, presence_page_size, make_embed)
+        embed = await view.make_embed()
+        if view.pages == 1:
+            return await ctx.send(embed=embed)
 
-        await ctx.send(embed=embed)
+        await ctx.send(embed=embed, view=view)
 
     @commands.command(aliases=['vh'])
     @utils.is_allowed([*allowed_roles, analyst_debugger_role_id], throw_exc=True)
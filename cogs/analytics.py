@@ -13,6 +13,7 @@ from PIL import Image, ImageDraw, ImageFont
 # import.local
 from extra import utils
 from extra.analytics import DataBumpsTable, SlothAnalyticsTable
+from extra.message_pipeline import MessageContext, message_handler
 from mysqldb import DatabaseCore
 
 # variables.textchannel
@@ -174,11 +175,11 @@ class Analytics(*analytics_cogs):
 
         await channel.send(embed=embed)
 
-    @commands.Cog.listener()
-    async def on_message(self, message) -> None:
+    @message_handler(priority=0, sequential=True)
+    async def on_message(self, message: discord.Message, context: MessageContext) -> None:
         """ Updates the messages counter. """
 
-        if not message.guild:
+        if not context.guild:
             return
 
         await self.update_messages()
@@ -7,6 +7,7 @@ from discord.ext import commands
 
 # import.local
 from extra.misc.curse import CurseTable
+from extra.voice_events import VoiceEvent, VoiceTransition, voice_handler
 from mysqldb import DatabaseCore
 
 # variables.id 
@@ -27,8 +28,8 @@ class CurseMember(CurseTable):
 
         print('[.cogs] CurseMember cog is ready!')
 
-    @commands.Cog.listener()
-    async def on_voice_state_update(self, member, before, after) -> None:
+    @voice_handler(VoiceTransition.JOIN, VoiceTransition.SWITCH, VoiceTransition.LEAVE, priority=90)
+    async def on_voice_state_update(self, member, before, after, event: VoiceEvent) -> None:
         """ Event for checking whether the user who joined any voice channel
         is the cursed member, if so, the bot joins the voice channel and plays
         an earrape song. """
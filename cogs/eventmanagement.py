@@ -10,6 +10,7 @@ from discord.ext import commands, tasks
 from extra import utils
 from extra.menu import ConfirmSkill
 from extra.smartroom.event_rooms import EventRoomsTable
+from extra.voice_events import VoiceEvent, VoiceTransition, voice_handler
 from mysqldb import DatabaseCore
 
 # variables.id
@@ -86,29 +87,19 @@ class EventManagement(EventRoomsTable):
             except:
                 await bots_and_commands_channel.send(f"{msg}. {member.mention}")
 
-    @commands.Cog.listener()
-    async def on_voice_state_update(self, member: discord.Member, before: discord.VoiceState, after: discord.VoiceState):
+    @voice_handler(
+        VoiceTransition.JOIN, VoiceTransition.SWITCH, VoiceTransition.LEAVE,
+        VoiceTransition.VIDEO_START, VoiceTransition.VIDEO_END, priority=80)
+    async def on_voice_state_update(self, member: discord.Member, before: discord.VoiceState, after: discord.VoiceState, event: VoiceEvent):
         """ Checks whether people have open cameras in the voice channel. """
 
         if member.bot:
             return
 
-        # Check voice states
-        if before and before.mute != after.mute:
-            return
-        if before and before.deaf != before.deaf:
-            return
-        if before and before.self_mute != after.self_mute:
-            return
-        if before and before.self_deaf != after.self_deaf:
-            return
-        if before and before.self_stream != after.self_stream:
-            return
-
         # Get before/after channels and their categories
         ac = after.channel
 
-        current_ts = await utils.get_timestamp()
+        current_ts = event.timestamp
 
         # Joining the Video Calls channel
         if ac and ac.id in self.productivity_club_vcs_ids:
@@ -1,12 +1,13 @@
 # import.standard
+import asyncio
 import os
-from typing import List, Optional, Union
+from typing import Dict, List, Optional, Union
 
 # import.thirdparty
 import discord
 from discord import (ApplicationContext, Option, SlashCommandGroup, option,
                      slash_command)
-from discord.ext import commands, tasks
+from discord.ext import commands
 
 # import.local
 from extra import utils
@@ -22,6 +23,9 @@ guild_ids: List[int] = [server_id]
 giveaway_manager_role_id: int = int(os.getenv('GIVEAWAY_MANAGER_ROLE_ID', 123))
 mod_role_id = int(os.getenv('MOD_ROLE_ID', 123))
 allowed_roles: List[int] = [giveaway_manager_role_id, mod_role_id, int(os.getenv('ADMIN_ROLE_ID'))]
+# giveaway.variables #
+giveaway_finalize_concurrency: int = int(os.getenv('GIVEAWAY_FINALIZE_CONCURRENCY', 4))
+giveaway_finalize_retry_seconds: int = int(os.getenv('GIVEAWAY_FINALIZE_RETRY_SECONDS', 60))
 
 giveaway_cogs: List[commands.Cog] = [GiveawaysTable, GiveawayEntriesTable]
 
@@ -31,6 +35,8 @@ class Giveaways(*giveaway_cogs):
     def __init__(self, client) -> None:
         self.client = client
         self.db = DatabaseCore()
+        self.finalize_semaphore: Optional[asyncio.Semaphore] = None
+        self.channel_locks: Dict[int, asyncio.Lock] = {}
 
     _giveaway = SlashCommandGroup("giveaway", "Various greeting from cogs!", guild_ids=guild_ids)
 
@@ -46,65 +52,69 @@ class Giveaways(*giveaway_cogs):
             except:
                 pass
 
-        self.check_old_giveaways.start() # Deletes old giveaways
-        self.check_due_giveaways.start() # Checks due giveaways
-        print('[.cogs] Giveaways cog is ready!')
+            self.schedule_giveaway(giveaway[0], giveaway[4], giveaway[5])
 
+        print('[.cogs] Giveaways cog is ready!')
 
-    @tasks.loop(minutes=1)
-    async def check_due_giveaways(self) -> None:
-        """ Checks due giveaways and ends them. """
+    async def end_due_giveaway(self, message_id: int) -> None:
+        """ Ends a giveaway that reached its deadline. Giveaways are finalized a few at a time and
+        one at a time per channel, since they share its rate limits, so a slow one doesn't hold up the others.
+        :param message_id: The ID of the message of the giveaway. """
 
+        giveaway = await self.get_giveaway(message_id)
+        if not giveaway or giveaway[5]:
+            return
 
-        current_ts = await utils.get_timestamp()
-        giveaways = await self.get_due_giveaways(current_ts)
-        for giveaway in giveaways:
+        if not self.finalize_semaphore:
+            self.finalize_semaphore = asyncio.Semaphore(giveaway_finalize_concurrency)
+        if giveaway[1] not in self.channel_locks:
+            self.channel_locks[giveaway[1]] = asyncio.Lock()
 
-            if giveaway[5]:
-               continue 
+        async with self.channel_locks[giveaway[1]], self.finalize_semaphore:
+            # It may have been force-ended while waiting for its turn
+            giveaway = await self.get_giveaway(message_id)
+            if not giveaway or giveaway[5]:
+                return
 
-            # Gets the channel and message
-            channel = message = None
             try:
-                channel = await self.client.fetch_channel(giveaway[1])
-            except (discord.NotFound, discord.errors.Forbidden):
-                await self.delete_giveaway(giveaway[0])
-                continue
-            
-            try:
-                message = await channel.fetch_message(giveaway[0])
-            except (discord.NotFound, discord.errors.Forbidden):
-                await self.delete_giveaway(giveaway[0])
-                continue
-
-            entries = await self.get_giveaway_entries(giveaway[0])
-
-            winners = await self.get_winners(giveaway, entries)
-
-            # Edits the embed
-            embed = message.embeds[0]
-            embed.title = f"{embed.title[:248]} (Ended)"
-            embed.color = discord.Color.red()
-
-            view = discord.ui.View.from_message(message)
-
-            await utils.disable_buttons(view)
-            await message.edit(embed=embed, view=view)
-            # Sends last message
-            await message.reply(
-                f"**Giveaway is over, we had a total of `{len(entries)}` people participating, and the `{giveaway[3]}` winners are: {winners[:900]}!**"
-            )
-            # Notifies the giveaway's termination
-            await self.update_giveaway(giveaway[0])
-
-    @tasks.loop(minutes=1)
-    async def check_old_giveaways(self) -> None:
-        """ Looks for old giveaways and deletes them.
-        
-        PS: It looks for giveaways that ended at least 2 days ago. """
-
-        current_ts: int = await utils.get_timestamp()
-        await self.delete_old_giveaways(current_ts)
+                await self.finalize_giveaway(giveaway)
+            except Exception as e:
+                print(f"Error at finalizing giveaway {giveaway[0]}: {e}")
+                # Tries again later, as the polling used to
+                current_ts = await utils.get_timestamp()
+                self.schedule_giveaway(giveaway[0], current_ts + giveaway_finalize_retry_seconds)
+
+    async def finalize_giveaway(self, giveaway: List[Union[str, int]]) -> None:
+        """ Draws the winners of a giveaway and announces them.
+        :param giveaway: The giveaway to finalize. """
+
+        # Gets the channel and message
+        try:
+            channel = self.client.get_channel(giveaway[1]) or await utils.retry_on_rate_limit(self.client.fetch_channel, giveaway[1])
+            message = await utils.retry_on_rate_limit(channel.fetch_message, giveaway[0])
+        except (discord.NotFound, discord.errors.Forbidden):
+            return await self.delete_giveaway(giveaway[0])
+
+        entries = await self.count_giveaway_entries(giveaway[0])
+        winners = await self.get_winners(giveaway)
+
+        # Edits the embed
+        embed = message.embeds[0]
+        embed.title = f"{embed.title[:248]} (Ended)"
+        embed.color = discord.Color.red()
+
+        view = discord.ui.View.from_message(message)
+
+        await utils.disable_buttons(view)
+        await utils.retry_on_rate_limit(message.edit, embed=embed, view=view)
+        # Notifies the giveaway's termination before announcing it, so a failed announcement isn't drawn again
+        await self.update_giveaway(giveaway[0])
+        self.schedule_giveaway(giveaway[0], giveaway[4], notified=1)
+        # Sends last message
+        await utils.retry_on_rate_limit(
+            message.reply,
+            f"**Giveaway is over, we had a total of `{entries}` people participating, and the `{giveaway[3]}` winners are: {winners[:900]}!**"
+        )
 
     async def _giveaway_start_callback(
         self, ctx, host: discord.Member, title: str, description: str, prize: str, winners: int = 1, days: int = 0, 
@@ -238,13 +248,13 @@ class Giveaways(*giveaway_cogs):
         if not giveaway[5]:
             return await ctx.respond(f"**This giveaway hasn't ended yet, you can't reroll it, {member.mention}!**", ephemeral=True)
 
-        entries = await self.get_giveaway_entries(giveaway[0])
+        entries = await self.count_giveaway_entries(giveaway[0])
 
-        winners = await self.get_winners(giveaway, entries)
+        winners = await self.get_winners(giveaway)
 
         # Sends last message
         await ctx.respond(
-            f"**Rerolling giveaway with `{len(entries)}` people participating, and the new `{giveaway[3]}` winners are: {winners}!**"
+            f"**Rerolling giveaway with `{entries}` people participating, and the new `{giveaway[3]}` winners are: {winners}!**"
         )
 
     async def _giveaway_delete_callback(self, ctx, message_id: int) -> None:
@@ -321,8 +331,8 @@ class Giveaways(*giveaway_cogs):
             return await ctx.respond(f"**Message of the given giveaway doesn't exist anymore, {member.mention}!**", ephemeral=True)
 
         try:
-            entries = await self.get_giveaway_entries(giveaway[0])
-            winners = await self.get_winners(giveaway, entries)
+            entries = await self.count_giveaway_entries(giveaway[0])
+            winners = await self.get_winners(giveaway)
 
             # Edits the embed
             embed = message.embeds[0]
@@ -335,12 +345,13 @@ class Giveaways(*giveaway_cogs):
             await message.edit(embed=embed, view=view)
             # Sends last message
             await message.reply(
-                f"**Giveaway is over, we had a total of `{len(entries)}` people participating, and the `{giveaway[3]}` winners are: {winners}!**"
+                f"**Giveaway is over, we had a total of `{entries}` people participating, and the `{giveaway[3]}` winners are: {winners}!**"
             )
             # Notifies the giveaway's termination
             await self.update_giveaway(giveaway[0])
             current_ts: int = await utils.get_timestamp()
             await self.update_giveaway_deadline(giveaway[0], current_ts)
+            self.schedule_giveaway(giveaway[0], current_ts, notified=1)
         except Exception as e:
             print('Error at force-ending giveaway: ', e)
             await ctx.respond(f"**Something went wrong with it, please contact an admin, {member.mention}!**", ephemeral=True)
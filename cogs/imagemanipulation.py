@@ -1,17 +1,20 @@
 # import.standard
+import asyncio
 import math
 import os
+from functools import partial
 from io import BytesIO
 from random import choice
-from typing import Any, List, Optional, Union
+from typing import Any, List, Optional
 
 # import.thirdparty
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from PIL import Image, ImageDraw, ImageFont, ImageOps
 
 # import.local
-from extra import utils
+from extra import image_filters, utils
+from extra.image_workspace import image_workspaces
 
 class ImageManipulation(commands.Cog):
     """ Categories for image manipulations and visualization. """
@@ -20,16 +23,24 @@ class ImageManipulation(commands.Cog):
         """ Class' init method. """
 
         self.client = client
-        self.cached_image: Union[
-            discord.Member.display_avatar, discord.User.display_avatar,
-            discord.Guild.banner] = None
+        # user ID -> the image or asset their next edit applies to
+        self.workspaces = image_workspaces
 
     @commands.Cog.listener()
     async def on_ready(self) -> None:
         """ Tells when the cog is ready to go. """
 
+        if not self.sweep_workspaces.is_running():
+            self.sweep_workspaces.start()
+
         print('[.cogs] ImageManipulation cog is ready!')
 
+    @tasks.loop(seconds=60)
+    async def sweep_workspaces(self) -> None:
+        """ Drops the expired image workspaces. """
+
+        self.workspaces.sweep()
+
     @commands.command(aliases=['av', 'pfp', 'pic', 'picture', 'profile_picture'])
     async def avatar(self, ctx, member: Optional[discord.Member] = None) -> None:
         """ Shows the user avatar picture.
@@ -47,7 +58,7 @@ class ImageManipulation(commands.Cog):
         )
 
         embed.set_image(url=display)
-        self.cached_image = display
+        self.workspaces.set(ctx.author.id, display)
         await ctx.reply(embed=embed)
 
     @commands.command()
@@ -73,14 +84,14 @@ class ImageManipulation(commands.Cog):
         )
 
         embed.set_image(url=banner)
-        self.cached_image = banner
+        self.workspaces.set(ctx.author.id, banner)
         await ctx.send(embed=embed)
 
     @commands.command(aliases=["cache", "cached_image", "ci"])
     async def cached(self, ctx) -> None:
         """ Shows the cached image. """
 
-        file = self.cached_image
+        file = self.workspaces.get(ctx.author.id)
 
         if not file:
             return await ctx.reply(f"**There isn't a cached image, {ctx.author.mention}!**")
@@ -105,15 +116,15 @@ class ImageManipulation(commands.Cog):
         if member:
             file = member.display_avatar
         else:
-            if self.cached_image:
-                file = self.cached_image
+            if cached_image := self.workspaces.get(ctx.author.id):
+                file = cached_image
             else:
                 file = ctx.author.display_avatar
 
 
         image = file if isinstance(file, Image.Image) else Image.open(BytesIO(await file.read()))
         image = ImageOps.flip(image)
-        self.cached_image = image
+        self.workspaces.set(ctx.author.id, image)
         embed = discord.Embed(
             color=int('36393F', 16)
         )
@@ -131,15 +142,15 @@ class ImageManipulation(commands.Cog):
         if member:
             file = member.display_avatar
         else:
-            if self.cached_image:
-                file = self.cached_image
+            if cached_image := self.workspaces.get(ctx.author.id):
+                file = cached_image
             else:
                 file = ctx.author.display_avatar
 
 
         image = file if isinstance(file, Image.Image) else Image.open(BytesIO(await file.read()))
         image = ImageOps.mirror(image)
-        self.cached_image = image
+        self.workspaces.set(ctx.author.id, image)
         embed = discord.Embed(
             color=int('36393F', 16)
         )
@@ -158,15 +169,16 @@ class ImageManipulation(commands.Cog):
         if member:
             file = member.display_avatar
         else:
-            if self.cached_image:
-                file = self.cached_image
+            if cached_image := self.workspaces.get(ctx.author.id):
+                file = cached_image
             else:
                 file = ctx.author.display_avatar
 
         image = file if isinstance(file, Image.Image) else Image.open(BytesIO(await file.read()))
-        image: Image.Image = ImageOps.posterize(image, 2)
+        loop = asyncio.get_event_loop()
+        image: Image.Image = await loop.run_in_executor(None, image_filters.posterize, image, 2)
 
-        self.cached_image = image
+        self.workspaces.set(ctx.author.id, image)
         embed = discord.Embed(
             color=int('36393F', 16)
         )
@@ -203,8 +215,8 @@ class ImageManipulation(commands.Cog):
         if member:
             file = member.display_avatar
         else:
-            if self.cached_image:
-                file = self.cached_image
+            if cached_image := self.workspaces.get(ctx.author.id):
+                file = cached_image
             else:
                 file = ctx.author.display_avatar
 
@@ -215,7 +227,7 @@ class ImageManipulation(commands.Cog):
             scale = choice([90, 180, 50, 45, 270, 120, 80])
 
         image = image.rotate(int(scale))
-        self.cached_image = image
+        self.workspaces.set(ctx.author.id, image)
         embed = discord.Embed(
             color=int('36393F', 16)
         )
@@ -234,12 +246,12 @@ class ImageManipulation(commands.Cog):
         if member:
             file = member.display_avatar
         else:
-            if self.cached_image:
-                file = self.cached_image
+            if cached_image := self.workspaces.get(ctx.author.id):
+                file = cached_image
             else:
                 file = ctx.author.display_avatar
         image: Image.Image = await self.change_image_brightness(file=file, action='lighten', percentage=percentage)
-        self.cached_image = image
+        self.workspaces.set(ctx.author.id, image)
         embed = discord.Embed(
             color=int('36393F', 16)
         )
@@ -259,12 +271,12 @@ class ImageManipulation(commands.Cog):
         if member:
             file = member.display_avatar
         else:
-            if self.cached_image:
-                file = self.cached_image
+            if cached_image := self.workspaces.get(ctx.author.id):
+                file = cached_image
             else:
                 file = ctx.author.display_avatar
         image: Image.Image = await self.change_image_brightness(file=file, action='darken', percentage=percentage)
-        self.cached_image = image
+        self.workspaces.set(ctx.author.id, image)
         embed = discord.Embed(
             color=int('36393F', 16)
         )
@@ -283,8 +295,8 @@ class ImageManipulation(commands.Cog):
         return imgByteArr
 
     async def change_image_brightness(self, file: Any, action: str, percentage: int,
-        r: bool = True, g: bool = True, b: bool = True) -> None:
-        """ Changes the brightness level of each pixel of the image.
+        r: bool = True, g: bool = True, b: bool = True) -> Image.Image:
+        """ Changes the brightness level of each pixel of the image, in an executor.
         :param file: The file to execute the task on.
         :param action: Whether to lighten or darken the image.
         :param percentage: The percentage to ligthen or darken the image. """
@@ -293,11 +305,6 @@ class ImageManipulation(commands.Cog):
             original_image = Image.open(BytesIO(await file.read()))
         else:
             original_image = file
-        pixels = original_image.getdata()
-
-        #initialise the new image
-        new_image = Image.new('RGB', original_image.size)
-        new_image_list = []
 
         brightness_multiplier = 1.0
 
@@ -306,31 +313,9 @@ class ImageManipulation(commands.Cog):
         else:
             brightness_multiplier -= (percentage/100)
 
-
-        # Fixes non tuple pixel sets
-        if isinstance(pixels[0], int):
-            pixels = [(px, px, px, px) for px in pixels]
-
-        #for each pixel, append the brightened or darkened version to the new image list
-        for pixel in pixels:
-            new_pixel = (
-                int(pixel[0] * brightness_multiplier) if r else int(pixel[0]),
-                int(pixel[1] * brightness_multiplier) if g else int(pixel[1]),
-                int(pixel[2] * brightness_multiplier) if b else int(pixel[2])
-            )
-
-            #check the new pixel values are within rgb range
-            for pixel in new_pixel:
-                if pixel > 255:
-                    pixel = 255
-                elif pixel < 0:
-                    pixel = 0
-
-            new_image_list.append(new_pixel)
-
-        #save the new image
-        new_image.putdata(new_image_list)
-        return new_image
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            None, partial(image_filters.change_brightness, original_image, brightness_multiplier, r=r, g=g, b=b))
 
     @commands.command()
     @commands.cooldown(1, 5, commands.BucketType.user)
@@ -343,12 +328,12 @@ class ImageManipulation(commands.Cog):
         if member:
             file = member.display_avatar
         else:
-            if self.cached_image:
-                file = self.cached_image
+            if cached_image := self.workspaces.get(ctx.author.id):
+                file = cached_image
             else:
                 file = ctx.author.display_avatar
         image: Image.Image = await self.change_image_brightness(file=file, action='lighten', percentage=percentage, b=False, g=False)
-        self.cached_image = image
+        self.workspaces.set(ctx.author.id, image)
         embed = discord.Embed(
             color=int('36393F', 16)
         )
@@ -368,12 +353,12 @@ class ImageManipulation(commands.Cog):
         if member:
             file = member.display_avatar
         else:
-            if self.cached_image:
-                file = self.cached_image
+            if cached_image := self.workspaces.get(ctx.author.id):
+                file = cached_image
             else:
                 file = ctx.author.display_avatar
         image: Image.Image = await self.change_image_brightness(file=file, action='lighten', percentage=percentage, r=False, g=False)
-        self.cached_image = image
+        self.workspaces.set(ctx.author.id, image)
         embed = discord.Embed(
             color=int('36393F', 16)
         )
@@ -393,12 +378,12 @@ class ImageManipulation(commands.Cog):
         if member:
             file = member.display_avatar
         else:
-            if self.cached_image:
-                file = self.cached_image
+            if cached_image := self.workspaces.get(ctx.author.id):
+                file = cached_image
             else:
                 file = ctx.author.display_avatar
         image: Image.Image = await self.change_image_brightness(file=file, action='lighten', percentage=percentage, b=False)
-        self.cached_image = image
+        self.workspaces.set(ctx.author.id, image)
         embed = discord.Embed(
             color=int('36393F', 16)
         )
@@ -418,12 +403,12 @@ class ImageManipulation(commands.Cog):
         if member:
             file = member.display_avatar
         else:
-            if self.cached_image:
-                file = self.cached_image
+            if cached_image := self.workspaces.get(ctx.author.id):
+                file = cached_image
             else:
                 file = ctx.author.display_avatar
         image: Image.Image = await self.change_image_brightness(file=file, action='lighten', percentage=percentage, r=False)
-        self.cached_image = image
+        self.workspaces.set(ctx.author.id, image)
         embed = discord.Embed(
             color=int('36393F', 16)
         )
@@ -443,12 +428,12 @@ class ImageManipulation(commands.Cog):
         if member:
             file = member.display_avatar
         else:
-            if self.cached_image:
-                file = self.cached_image
+            if cached_image := self.workspaces.get(ctx.author.id):
+                file = cached_image
             else:
                 file = ctx.author.display_avatar
         image: Image.Image = await self.change_image_brightness(file=file, action='lighten', percentage=percentage, g=False)
-        self.cached_image = image
+        self.workspaces.set(ctx.author.id, image)
         embed = discord.Embed(
             color=int('36393F', 16)
         )
@@ -468,12 +453,12 @@ class ImageManipulation(commands.Cog):
         if member:
             file = member.display_avatar
         else:
-            if self.cached_image:
-                file = self.cached_image
+            if cached_image := self.workspaces.get(ctx.author.id):
+                file = cached_image
             else:
                 file = ctx.author.display_avatar
         image: Image.Image = await self.change_image_brightness(file=file, action='lighten', percentage=percentage, r=False, b=False)
-        self.cached_image = image
+        self.workspaces.set(ctx.author.id, image)
         embed = discord.Embed(
             color=int('36393F', 16)
         )
@@ -493,15 +478,16 @@ class ImageManipulation(commands.Cog):
         if member:
             file = member.display_avatar
         else:
-            if self.cached_image:
-                file = self.cached_image
+            if cached_image := self.workspaces.get(ctx.author.id):
+                file = cached_image
             else:
                 file = ctx.author.display_avatar
 
         image = file if isinstance(file, Image.Image) else Image.open(BytesIO(await file.read()))
-        image: Image.Image = ImageOps.grayscale(image)
+        loop = asyncio.get_event_loop()
+        image: Image.Image = await loop.run_in_executor(None, image_filters.grayscale, image)
 
-        self.cached_image = image
+        self.workspaces.set(ctx.author.id, image)
         embed = discord.Embed(
             color=int('36393F', 16)
         )
@@ -522,8 +508,8 @@ class ImageManipulation(commands.Cog):
         if member:
             file = member.display_avatar
         else:
-            if self.cached_image:
-                file = self.cached_image
+            if cached_image := self.workspaces.get(ctx.author.id):
+                file = cached_image
             else:
                 file = ctx.author.display_avatar
 
@@ -555,7 +541,7 @@ class ImageManipulation(commands.Cog):
                 return [t for t in zip(target_grid, source_grid)]
         
         wave_image = ImageOps.deform(image, WaveDeformer())
-        self.cached_image = wave_image
+        self.workspaces.set(ctx.author.id, wave_image)
         embed = discord.Embed(
             color=int('36393F', 16)
         )
@@ -573,8 +559,8 @@ class ImageManipulation(commands.Cog):
         if member:
             file = member.display_avatar
         else:
-            if self.cached_image:
-                file = self.cached_image
+            if cached_image := self.workspaces.get(ctx.author.id):
+                file = cached_image
             else:
                 file = ctx.author.display_avatar
 
@@ -584,7 +570,7 @@ class ImageManipulation(commands.Cog):
             image = image.convert('RGB')
         
         image = ImageOps.invert(image)
-        self.cached_image = image
+        self.workspaces.set(ctx.author.id, image)
         embed = discord.Embed(
             color=int('36393F', 16)
         )
@@ -632,8 +618,8 @@ class ImageManipulation(commands.Cog):
         if member:
             file = member.display_avatar
         else:
-            if self.cached_image:
-                file = self.cached_image
+            if cached_image := self.workspaces.get(ctx.author.id):
+                file = cached_image
             else:
                 file = ctx.author.display_avatar
 
@@ -652,7 +638,7 @@ class ImageManipulation(commands.Cog):
         # draw.text(((W-w)/2,(H-h)/2-120), text, fill="white", font=small)
 
 
-        self.cached_image = image
+        self.workspaces.set(ctx.author.id, image)
         embed = discord.Embed(
             color=int('36393F', 16)
         )
@@ -0,0 +1,61 @@
+# import.standard
+import asyncio
+
+# import.thirdparty
+import discord
+from discord.ext import commands
+
+# import.local
+from extra.handler_registry import HandlerRegistry, make_stats_embed
+from extra.message_pipeline import MessageContext
+
+
+class MessagePipeline(commands.Cog):
+    """ Runs the cogs' on_message handlers in priority order, sharing a MessageContext between them.
+    The sequential handlers run first, one at a time, and the rest run concurrently if none of them stopped the pipeline. """
+
+    def __init__(self, client: commands.Bot) -> None:
+        """ Class init method. """
+
+        self.client = client
+        self.registry = HandlerRegistry(client, "__message_handler_priority__", "MessagePipeline")
+
+    @commands.Cog.listener()
+    async def on_ready(self) -> None:
+        """ Tells when the cog is ready to go. """
+
+        print("[.cogs] MessagePipeline cog is ready!")
+
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message) -> None:
+        """ Runs all the message handlers with a shared context for the message,
+        so a slow one, e.g. a Moderation REST call, doesn't hold back the XP and counters. """
+
+        context = MessageContext(self.client, message)
+        handlers = self.registry.get_handlers()
+        for _, name, handler in handlers:
+            if not handler.__message_handler_sequential__:
+                continue
+
+            await self.registry.run(name, handler, message, context)
+            if context.stopped:
+                return
+
+        await asyncio.gather(*(
+            self.registry.run(name, handler, message, context)
+            for _, name, handler in handlers
+            if not handler.__message_handler_sequential__
+        ))
+
+    @commands.command(hidden=True, aliases=["mps"])
+    @commands.has_permissions(administrator=True)
+    async def message_pipeline_stats(self, ctx) -> None:
+        """ (ADM) Shows the message handlers, in order, with their timings. """
+
+        await ctx.send(embed=make_stats_embed(ctx, "Message Pipeline", self.registry.get_timing_lines()))
+
+
+def setup(client: commands.Bot) -> None:
+    """ Cog's setup function. """
+
+    client.add_cog(MessagePipeline(client))
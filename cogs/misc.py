@@ -1,13 +1,15 @@
 # import.standard
+import asyncio
 import os
+import time
 from random import randint
-from typing import List
+from typing import List, Tuple
 
 # import.thirdparty
 import aiohttp
 import discord
 from discord import slash_command, user_command
-from discord.ext import commands, tasks
+from discord.ext import commands
 
 # import.local
 from extra import utils
@@ -66,6 +68,9 @@ allowed_roles = [
 # variables.textchannel
 analyst_command_channel_id = int(os.getenv('ANALYST_COMMAND_CHANNEL_ID', 123))
 
+# variables.reminder
+reminder_delivery_concurrency = int(os.getenv('REMINDER_DELIVERY_CONCURRENCY', 5))
+
 misc_cogs: List[commands.Cog] = [MemberReminderTable]
 
 class Misc(*misc_cogs):
@@ -74,28 +79,68 @@ class Misc(*misc_cogs):
     def __init__(self, client):
         self.client = client
         self.db = DatabaseCore()
+        # (reminder ID, user ID, text, remind at)
+        self.due_reminders: List[Tuple[int, int, str, int]] = []
+        self.delivering_reminders: bool = False
 
     @commands.Cog.listener()
     async def on_ready(self):
-        self.look_for_due_reminders.start()
+        for reminder in await self.get_pending_reminders():
+            self.schedule_member_reminder(reminder[0], reminder[1], reminder[2], reminder[3] + reminder[4])
         print("[.cogs] Misc cog is ready!")
 
-    @tasks.loop(minutes=1)
-    async def look_for_due_reminders(self) -> None:
-        """ Looks for expired tempmutes and unmutes the users. """
+    async def queue_member_reminder(self, reminder_id: int, user_id: int, text: str, remind_at: int) -> None:
+        """ Queues a due reminder, delivering the queue unless it's already being delivered.
+        :param reminder_id: The ID of the reminder.
+        :param user_id: The ID of the user.
+        :param text: The text that has to be reminded.
+        :param remind_at: The timestamp the reminder was due at. """
+
+        self.due_reminders.append((reminder_id, user_id, text, remind_at))
+        if self.delivering_reminders:
+            return
+
+        self.delivering_reminders = True
+        try:
+            # Lets the reminders that are due at the same time join the batch
+            await asyncio.sleep(0)
+            while self.due_reminders:
+                reminders, self.due_reminders = self.due_reminders, []
+                await self.deliver_member_reminders(reminders)
+        finally:
+            self.delivering_reminders = False
+
+    async def deliver_member_reminders(self, reminders: List[Tuple[int, int, str, int]]) -> None:
+        """ Sends due reminders to their users, a few at a time, and deletes them all at once.
+        :param reminders: The reminders to deliver. """
 
-        current_ts = await utils.get_timestamp()
-        reminders = await self.get_due_reminders(current_ts)
         guild = self.client.get_guild(server_id)
-        for reminder in reminders:
-            member = discord.utils.get(guild.members, id=reminder[1])
-            if member:
-                try:	
-                    await member.send(f"**`Reminder:`** {reminder[2]}")
-                except:
-                    pass
-            
-            await self.delete_member_reminder(reminder[0])
+        semaphore = asyncio.Semaphore(reminder_delivery_concurrency)
+
+        async def deliver(reminder: Tuple[int, int, str, int]) -> bool:
+            # Any error only fails this reminder, so the batch still gets deleted
+            try:
+                member = guild.get_member(reminder[1])
+                if not member:
+                    return False
+
+                async with semaphore:
+                    await utils.retry_on_rate_limit(member.send, f"**`Reminder:`** {reminder[2]}")
+            except Exception as e:
+                print(f"[Reminders] Couldn't deliver reminder {reminder[0]}: {e}")
+                return False
+            return True
+
+        try:
+            delivered = await asyncio.gather(*map(deliver, reminders))
+        finally:
+            # Their deadlines are already used up, so they're deleted even if the batch was interrupted
+            await self.delete_member_reminders([reminder[0] for reminder in reminders])
+
+        latencies = [time.time() - reminder[3] for reminder in reminders]
+        print(
+            f"[Reminders] Delivered {sum(delivered)}/{len(reminders)} reminders, {delivered.count(False)} failed"
+            f" | avg latency {sum(latencies) / len(latencies):.2f}s | max latency {max(latencies):.2f}s")
 
     @commands.command(aliases=['8ball'])
     @Player.poisoned()
@@ -9,8 +9,10 @@ from discord.ext import commands
 
 # import.local
 from extra import utils
+from extra.message_pipeline import MessageContext, message_handler
 from extra.moderation.modactivity import ModActivityTable
 from extra.prompt.menu import ConfirmButton, Confirm
+from extra.voice_events import VoiceEvent, VoiceTransition, voice_handler
 from mysqldb import DatabaseCore
 
 # variables.id
@@ -33,22 +35,22 @@ class ModActivity(ModActivityTable):
     async def on_ready(self):
         print('[.cogs] ModActivity cog is ready!')
 
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        if not message.guild:
+    @message_handler(priority=50)
+    async def on_message(self, message: discord.Message, context: MessageContext) -> None:
+        """ Updates the moderator's message counter. """
+
+        if not context.is_guild_member_message:
             return
-        if message.author.bot:
-            return
-        guild = self.client.get_guild(guild_id)
-        moderator_role = discord.utils.get(guild.roles, id=mod_role_id)
-        if moderator_role not in message.author.roles:
+        if not context.has_role(mod_role_id):
             return
 
         await self.get_moderator_current_messages(message.author.id)
         await self.update_moderator_message(message.author.id)
 
-    @commands.Cog.listener()
-    async def on_voice_state_update(self, member, before, after):
+    @voice_handler(VoiceTransition.JOIN, VoiceTransition.LEAVE, priority=50)
+    async def on_voice_state_update(self, member, before, after, event: VoiceEvent):
+        """ Updates the moderator's voice time when they join or leave a voice channel. """
+
         if member.bot:
             return
         guild = self.client.get_guild(guild_id)
@@ -56,7 +58,7 @@ class ModActivity(ModActivityTable):
         if moderator_role not in member.roles:
             return
 
-        current_ts = await utils.get_timestamp()
+        current_ts = event.timestamp
         old_time = await self.get_moderator_current_timestamp(member.id, current_ts)
         addition = current_ts - old_time
 
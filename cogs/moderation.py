@@ -4,25 +4,31 @@ import asyncio
 import os
 import re
 from datetime import datetime, timedelta
+from functools import partial
 from typing import Any, Dict, List, Optional, Tuple, Union
 
 # import.thirdparty
 import discord
 from discord import user_command
-from discord.ext import commands, menus, tasks
+from discord.ext import commands, menus
 
 # import.local
 from extra import utils
 from extra.menu import MemberSnipeLooping, SnipeLooping, prompt_message_guild, prompt_number
+from extra.message_pipeline import MessageContext, message_handler
+from extra.moderation.deletedmessages import DeletedMessageStore
 from extra.moderation.fakeaccounts import ModerationFakeAccountsTable
 from extra.moderation.firewall import (BypassFirewallTable,
                                        ModerationFirewallTable)
+from extra.moderation.invites import GuildInviteRegistry
+from extra.moderation.message_filters import BannedLinkIndex, ScamMatcher
 from extra.moderation.moderatednicknames import ModeratedNicknamesTable
 from extra.moderation.mutedmember import ModerationMutedMemberTable
 from extra.moderation.user_muted_galaxies import UserMutedGalaxiesTable
 from extra.moderation.userinfractions import ModerationUserInfractionsTable
 from extra.moderation.watchlist import ModerationWatchlistTable
 from extra.prompt.menu import Confirm
+from extra.scheduler import scheduler
 from extra.useful_variables import banned_links
 from mysqldb import DatabaseCore
 
@@ -78,7 +84,7 @@ scamwords = [
     "teach 20 interested people on how to earn $50k", "more within 72 hours from the crypto market", "massage me for more info", "if interested send me a direct massage. for more info via", "ONLINE ASSISTANT NEEDED URGENTLY", "Job Opportunity: Online Personal Assistant", "Competitive weekly salary of $900", "I have a nice idea and you can get regular income  $50-100 every month", "$50-100 every month", "Don't miss this exciting opportunity! Apply now", "help first 10 interested people how to earn 30k or more in crypto market within 48 hours but you", "10% of your profits Dm", "Hi, I received a referral link for the pre-market of the X token.", "Exclusive bonuses for early stakers and loyal holders!", "Hurry Up! This is a limited-time event"
 ]
 
-last_deleted_message = []
+last_deleted_messages = DeletedMessageStore()
 
 moderation_cogs: List[commands.Cog] = [
     ModerationFirewallTable, BypassFirewallTable, ModerationMutedMemberTable, 
@@ -95,32 +101,72 @@ class Moderation(*moderation_cogs):
     ]
 
     def __init__(self, client):
+        # Sets up the fake accounts graph
+        ModerationFakeAccountsTable.__init__(self, client)
         self.client = client
         self.db = DatabaseCore()
         self.user_last_notification = {}
+        self.scam_matcher = ScamMatcher()
+        self.banned_link_index = BannedLinkIndex()
+        self.rebuild_message_filters()
+        self.invite_registry = GuildInviteRegistry()
+
+    def rebuild_message_filters(self) -> None:
+        """ Rebuilds the scam phrase matcher and the banned link index from the current lists. """
+
+        self.scam_matcher.rebuild(scamwords)
+        self.banned_link_index.rebuild(banned_links)
 
     @commands.Cog.listener()
     async def on_ready(self):
-        self.look_for_expired_tempmutes.start()
-        self.check_timeouts_expirations.start()
+        for user_id, expires_at in await self.get_tempmutes():
+            self.schedule_tempmute(user_id, expires_at)
         self.guild = self.client.get_guild(server_id)
+        if self.guild:
+            await self.invite_registry.load(self.guild)
+            if timedout_role := discord.utils.get(self.guild.roles, id=timedout_role_id):
+                for member in timedout_role.members:
+                    self.schedule_timeout_expiration(member)
+        await self.load_alt_graph()
         print('[.cogs] Moderation cog is ready!')
 
     @commands.Cog.listener()
-    async def on_message(self, message):
+    async def on_invite_create(self, invite: discord.Invite) -> None:
+        """ Registers the server's new invite. """
+
+        if invite.guild and invite.guild.id == server_id:
+            self.invite_registry.add(invite.code)
+
+    @commands.Cog.listener()
+    async def on_invite_delete(self, invite: discord.Invite) -> None:
+        """ Unregisters the server's deleted invite. """
+
+        if invite.guild and invite.guild.id == server_id:
+            self.invite_registry.remove(invite.code)
+
+    @message_handler(priority=10, sequential=True)
+    async def check_scam_message(self, message: discord.Message, context: MessageContext) -> None:
+        """ Checks whether the message is a spam/scam message, and if so, stops the pipeline and deletes it. """
+
+        if not context.is_guild_member_message: return
+
+        if self.scam_matcher.search(context.lower_content):
+            # Scam messages don't count for anything else, such as XP
+            context.stop()
+            await self.handle_scam(message)
+            await message.delete()
+
+    @message_handler(priority=10)
+    async def on_message(self, message: discord.Message, context: MessageContext) -> None:
+        """ Checks the message for Staff pings, banned links and invite advertisements. """
+
         if not message.guild: return
 
         if message.author.bot:
             if not message.webhook_id: return
             else:
                 return await self.check_unban_infractions(message)
-        
-        # Checks if the message is a spam/scam message
-        if any(word.lower() in message.content.lower() for word in scamwords):
-            await self.handle_scam(message)
-            await message.delete()
-            return
-        
+
         # Checks if someone pinged Staff
         await self.check_if_pinged_staff(message)
 
@@ -132,8 +178,7 @@ class Moderation(*moderation_cogs):
         invite_root = self.get_invite_root(msg.lower().strip())
 
         if invite_root and invite_root not in ("discord.gg/events/", "discord.com/events/"):
-            ctx = await self.client.get_context(message)
-            if not await utils.is_allowed([*allowed_roles, sponsor_role_id]).predicate(ctx):
+            if not context.is_staff and not context.has_role(sponsor_role_id):
                 is_from_guild = await self.check_invite_guild(msg, message.guild, invite_root)
 
                 if not is_from_guild:
@@ -285,17 +330,16 @@ class Moderation(*moderation_cogs):
 
         # Checks it in the message attachments
         for video in videos:
-            if str(video) in banned_links:
+            if self.banned_link_index.is_banned(str(video)):
                 ctx = await self.client.get_context(message)
                 if not await utils.is_allowed(allowed_roles).predicate(ctx):
                     return await self._mute_callback(ctx, member=message.author, reason="Banned Link")
 
         # Checks it in the message content
-        for word in message.content.split():
-            if word in banned_links:
-                ctx = await self.client.get_context(message)
-                if not await utils.is_allowed(allowed_roles).predicate(ctx):
-                    return await self._mute_callback(ctx, member=message.author, reason="Banned Link")
+        if self.banned_link_index.search(message.content):
+            ctx = await self.client.get_context(message)
+            if not await utils.is_allowed(allowed_roles).predicate(ctx):
+                return await self._mute_callback(ctx, member=message.author, reason="Banned Link")
 
     async def handle_scam(self, message):
         ctx = await self.client.get_context(message)
@@ -346,8 +390,7 @@ class Moderation(*moderation_cogs):
 
                 await self.infractions(ctx, message=unban_requester.mention)
 
-    @tasks.loop(minutes=1)
-    async def look_for_expired_tempmutes(self) -> None:
+    async def unmute_expired_tempmutes(self) -> None:
         """ Looks for expired tempmutes and unmutes the users. """
 
         current_ts = await utils.get_timestamp()
@@ -406,7 +449,7 @@ class Moderation(*moderation_cogs):
     async def check_invite_guild(self, msg, guild, invite_root: str):
         """ Checks whether it's a guild invite or not. """
 
-        start_index = msg.index(invite_root)
+        start_index = msg.lower().index(invite_root)
         end_index = start_index + len(invite_root)
         invite_hash = ''
         for c in msg[end_index:]:
@@ -419,18 +462,13 @@ class Moderation(*moderation_cogs):
             invite_hash = invite_hash.replace(char, '')
         invite = invite_root + invite_hash
         inv_code = discord.utils.resolve_invite(invite)
-        print(inv_code)
         if inv_code == 'languages':
             return True
 
         if inv_code in ['TE6hPrn65a']:
             return True
 
-        guild_inv = discord.utils.get(await guild.invites(), code=inv_code)
-        if guild_inv:
-            return True
-        else:
-            return False
+        return await self.invite_registry.contains(guild, inv_code)
         
     async def check_if_pinged_staff(self, message: discord.Message) -> None:
         """ Checks whether the member pinged the Staff in the message.
@@ -520,20 +558,13 @@ class Moderation(*moderation_cogs):
         if message.author.bot:
             return
 
-        if len(last_deleted_message) >= 1000:
-            last_deleted_message[1:]
-        last_deleted_message.append({message.author.id : {"content" : message.content, "time" : (message.created_at).timestamp(), 'channel' : message.channel }})
+        last_deleted_messages.add(message)
 
     async def search_user_deleted_messages(self, member) -> List[Dict]:
-        deleteds_messages = []
-        for message in last_deleted_message:
-            member_id = next(iter(message))
-            if member_id == member.id:
-                message = message[member_id]
-                deleteds_messages.append({"content" : message["content"], "time" : message["time"], "channel" : message["channel"]})
+        """ Gets the member's deleted messages, from the oldest to the newest.
+        :param member: The member to search. """
 
-        deleteds_messages = (sorted(deleteds_messages, key = lambda d: d['time']))
-        return deleteds_messages
+        return last_deleted_messages.from_user(member.id)
 
 
     @commands.command()
@@ -545,25 +576,21 @@ class Moderation(*moderation_cogs):
 
         member, message_qtd = await utils.greedy_member_reason(ctx, message)
 
-        if not last_deleted_message:
+        if not last_deleted_messages:
             #await ctx.message.delete()
             return await ctx.send("**I couldn't snipe any message.**")
 
         if not member:
             if not message_qtd:
                 # Gets the last deleted message
-                messages: List[Dict] = [last_deleted_message[-1]]
+                messages: List[Dict] = last_deleted_messages.latest()
 
             else:
                 # Gets the requested amount of deleted messages
                 if int(message_qtd) <= 0:
                     return await ctx.send("**I couldn't snipe any message.**")
 
-                if int(message_qtd) > len(last_deleted_message):
-                    message_qtd: int = len(last_deleted_message)
-
-                messages: List[Dict] = sorted(last_deleted_message, key = lambda d:  d[next(iter(d))]['time'])
-                messages: List[Dict] = messages[- int(message_qtd): ]
+                messages: List[Dict] = last_deleted_messages.latest(int(message_qtd))
             menu = menus.MenuPages(SnipeLooping(messages))
             #await ctx.message.delete()
             await menu.start(ctx)
@@ -1004,22 +1031,38 @@ class Moderation(*moderation_cogs):
         general_embed.set_author(name=f"{member} is no longer timed out", icon_url=member.display_avatar)
         await ctx.send(embed=general_embed)
         
-    @tasks.loop(minutes=3)
-    async def check_timeouts_expirations(self) -> None:
-        """ Task that checks Timeouts expirations. """
-        
+    @commands.Cog.listener(name="on_member_update")
+    async def on_member_update_timeouts(self, before: discord.Member, after: discord.Member) -> None:
+        """ Schedules the removal of the timeout role when a member's timeout changes. """
+
+        if before.communication_disabled_until != after.communication_disabled_until \
+                or (after.get_role(timedout_role_id) and not before.get_role(timedout_role_id)):
+            self.schedule_timeout_expiration(after)
+
+    def schedule_timeout_expiration(self, member: discord.Member) -> None:
+        """ Schedules the timeout role to be removed from a member when their timeout expires.
+        :param member: The member. """
+
+        timeout_time = member.communication_disabled_until
+        expires_at = timeout_time.timestamp() if timeout_time else time.time()
+        scheduler.schedule(("timeout", member.id), expires_at, partial(self.expire_timeout, member.id))
+
+    async def expire_timeout(self, member_id: int) -> None:
+        """ Removes the timeout role from a member whose timeout has expired.
+        :param member_id: The ID of the member. """
+
         guild = self.client.get_guild(server_id)
         role = discord.utils.get(guild.roles, id=timedout_role_id)
-        members = role.members
-        
-        for member in members:
-            try:
-                timeout_time = member.communication_disabled_until
-                if timeout_time is None or (timeout_time and timeout_time.timestamp() < time.time()):
-                    await member.remove_roles(role)
-            except Exception as e:
-                print(e)
-                continue
+        member = guild.get_member(member_id)
+        if not member or role not in member.roles:
+            return
+
+        timeout_time = member.communication_disabled_until
+        if timeout_time and timeout_time.timestamp() > time.time():
+            # The timeout was extended meanwhile
+            return self.schedule_timeout_expiration(member)
+
+        await member.remove_roles(role)
 
     async def get_remove_roles(self, member: discord.Member, keep_roles: Optional[List[Union[int, discord.Role]]] = []
     ) -> List[List[discord.Role]]:
@@ -1293,7 +1336,7 @@ class Moderation(*moderation_cogs):
                         await moderation_log.send(embed=embed)
 
                         # Updating the member muted database
-                        await ModerationMutedMemberTable.update_mute_time(ctx, member.id, current_ts, seconds)
+                        await self.update_mute_time(member.id, current_ts, seconds)
                     else:
                         await ctx.send(f"User {member} is not muted")
                 else:
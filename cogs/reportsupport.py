@@ -7,7 +7,7 @@ from typing import List, Optional
 # import.thirdparty
 import aiohttp
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
 
 # import.local
 from extra import utils
@@ -67,12 +67,12 @@ class ReportSupport(*report_support_classes):
         self.client.add_view(view=ApplyView(self.client))
         self.client.add_view(view=PremiumView(self.client))
         self.client.add_view(view=ReportView(self.client))
-        self.check_inactive_cases.start()
+        for open_channel in await self.get_open_channels():
+            self.schedule_case_inactivity(open_channel[1], open_channel[3])
         print('[.cogs] ReportSupport cog is ready!')
 
-    @tasks.loop(seconds=60)
-    async def check_inactive_cases(self):
-        """ Task that checks for inactive cases and removes them. """
+    async def close_inactive_cases(self) -> None:
+        """ Checks for inactive cases and removes them. """
 
         # Get current time
         current_ts = await utils.get_timestamp()
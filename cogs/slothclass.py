@@ -11,9 +11,11 @@ from discord.ext import commands, menus, tasks
 from extra import utils
 from extra.customerrors import (ActionSkillOnCooldown, ActionSkillsLocked,
                                 CommandNotReady, SkillsUsedRequirement)
+from extra.handler_registry import make_stats_embed
 from extra.menu import SlothClassPagination
 from extra.slothclasses import (db_commands, mastersloth)
 from extra.slothclasses.player import Player, Skill
+from extra.slothclasses.skillexpiry import EXTERNAL_SKILL_TYPES, FOOD_KINDS, skill_expiries
 from mysqldb import DatabaseCore
 
 
@@ -37,39 +39,59 @@ class SlothClass(mastersloth.Mastersloth, db_commands.SlothClassDatabaseCommands
         """ Tells when the cog is ready to use. """
 
         self.bots_txt = await self.client.fetch_channel(bots_and_commands_channel_id)
-        self.check_skill_actions.start()
+        self.register_expiry_handlers()
+        await skill_expiries.load()
+        for kind in FOOD_KINDS:
+            await skill_expiries.load_food(kind)
         self.check_mission_one_completion.start()
         self.check_mission_six_completion.start()
+        self.check_external_skill_actions.start()
         print("[.cogs] SlothClass cog is ready!")
 
+    def register_expiry_handlers(self) -> None:
+        """ Registers the handler of each skill type's expired actions, and of pets' and babies' meals. """
+
+        handlers = {
+            'reflect': self.check_reflects,
+            'steal': self.check_steals,
+            'divine_protection': self.check_protections,
+            'transmutation': self.check_transmutations,
+            'potion': self.check_shop_potion_items,
+            'ring': self.check_shop_ring_items,
+            'pet_egg': self.check_shop_egg_items,
+            'hack': self.check_hacks,
+            'hit': self.check_knock_outs,
+            'wire': self.check_wires,
+            'tribe_creation': self.check_tribe_creations,
+            'frog': self.check_frogs,
+            'sabotage': self.check_sabotages,
+            'poison': self.check_poisons,
+            'pet_food': self.check_pet_food,
+            'baby_food': self.check_baby_food,
+        }
+        for kind, handler in handlers.items():
+            skill_expiries.register(kind, handler)
+
     @tasks.loop(minutes=1)
-    async def check_skill_actions(self):
-        """ Checks all skill actions and events. """
-
-        await self.try_to_run(self.check_reflects)
-        await self.try_to_run(self.check_steals)
-        await self.try_to_run(self.check_protections)
-        await self.try_to_run(self.check_transmutations)
-        await self.try_to_run(self.check_shop_potion_items)
-        await self.try_to_run(self.check_shop_ring_items)
-        await self.try_to_run(self.check_shop_egg_items)
-        await self.try_to_run(self.check_hacks)
-        await self.try_to_run(self.check_knock_outs)
-        await self.try_to_run(self.check_wires)
-        await self.try_to_run(self.check_tribe_creations)
-        await self.try_to_run(self.check_frogs)
-        await self.try_to_run(self.check_sabotages)
-        await self.try_to_run(self.check_poisons)
-        await self.try_to_run(self.check_pet_food)
-        await self.try_to_run(self.check_baby_food)
-
-    async def try_to_run(self, func):
-        """ Tries to run a function/method and ignore failures. """
+    async def check_external_skill_actions(self) -> None:
+        """ Indexes the skill actions the website inserts, e.g. tribe creations, since they don't go through insert_skill_action. """
 
-        try:
-            await func()
-        except:
-            pass
+        await skill_expiries.load(EXTERNAL_SKILL_TYPES)
+
+    @commands.command(hidden=True, aliases=["ses"])
+    @commands.has_permissions(administrator=True)
+    async def skill_expiry_stats(self, ctx) -> None:
+        """ (ADM) Shows how many times each expiry handler ran, how long it took and how late it started. """
+
+        lines = []
+        for kind in skill_expiries.handlers:
+            runs, failures, total, max_time, max_lateness = skill_expiries.stats.get(kind, [0, 0, 0.0, 0.0, 0.0])
+            average = (total / runs * 1000) if runs else 0
+            lines.append(
+                f"[{kind}] {int(runs)} runs ({int(failures)} failed) | avg {average:.2f}ms | max {max_time * 1000:.2f}ms"
+                f" | max late {max_lateness:.2f}s")
+
+        await ctx.send(embed=make_stats_embed(ctx, "Skill Expiries", lines))
 
     @commands.command(aliases=['sloth_class', 'slothclasses'])
     @commands.cooldown(1, 5, commands.BucketType.user)
@@ -1,9 +1,8 @@
 # import.standard
 import asyncio
-import glob
 import os
 import shutil
-from itertools import cycle
+from io import BytesIO
 from typing import Dict, List, Optional, Tuple, Union
 
 # import.thirdparty
@@ -12,17 +11,19 @@ from discord import Option, slash_command
 from discord.ext import commands, menus
 from discord.member import VoiceState
 from discord.utils import escape_mentions
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image
 
 # import.local
 from external_cons import the_drive
 from extra import utils
+from extra.currency.profilerenderer import profile_renderer, rendered_profiles
 from extra.currency.usercurrency import UserCurrencyTable
 from extra.currency.useritems import UserItemsTable
 from extra.currency.userserveractivity import (UserServerActivityTable,
                                                UserVoiceSystem)
-from extra.gif_manager import GIF
+from extra.gif_manager import effect_gifs
 from extra.menu import InventoryLoop
+from extra.message_pipeline import MessageContext, message_handler
 from extra.slothclasses.player import Player
 from extra.useful_variables import flag_badges, level_badges, patreon_roles
 from extra.view import ExchangeActivityView
@@ -48,34 +49,32 @@ class SlothCurrency(*currency_cogs):
     def __init__(self, client: commands.Bot) -> None:
         """ Class init method. """
 
-        self.client = client
-        self.db = DatabaseCore()
+        UserVoiceSystem.__init__(self, client)
 
     @commands.Cog.listener()
     async def on_ready(self) -> None:
         """ Tells when the cog is ready to go. """
 
+        await effect_gifs.warm_up()
         print("[.cogs] SlothCurrency cog is ready!")
 
-    @commands.Cog.listener()
-    async def on_message(self, message) -> None:
+    @message_handler(priority=30)
+    async def on_message(self, message: discord.Message, context: MessageContext) -> None:
         """ Updates the user's message counter and gives them XP. """
 
-        if not message.guild:
+        if not context.is_guild_member_message:
             return
 
-        if message.author.bot:
-            return
-        if not await self.check_user_server_activity_table_exists():
+        if not await context.table_exists("UserServerActivity"):
             return
 
         user_info = await self.get_user_activity_info(message.author.id)
         if not user_info:
             return await self.insert_user_server_activity(message.author.id, 1)
 
-        effects = await self.client.get_cog('SlothClass').get_user_effects(message.author)
+        effects = await context.get_effects()
         if 'sabotaged' not in effects:
-            await self.update_user_server_messages(message.author.id, 1)
+            await self.update_user_server_messages(message.author.id, 1, buffered=True)
 
 
     # In-game commands
@@ -240,20 +239,16 @@ class SlothCurrency(*currency_cogs):
             skill_action = await SlothClass.get_skill_action_by_target_id_and_skill_type(member.id, 'hack')
             skill_action = skill_action[0] if skill_action else '??'
             hacker = self.client.get_user(skill_action)
-            # Makes the Hacked image and saves it
-            big = ImageFont.truetype("built titling sb.ttf", 80)
-            background = Image.open('sloth_custom_images/background/hacked.png').convert('RGBA')
-            draw = ImageDraw.Draw(background)
-            draw.text((350, 300), f"Hacked by {hacker}", font=big, fill=(0, 0, 0))
-            file_path = f'media/temporary/hacked_{member.id}.png'
-            background.save(file_path, 'png', quality=90)
+            # Makes the Hacked image
+            image = await profile_renderer.render(
+                ['sloth_custom_images/background/hacked.png'], [], None,
+                [((350, 300), f"Hacked by {hacker}")], font_size=80, fill=(0, 0, 0))
+            buffer = await profile_renderer.to_bytes(image)
         except Exception as e:
             print(e)
             return await answer(f"**{author.mention}, something went wrong with it!**")
         else:
-            await answer(file=discord.File(file_path))
-            # await asyncio.sleep(0.5)
-            return os.remove(file_path)
+            await answer(file=discord.File(buffer, filename=f'hacked_{member.id}.png'))
 
     async def send_frogged_image(self, answer: discord.PartialMessageable, author: discord.Member, member: discord.Member, knocked_out: bool = False) -> None:
         """ Makes and sends a frogged image.
@@ -268,26 +263,16 @@ class SlothCurrency(*currency_cogs):
             skill_action = await SlothClass.get_skill_action_by_target_id_and_skill_type(member.id, 'frog')
             skill_action = skill_action[0] if skill_action else '??'
             metamorph = self.client.get_user(skill_action)
-            # Makes the Hacked image and saves it
-            big = ImageFont.truetype("built titling sb.ttf", 80)
-            background = None
-
-            if knocked_out:
-                background = Image.open('sloth_custom_images/background/frogged_ko.png').convert('RGBA')
-            else:
-                background = Image.open('sloth_custom_images/background/frogged.png').convert('RGBA')
-
-            draw = ImageDraw.Draw(background)
-            draw.text((170, 170), f"{metamorph}", font=big, fill=(39, 126, 205))
-            file_path = f'media/temporary/frogged_{member.id}.png'
-            background.save(file_path, 'png', quality=90)
+            # Makes the Frogged image
+            background = 'sloth_custom_images/background/frogged_ko.png' if knocked_out else 'sloth_custom_images/background/frogged.png'
+            image = await profile_renderer.render(
+                [background], [], None, [((170, 170), f"{metamorph}")], font_size=80, fill=(39, 126, 205))
+            buffer = await profile_renderer.to_bytes(image)
         except Exception as e:
             print(e)
             return await answer(f"**{author.mention}, something went wrong with it!**")
         else:
-            await answer(file=discord.File(file_path))
-            # await asyncio.sleep(0.5)
-            return os.remove(file_path)
+            await answer(file=discord.File(buffer, filename=f'frogged_{member.id}.png'))
 
     @commands.command(name="profile")
     @commands.cooldown(1, 5, commands.BucketType.user)
@@ -360,31 +345,17 @@ class SlothCurrency(*currency_cogs):
                 await SlothClass.check_virus(ctx=ctx, target=member)
             return
 
-        small = ImageFont.truetype("built titling sb.ttf", 45)
-        background = Image.open(await self.get_user_specific_type_item(member.id, 'background'))
+        # Gets the equipped item image of each slot at once
+        items = await self.get_user_equipped_items(member.id, ['background', 'body', 'head', 'foot', 'hand', 'hud'])
 
         # Checks whether user is transmutated
-        sloth = None
         if await SlothClass.has_effect(effects, 'transmutated'):
-            sloth = Image.open(f"./sloth_custom_images/sloth/transmutated_sloth.png")
+            sloth = "./sloth_custom_images/sloth/transmutated_sloth.png"
         else:
-            sloth = Image.open(f"./sloth_custom_images/sloth/{sloth_profile[1].title()}.png")
-
-        # Gets an item image for each equippable slot
-        body = Image.open(await self.get_user_specific_type_item(member.id, 'body'))
-        hand = Image.open(await self.get_user_specific_type_item(member.id, 'hand'))
-        foot = Image.open(await self.get_user_specific_type_item(member.id, 'foot'))
-        head = Image.open(await self.get_user_specific_type_item(member.id, 'head'))
-        hud = Image.open(await self.get_user_specific_type_item(member.id, 'hud'))
-        
-        # Pastes all item images
-        pfp = await utils.get_user_pfp(member)
-        background.paste(sloth, (0, 0), sloth)
-        background.paste(body, (0, 0), body)
-        background.paste(head, (0, 0), head)
-        background.paste(foot, (0, 0), foot)
-        background.paste(hand, (0, 0), hand)
-        background.paste(hud, (0, 0), hud)
+            sloth = f"./sloth_custom_images/sloth/{sloth_profile[1].title()}.png"
+
+        layers = [items['background'], sloth, items['body'], items['head'], items['foot'], items['hand'], items['hud']]
+        badges = []
 
         # Checks if user is a booster
         booster_role = discord.utils.get(ctx.guild.roles, id=booster_role_id)
@@ -392,17 +363,15 @@ class SlothCurrency(*currency_cogs):
             if flag_badge := flag_badges.get('discord_server_booster'):
                 file_path = f"./sloth_custom_images/badge/{flag_badge[0]}"
                 if os.path.isfile(file_path):
-                    booster_badge = Image.open(file_path).resize((50, 50)).convert('RGBA')
-                    background.paste(booster_badge, flag_badge[1], booster_badge)
+                    badges.append((file_path, flag_badge[1], (50, 50)))
 
-        # Pastes all flag badges that the user has
+        # Gets all flag badges that the user has
         flags = await utils.get_member_public_flags(member)
         for flag in flags:
             if flag_badge := flag_badges.get(flag):
                 file_path = f"./sloth_custom_images/badge/{flag_badge[0]}"
                 if os.path.isfile(file_path):
-                    flag_image = Image.open(file_path).resize((50, 50)).convert('RGBA')
-                    background.paste(flag_image, flag_badge[1], flag_image)
+                    badges.append((file_path, flag_badge[1], (50, 50)))
 
         # Checks whether user has level badges
         user_level = await self.client.get_cog('SlothReputation').get_specific_user(member.id)
@@ -410,100 +379,51 @@ class SlothCurrency(*currency_cogs):
             if user_level[0][2] >= key:
                 file_path = f"sloth_custom_images/badge/{value[0]}.png"
                 if os.path.isfile(file_path):
-                    level_badge = Image.open(file_path)
-                    background.paste(level_badge, value[1], level_badge)
+                    badges.append((file_path, value[1], None))
                     break
 
-        # Tries to print the user's profile picture
-        try:
-            background.paste(pfp, (201, 2), pfp)
-        except Exception:
-            pass
-
-        draw = ImageDraw.Draw(background)
-        draw.text((310, 5), f"{str(member)[:10]}", (255, 255, 255), font=small)
-        draw.text((80, 525), f"{user_info[0][1]}", (255, 255, 255), font=small)
-        draw.text((730, 525), f"🍂 {user_info[0][7]}", (255, 255, 255), font=small)
-        file_path = f'media/temporary/profile_{member.id}.png'
-        background.save(file_path, 'png', quality=90)
+        texts = [
+            ((310, 5), f"{str(member)[:10]}"),
+            ((80, 525), f"{user_info[0][1]}"),
+            ((730, 525), f"🍂 {user_info[0][7]}"),
+        ]
 
         all_effects = {key: value for (key, value) in effects.items() if value.get('has_gif')}
+        # Everything the image depends on, so an identical profile is served from the cache
+        cache_key = rendered_profiles.make_key(
+            member.id, rendered_profiles.get_file_versions(layers + [badge[0] for badge in badges]),
+            badges, texts, member.display_avatar.key,
+            sorted((key, value['cords'], value['resize']) for key, value in all_effects.items()))
+
         async with ctx.typing():
+            try:
+                if cached := await rendered_profiles.get(cache_key):
+                    data, extension = cached
+                else:
+                    pfp = await utils.get_user_pfp(member)
+                    profile = await profile_renderer.render(layers, badges, pfp, texts)
+                    if all_effects:
+                        buffer = await self.make_gif_image(profile=profile, all_effects=all_effects)
+                        extension = 'gif'
+                    else:
+                        buffer = await profile_renderer.to_bytes(profile)
+                        extension = 'png'
+
+                    data = buffer.getvalue()
+                    await rendered_profiles.put(member.id, cache_key, data, extension)
+
+                await answer(file=discord.File(BytesIO(data), filename=f'profile_{member.id}.{extension}'))
+            except Exception as e:
+                print(e)
+                pass
 
-            if all_effects:
-                try:
-                    gif_file_path = await self.make_gif_image(user_id=member.id, all_effects=all_effects)
-                    await answer(file=discord.File(gif_file_path))
-
-                except Exception as e:
-                    print(e)
-                    pass
-                finally:
-                    os.remove(file_path)
-                    os.remove(gif_file_path)
-            else:
-                try:
-                    await answer(file=discord.File(file_path))
-                except:
-                    pass
-                finally:
-                    os.remove(file_path)
-
-    async def make_gif_image(self, user_id: int, all_effects: Dict[str, Dict[str, Union[List[str], Tuple[int]]]]) -> str:
+    async def make_gif_image(self, profile: Image.Image, all_effects: Dict[str, Dict[str, Union[List[str], Tuple[int]]]]) -> BytesIO:
         """ Makes a gif image out a profile image.
-        :param user_id: The ID of the user for whom to make the GIF.
+        :param profile: The profile image.
         :param all_effects: All effects that the user currently has. """
 
-        gif_file_path = f'media/temporary/profile_{user_id}.gif'
-
-        try:
-            profile = Image.open(f'media/temporary/profile_{user_id}.png').convert('RGBA')
-            gif = GIF(image=profile, frame_duration=40)
-            path = 'media/effects'
-
-            # Gets all frames of each effect and resize them properly, respectively.
-            for effect in all_effects:
-                full_path = f"{path}/{effect}"
-                # Checks whether the effect folder exists
-                if os.path.isdir(full_path):
-                    # Gets all frame images from the folder
-                    for i in range(len(glob.glob(f"{full_path}/*.png"))):
-                        frame = Image.open(f"{full_path}/{effect}_{i+1}.png")  # convert('RGBA') # remove this convert later
-                        # Checs whether frame has to be resized
-                        if all_effects[effect]['resize']:
-                            frame = frame.resize(all_effects[effect]['resize']).convert('RGBA')
-                        # Appends to its respective frame list
-                        all_effects[effect]['frames'].append(frame)
-
-            # Loops through the frames based on the amount of frames of the longest effect.
-            longest_gif = max([len(frames['frames']) for frames in all_effects.values()])
-
-            for efx in all_effects.keys():
-                all_effects[efx]['frames'] = cycle(all_effects[efx]['frames'])
-
-            for i in range(longest_gif):
-                # Gets a frame of each effect in each iteration of the loop
-                base = gif.new_frame()
-                await asyncio.sleep(0)
-                for efx, value in all_effects.items():
-                    # print(all_effects[efx]['cords'])
-                    cords = all_effects[efx]['cords']
-                    frame = next(all_effects[efx]['frames'])
-                    # print(efx, frame)
-                    base.paste(frame, cords, frame)
-                    gif.add_frame(base)
-
-                if i >= 400:
-                    break
-
-            else:
-                gif.export(gif_file_path)
-
-        except Exception as e:
-            print(e)
-            pass
-        finally:
-            return gif_file_path
+        effects = [(effect, value['cords'], value['resize']) for effect, value in all_effects.items()]
+        return await effect_gifs.make_gif(profile, effects)
 
     @commands.command()
     @commands.is_owner()
@@ -572,6 +492,9 @@ class SlothCurrency(*currency_cogs):
                         pass
                     # print(f"File '{file['title']}' downloaded!")
 
+        # The renders may be made of images that were just replaced
+        await rendered_profiles.clear()
+
         if ctx:
             return await ctx.send("**Download update is done!**", delete_after=5)
 
@@ -847,7 +770,7 @@ class SlothCurrency(*currency_cogs):
         )
         embed.set_footer(text=f"Requested by: {author}", icon_url=author.display_avatar)
 
-        user_activity = await self.get_user_activity_info(member.id)
+        user_activity = await self.get_user_activity_info(member.id, flush=True)
         user_activity = user_activity[0][3] if user_activity else None
 
         member_voice: VoiceState = member.voice
@@ -860,19 +783,8 @@ class SlothCurrency(*currency_cogs):
         <:vc:914947524178116649> - Joined VC Timestamp
         """
 
-        alts = await self.client.get_cog('Moderation').get_fake_accounts(member.id)
-        alts_list: List[int] = []
-        for alt in alts:
-            alts_list.append(alt[0])
-            alts_list.append(alt[1])
-
-        alts = list(set(alts_list))
-        try:
-            alts.remove(member.id)
-        except ValueError:
-            pass
-
-        vc_members: List[int] = len([m for m in vc.members  if m.id not in alts]) if vc else 0
+        alts = await self.client.get_cog('Moderation').get_alt_ids(member.id)
+        vc_members: int = len([m for m in vc.members if m.id not in alts]) if vc else 0
         is_farming = True if vc and not mute and not deaf and not smute and not sdeaf and vc_members > 1 else False
 
         embed.add_field(
@@ -918,7 +830,7 @@ class SlothCurrency(*currency_cogs):
         if not member:
             member = ctx.author
 
-        user_info = await self.get_user_activity_info(member.id)
+        user_info = await self.get_user_activity_info(member.id, flush=True)
         if not user_info:
             if author.id == member.id:
                 return await ctx.send(f"**You don't have an account yet, {author.mention}!**")
@@ -15,6 +15,7 @@ from mysqldb import DatabaseCore
 from extra.slothclasses.mastersloth import classes
 from extra.currency.membersscore import MembersScoreTable
 from extra.misc.slothactions import SlothActionsTable
+from extra.message_pipeline import MessageContext, message_handler
 
 # variables.id
 guild_ids = [int(os.getenv('SERVER_ID', 123))]
@@ -38,25 +39,25 @@ class SlothReputation(*currency_cogs):
         print("[.cogs] SlothReputation cog is ready!")
 
     # In-game commands
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        if not message.guild:
-            return
+    @message_handler(priority=40)
+    async def on_message(self, message: discord.Message, context: MessageContext) -> None:
+        """ Gives the user XP for the message. """
 
-        if message.author.bot:
+        if not context.is_guild_member_message:
             return
-        elif not await self.check_members_score_table_exists():
+        elif not await context.table_exists("MembersScore"):
             return
 
         currnet_ts = await utils.get_timestamp()
         await self.update_data(message.author, currnet_ts)
 
     async def update_data(self, user, current_ts):
-        the_member = await self.get_specific_user(user.id)
-        if the_member:
-            if current_ts - the_member[0][3] >= 3 or the_member[0][1] == 0:
-                await self.update_user_xp_time(user.id, current_ts)
-                await self.update_user_xp(user.id, 5)
+        xp_state = await self.get_user_xp_state(user.id)
+        if xp_state:
+            xp_time, xp, _ = xp_state
+            if current_ts - xp_time >= 3 or xp == 0:
+                await self.update_user_xp_time(user.id, current_ts, buffered=True)
+                await self.update_user_xp(user.id, 5, buffered=True)
                 return await self.level_up(user)
         # else:
         #     return await self.insert_user(user.id, 5, 1, current_ts, 0, time_xp - 36001)
@@ -65,14 +66,16 @@ class SlothReputation(*currency_cogs):
         """ Checks whether the user can level up.
         :param user: The user to check. """
 
-        the_user = await self.get_specific_user(user.id)
-        lvl_end = int(the_user[0][1] ** (1 / 5))
-        if the_user[0][2] < lvl_end:
-            await self.client.get_cog('SlothCurrency').update_user_money(user.id, (the_user[0][2] + 1) * 5)
-            await self.update_user_lvl(user.id)
-            await self.update_user_score_points(user.id, 100)
+        xp_state = await self.get_user_xp_state(user.id)
+        if not xp_state:
+            return
+
+        _, xp, lvl = xp_state
+        lvl_end = int(xp ** (1 / 5))
+        if lvl < lvl_end:
+            await self.update_user_level_up(user.id, money=(lvl + 1) * 5, score_points=100)
             channel = discord.utils.get(user.guild.channels, id=commands_channel_id)
-            return await channel.send(f"**{user.mention} has leveled up to lvl {the_user[0][2] + 1}! <:zslothrich:701157794686042183> Here's {(the_user[0][2] + 1) * 5}łł! <:zslothrich:701157794686042183>**")
+            return await channel.send(f"**{user.mention} has leveled up to lvl {lvl + 1}! <:zslothrich:701157794686042183> Here's {(lvl + 1) * 5}łł! <:zslothrich:701157794686042183>**")
 
 
     async def get_progress_bar(self, lvl: int, xp: int, goal_xp, length_progress_bar: int = 17) -> str:
@@ -129,7 +132,7 @@ class SlothReputation(*currency_cogs):
         view.add_item(discord.ui.Button(style=5, label="Create Account", emoji="🦥", url="https://languagesloth.com/profile/update"))
 
         # Gets users ranking info, such as level and experience points
-        user = await self.get_specific_user(member.id)
+        user = await self.get_specific_user(member.id, flush=True)
         if not user:
             if author.id == member.id:
                 return await answer( 
@@ -165,7 +168,7 @@ class SlothReputation(*currency_cogs):
         position = [it for subpos in position for it in subpos] if position else ['??', 0]
 
         # Gets user Server Activity info, such as messages sent and time in voice channels
-        user_info = await SlothCurrency.get_user_activity_info(member.id)
+        user_info = await SlothCurrency.get_user_activity_info(member.id, flush=True)
         if not user_info and member.id == author.id:
             return await answer(f"**For some reason you are not in the system, {author.mention}! Try again**")
 
@@ -14,7 +14,9 @@ from extra import utils
 from extra.menu import (ConfirmSkill, SwitchSavedClasses,
                         SwitchSavedClassesButtons, prompt_message,
                         prompt_message_guild)
+from extra.message_pipeline import MessageContext, message_handler
 from extra.prompt.menu import ConfirmButton
+from extra.voice_events import VoiceEvent, VoiceTransition, voice_handler
 from extra.useful_variables import different_class_roles
 from mysqldb import DatabaseCore
 from extra import utils
@@ -114,12 +116,11 @@ class TeacherFeedback(commands.Cog):
                 await msg.edit(embed=done_embed, delete_after=3)
                 return await self.reward_accepted_students(payload.member, all_formated_users)
 
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        if not message.guild:
-            return
+    @message_handler(priority=60)
+    async def on_message(self, message: discord.Message, context: MessageContext) -> None:
+        """ Updates the students' message counters in active classes. """
 
-        if message.author.bot:
+        if not context.is_guild_member_message:
             return
 
         if isinstance(message.channel, discord.Thread):
@@ -145,28 +146,14 @@ class TeacherFeedback(commands.Cog):
             if await self.db.get_student_by_vc_id(member.id, the_class_vc[2]):
                 await self.db.update_student_messages(member.id, the_class_vc[2])
 
-    @commands.Cog.listener(name="on_voice_state_update")
-    async def on_voice_state_update_public(self, member, before, after) -> None:
+    @voice_handler(VoiceTransition.JOIN, VoiceTransition.SWITCH, VoiceTransition.LEAVE, priority=60)
+    async def on_voice_state_update_public(self, member, before, after, event: VoiceEvent) -> None:
         """ For when teachers are creating language class channels
         or for when students are joining the classes. """
 
         if member.bot:
             return
 
-        # Check voice states
-        if before.mute != after.mute:
-            return
-        if before.deaf != before.deaf:
-            return
-        if before.self_mute != after.self_mute:
-            return
-        if before.self_deaf != after.self_deaf:
-            return
-        if before.self_stream != after.self_stream:
-            return
-        if before.self_video != after.self_video:
-            return
-
         # Get before/after channels and their categories
         bc = before.channel
         ac = after.channel
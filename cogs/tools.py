@@ -25,8 +25,10 @@ from treelib import Tree
 # import.local
 from extra import utils
 from extra.menu import InchannelLooping, InroleLooping
+from extra.message_pipeline import MessageContext, message_handler
 from extra.prompt.menu import Confirm
 from extra.select import SoundBoardSelect
+from extra.voice_events import VoiceEvent, VoiceTransition, voice_handler
 from extra.slothclasses.player import Player
 from extra.tool.stealthstatus import StealthStatusTable
 from extra.useful_variables import patreon_roles
@@ -73,25 +75,11 @@ class Tools(*tool_cogs):
 		
 		print('[.cogs] Tools cog is ready!')
 
-	@commands.Cog.listener()
-	async def on_voice_state_update(self, member, before, after) -> None:
+	@voice_handler(VoiceTransition.JOIN, VoiceTransition.SWITCH, VoiceTransition.LEAVE, priority=70)
+	async def on_voice_state_update(self, member, before, after, event: VoiceEvent) -> None:
 		""" Removes the 'in a VC' role from people who are in the stealth mode,
 		upon joining VCs. """
 
-		# Check voice states
-		if before.mute != after.mute:
-			return
-		if before.deaf != before.deaf:
-			return
-		if before.self_mute != after.self_mute:
-			return
-		if before.self_deaf != after.self_deaf:
-			return
-		if before.self_stream != after.self_stream:
-			return
-		if before.self_video != after.self_video:
-			return
-
 		role = discord.utils.get(member.guild.roles, id=in_a_vc_role_id)  # Replace with your role name
 
 		if after.channel:  # User joins a voice channel
@@ -107,11 +95,11 @@ class Tools(*tool_cogs):
 		else:  # User leaves a voice channel
 			await member.remove_roles(role)
 
-	@commands.Cog.listener()
-	async def on_message(self, message) -> None:
+	@message_handler(priority=70)
+	async def on_message(self, message: discord.Message, context: MessageContext) -> None:
 		""" Reacts to messages sent in Lesson Announcement channels. """
 		
-		if not message.guild:
+		if not context.guild:
 			return
 
 		channel = message.channel
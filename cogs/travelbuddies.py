@@ -9,6 +9,7 @@ from discord.ext import commands
 
 # import.local
 from extra import utils
+from extra.message_pipeline import MessageContext, message_handler
 from extra.modals import TravelBuddyModal
 from extra.prompt.menu import ConfirmButton
 
@@ -34,8 +35,8 @@ class TravelBuddies(commands.Cog):
 
         print("[.cogs] TravelBuddies cog is ready!")
 
-    @commands.Cog.listener()
-    async def on_message(self, message) -> None:
+    @message_handler(priority=20)
+    async def on_message(self, message: discord.Message, context: MessageContext) -> None:
         """ Deletes any normal message sent by normal users
         in the travel-buddies channel. """
 
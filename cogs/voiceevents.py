@@ -0,0 +1,82 @@
+# import.standard
+import asyncio
+import os
+from typing import Dict
+
+# import.thirdparty
+import discord
+from discord.ext import commands, tasks
+
+# import.local
+from extra import utils
+from extra.handler_registry import HandlerRegistry, make_stats_embed
+from extra.voice_events import VoiceEvent, voice_writes
+
+# variables.voicechannel
+voice_events_flush_seconds = float(os.getenv('VOICE_EVENTS_FLUSH_SECONDS', 2))
+
+
+class VoiceEvents(commands.Cog):
+    """ Normalizes each voice state update once and dispatches it to the cogs' voice handlers,
+    flushing their batched writes once per tick. """
+
+    def __init__(self, client: commands.Bot) -> None:
+        """ Class init method. """
+
+        self.client = client
+        self.registry = HandlerRegistry(client, "__voice_handler_priority__", "VoiceEvents")
+        # transition name -> events
+        self.transitions: Dict[str, int] = {}
+
+    @commands.Cog.listener()
+    async def on_ready(self) -> None:
+        """ Tells when the cog is ready to go. """
+
+        if not self.flush_voice_writes.is_running():
+            self.flush_voice_writes.start()
+        print("[.cogs] VoiceEvents cog is ready!")
+
+    @commands.Cog.listener()
+    async def on_voice_state_update(self, member: discord.Member, before: discord.VoiceState, after: discord.VoiceState) -> None:
+        """ Runs the handlers subscribed to any of the event's transitions, concurrently,
+        so one waiting on a prompt, e.g. a teacher leaving a class, doesn't hold the others back. """
+
+        event = VoiceEvent(member, before, after, await utils.get_timestamp())
+        if not event.kinds:
+            return
+
+        for kind in event.kinds:
+            self.transitions[kind.value] = self.transitions.get(kind.value, 0) + 1
+
+        await asyncio.gather(*(
+            self.registry.run(name, handler, member, before, after, event)
+            for _, name, handler in self.registry.get_handlers()
+            if not handler.__voice_handler_kinds__.isdisjoint(event.kinds)
+        ))
+
+    @tasks.loop(seconds=voice_events_flush_seconds)
+    async def flush_voice_writes(self) -> None:
+        """ Writes the rows the voice handlers queued since the last tick. """
+
+        await voice_writes.flush()
+
+    @commands.command(hidden=True, aliases=["ves"])
+    @commands.has_permissions(administrator=True)
+    async def voice_event_stats(self, ctx) -> None:
+        """ (ADM) Shows the voice handlers, in order, with their timings, and the batched writes. """
+
+        transitions = ', '.join(f"{kind}: {count}" for kind, count in sorted(self.transitions.items())) or 'None yet.'
+        writes = (
+            f"{voice_writes.rows} rows in {voice_writes.statements} statements over {voice_writes.flushes} flushes"
+            f" | {len(voice_writes)} pending")
+
+        embed = make_stats_embed(ctx, "Voice Events", self.registry.get_timing_lines())
+        embed.add_field(name="Transitions", value=transitions, inline=False)
+        embed.add_field(name="Batched Writes", value=writes, inline=False)
+        await ctx.send(embed=embed)
+
+
+def setup(client: commands.Bot) -> None:
+    """ Cog's setup function. """
+
+    client.add_cog(VoiceEvents(client))
@@ -7,7 +7,7 @@ from discord.ext import commands
 
 # import.local
 from extra import utils
-from mysqldb import DatabaseCore
+from mysqldb import DatabaseCore, counter_buffer
 
 class SlothAnalyticsTable(commands.Cog):
     """ Class for managing the SlothAnalytics table in the database. """
@@ -72,7 +72,7 @@ class SlothAnalyticsTable(commands.Cog):
     async def update_messages(self) -> None:
         """ Updates the message counting. """
 
-        await self.db.execute_query("UPDATE SlothAnalytics SET messages_sent = messages_sent + 1")
+        await counter_buffer.increment("SlothAnalytics", "messages_sent")
 
     async def update_day(self, day: str) -> None:
         """ Updates the day.
@@ -93,6 +93,7 @@ class SlothAnalyticsTable(commands.Cog):
     async def get_info(self) -> List[int]:
         """ Gets the analytics info. """
 
+        await counter_buffer.flush()
         return await self.db.execute_query("SELECT * from SlothAnalytics", fetch="one")
 
 
@@ -1,16 +1,21 @@
 # import.standard
-from typing import List, Union
+from collections import OrderedDict
+from typing import List, Optional, Union
 
 # import.thirdparty
 import discord
 from discord.ext import commands
 
 # import.local
-from mysqldb import DatabaseCore
+from mysqldb import DatabaseCore, counter_buffer
 
 class MembersScoreTable(commands.Cog):
     """ Class for the MembersScore table in the database. """
 
+    # user_id -> [user_xp_time, user_xp, user_lvl], kept in sync with the writes below
+    _xp_states: "OrderedDict[int, List[int]]" = OrderedDict()
+    XP_STATES_MAX_SIZE: int = 10000
+
     def __init__(self, client: commands.Bot) -> None:
         """ Class init method. """
 
@@ -58,6 +63,7 @@ class MembersScoreTable(commands.Cog):
             return await ctx.send(f"**The `MembersScore` table doesn't exist yet, {member.mention}!**")
 
         await self.db.execute_query("DELETE FROM MembersScore")
+        MembersScoreTable._xp_states.clear()
 
         await ctx.send(f"**Table `MembersScore` reset, {member.mention}!**")
 
@@ -78,18 +84,47 @@ class MembersScoreTable(commands.Cog):
         :param rep_time: The initial rep timestamp. """
 
         await self.db.execute_query("INSERT INTO MembersScore VALUES (%s, %s, %s, %s, %s, %s)", (user_id, xp, lvl, xp_time, score_points, rep_time))
+        MembersScoreTable._xp_states.pop(user_id, None)
 
     # ===== SELECT =====
 
-    async def get_specific_user(self, user_id: int) -> List[List[int]]:
+    async def get_specific_user(self, user_id: int, flush: bool = False) -> List[List[int]]:
         """ Gets a specifc user from the MembersScore table.
-        :param user_id: The ID of the user to get. """
+        :param user_id: The ID of the user to get.
+        :param flush: Whether to write the buffered counters first, so the XP is up to date. [Optional][Default=False] """
 
+        if flush:
+            await counter_buffer.flush()
         return await self.db.execute_query("SELECT * FROM MembersScore WHERE user_id = %s", (user_id,), fetch="all")
 
+    async def get_user_xp_state(self, user_id: int) -> Optional[List[int]]:
+        """ Gets the user's XP time, XP and level from the in-memory XP states,
+        loading it from the MembersScore table (plus the buffered values) if not cached.
+        :param user_id: The ID of the user to get. """
+
+        if xp_state := MembersScoreTable._xp_states.get(user_id):
+            MembersScoreTable._xp_states.move_to_end(user_id)
+            return xp_state
+
+        the_user = await self.db.execute_query(
+            "SELECT user_xp_time, user_xp, user_lvl FROM MembersScore WHERE user_id = %s", (user_id,), fetch="one")
+        if not the_user:
+            return None
+
+        xp_time, xp, lvl = the_user
+        xp_increment, _ = counter_buffer.peek("MembersScore", "user_xp", "user_id", user_id)
+        _, buffered_xp_time = counter_buffer.peek("MembersScore", "user_xp_time", "user_id", user_id)
+        xp_state = [buffered_xp_time if buffered_xp_time is not None else xp_time, xp + xp_increment, lvl]
+
+        MembersScoreTable._xp_states[user_id] = xp_state
+        if len(MembersScoreTable._xp_states) > MembersScoreTable.XP_STATES_MAX_SIZE:
+            MembersScoreTable._xp_states.popitem(last=False)
+        return xp_state
+
     async def get_member_scores(self) -> List[List[int]]:
         """ Gets all users from the MembersScore table. """
 
+        await counter_buffer.flush()
         return await self.db.execute_query("SELECT * FROM MembersScore", fetch="all")
 
     async def get_top_ten_users(self) -> List[List[int]]:
@@ -100,6 +135,7 @@ class MembersScoreTable(commands.Cog):
     async def get_top_ten_xp_users(self) -> List[List[int]]:
         """ Gets the top ten users with most experience points. """
 
+        await counter_buffer.flush()
         return await self.db.execute_query("SELECT * FROM MembersScore ORDER BY user_xp DESC LIMIT 10", fetch="all")
 
     async def get_all_users_by_score_points(self) -> List[List[int]]:
@@ -110,6 +146,7 @@ class MembersScoreTable(commands.Cog):
     async def get_all_users_by_xp(self) -> List[List[int]]:
         """ Gets all users from the MembersScore table ordered by XP. """
 
+        await counter_buffer.flush()
         return await self.db.execute_query("SELECT * FROM MembersScore ORDER BY user_xp DESC", fetch="all")
 
     # ===== UPDATE =====
@@ -118,26 +155,57 @@ class MembersScoreTable(commands.Cog):
         :param user_id: The ID of the user to clear. """
 
         await self.db.execute_query("UPDATE MembersScore SET user_xp = 0, user_lvl = 1 WHERE user_id = %s", (user_id,))
+        MembersScoreTable._xp_states.pop(user_id, None)
 
-    async def update_user_xp(self, user_id: int, xp: int) -> None:
+    async def update_user_xp(self, user_id: int, xp: int, buffered: bool = False) -> None:
         """ Updates the user Xp in the MembersScore table.
         :param user_id: The ID of the user to update.
-        :pram xp: The XP incremention value to apply. """
+        :pram xp: The XP incremention value to apply.
+        :param buffered: Whether to coalesce the increment in the write-behind buffer. [Optional][Default=False] """
+
+        if buffered:
+            if xp_state := MembersScoreTable._xp_states.get(user_id):
+                xp_state[1] += xp
+            return await counter_buffer.increment("MembersScore", "user_xp", xp, "user_id", user_id)
 
         await self.db.execute_query("UPDATE MembersScore SET user_xp = user_xp + %s WHERE user_id = %s", (xp, user_id))
+        MembersScoreTable._xp_states.pop(user_id, None)
 
     async def update_user_lvl(self, user_id: int) -> None:
         """ Updates the user level in the MembersScore table.
         :param user_id: The ID of the user to update the level. """
 
         await self.db.execute_query("UPDATE MembersScore set user_lvl = user_lvl + 1 WHERE user_id = %s", (user_id,))
+        MembersScoreTable._xp_states.pop(user_id, None)
+
+    async def update_user_level_up(self, user_id: int, money: int, score_points: int) -> None:
+        """ Levels the user up and gives them their money and score points rewards, all in a single statement.
+        :param user_id: The ID of the user who leveled up.
+        :param money: The money reward to add to the user's UserCurrency.
+        :param score_points: The score points to add to the user. """
 
-    async def update_user_xp_time(self, user_id: int, time: int) -> None:
+        await self.db.execute_query("""
+            UPDATE MembersScore AS MS
+            LEFT JOIN UserCurrency AS UC ON UC.user_id = MS.user_id
+            SET MS.user_lvl = MS.user_lvl + 1, MS.score_points = MS.score_points + %s, UC.user_money = UC.user_money + %s
+            WHERE MS.user_id = %s""", (score_points, money, user_id))
+
+        if xp_state := MembersScoreTable._xp_states.get(user_id):
+            xp_state[2] += 1
+
+    async def update_user_xp_time(self, user_id: int, time: int, buffered: bool = False) -> None:
         """ Updates the user XP time in the MembersScore table.
         :param user_id: The ID of the user to update.
-        :param time: The current timestamp. """
+        :param time: The current timestamp.
+        :param buffered: Whether to defer the write to the write-behind buffer. [Optional][Default=False] """
+
+        if buffered:
+            if xp_state := MembersScoreTable._xp_states.get(user_id):
+                xp_state[0] = time
+            return await counter_buffer.set("MembersScore", "user_xp_time", time, "user_id", user_id)
 
         await self.db.execute_query("UPDATE MembersScore SET user_xp_time = %s WHERE user_id = %s", (time, user_id))
+        MembersScoreTable._xp_states.pop(user_id, None)
 
     async def update_user_score_points(self, user_id: int, score_points: int) -> None:
         """ Updates the user's score points in the MembersScore table.
@@ -160,3 +228,4 @@ class MembersScoreTable(commands.Cog):
         :param user_id: The ID of the user to remove. """
 
         await self.db.execute_query("DELETE FROM MembersScore WHERE user_id = %s", (user_id,))
+        MembersScoreTable._xp_states.pop(user_id, None)
@@ -0,0 +1,399 @@
+# import.standard
+import asyncio
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache, partial
+from io import BytesIO
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# import.thirdparty
+from PIL import Image, ImageDraw, ImageFont
+
+# variables.profile
+profile_layer_cache_size = int(os.getenv('PROFILE_LAYER_CACHE_SIZE', 256))
+profile_cache_memory_bytes = int(os.getenv('PROFILE_CACHE_MEMORY_BYTES', 33554432))
+profile_cache_disk_bytes = int(os.getenv('PROFILE_CACHE_DISK_BYTES', 268435456))
+
+PROFILE_FONT = "built titling sb.ttf"
+PROFILE_CACHE_PATH = "media/profile_cache"
+
+
+@lru_cache(maxsize=None)
+def get_font(size: int) -> ImageFont.FreeTypeFont:
+    """ Gets the profile font in a given size, loading it from disk only once.
+    :param size: The size of the font. """
+
+    return ImageFont.truetype(PROFILE_FONT, size)
+
+
+class ProfileLayerCache:
+    """ LRU cache of decoded, mode-converted images keyed by path and modification time,
+    so the profile layers are read from disk once instead of on every profile.
+
+    The images are shared between renders, so they must only be pasted or copied, never drawn on. """
+
+    def __init__(self, max_size: int) -> None:
+        """ Class init method.
+        :param max_size: The maximum amount of images to keep. """
+
+        self.max_size = max_size
+        # (path, size, mode) -> (modification time, image)
+        self._images: Dict[Tuple, Tuple[float, Image.Image]] = OrderedDict()
+        # Renders run in executor threads
+        self._lock = threading.Lock()
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def get(self, path: str, size: Optional[Tuple[int, int]] = None, mode: str = 'RGBA') -> Image.Image:
+        """ Gets a decoded image.
+        :param path: The path of the image.
+        :param size: The size to resize it to. [Optional]
+        :param mode: The mode to convert it to. [Optional][Default='RGBA'] """
+
+        mtime = os.path.getmtime(path)
+        key = (path, size, mode)
+        with self._lock:
+            cached = self._images.get(key)
+            if cached and cached[0] == mtime:
+                self._images.move_to_end(key)
+                self.hits += 1
+                return cached[1]
+
+        image = Image.open(path)
+        if size:
+            image = image.resize(size)
+        image = image.convert(mode)
+
+        with self._lock:
+            self.misses += 1
+            self._images[key] = (mtime, image)
+            self._images.move_to_end(key)
+            while len(self._images) > self.max_size:
+                self._images.popitem(last=False)
+
+        return image
+
+    def clear(self) -> None:
+        """ Empties the cache. """
+
+        with self._lock:
+            self._images.clear()
+
+
+class ProfileRenderer:
+    """ Composes profile images off the event loop from cached layers. """
+
+    def __init__(self) -> None:
+        """ Class init method. """
+
+        self.layers = ProfileLayerCache(profile_layer_cache_size)
+
+    def compose(self,
+        layers: List[str], badges: List[Tuple[str, Tuple[int, int], Optional[Tuple[int, int]]]],
+        pfp: Optional[Image.Image], texts: List[Tuple[Tuple[int, int], str]],
+        font_size: int = 45, fill: Tuple[int, int, int] = (255, 255, 255)
+    ) -> Image.Image:
+        """ Composes a profile image. It's blocking, so it should run in an executor.
+        :param layers: The paths of the full-size layers, from the background up.
+        :param badges: The (path, position, size to resize it to) of each badge.
+        :param pfp: The user's profile picture, if any.
+        :param texts: The (position, text) of each text.
+        :param font_size: The size of the texts. [Optional][Default=45]
+        :param fill: The colour of the texts. [Optional][Default=White] """
+
+        background = self.layers.get(layers[0]).copy()
+        for path in layers[1:]:
+            layer = self.layers.get(path)
+            background.paste(layer, (0, 0), layer)
+
+        for path, position, size in badges:
+            badge = self.layers.get(path, size)
+            background.paste(badge, position, badge)
+
+        # Tries to print the user's profile picture
+        if pfp:
+            try:
+                background.paste(pfp, (201, 2), pfp)
+            except Exception:
+                pass
+
+        draw = ImageDraw.Draw(background)
+        font = get_font(font_size)
+        for position, text in texts:
+            draw.text(position, text, fill, font=font)
+
+        return background
+
+    async def render(self, *args, **kwargs) -> Image.Image:
+        """ Composes a profile image in an executor. Takes the same arguments as compose. """
+
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, partial(self.compose, *args, **kwargs))
+
+    async def to_bytes(self, image: Image.Image, format: str = 'png') -> BytesIO:
+        """ Encodes an image in memory, in an executor.
+        :param image: The image to encode.
+        :param format: The format to encode it in. [Optional][Default='png'] """
+
+        def encode() -> BytesIO:
+            buffer = BytesIO()
+            image.save(buffer, format)
+            buffer.seek(0)
+            return buffer
+
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, encode)
+
+
+class RenderedProfileCache:
+    """ Two-tier cache of rendered profile files, keyed by a hash of everything the render depends on,
+    so a repeated profile skips the avatar download and PIL entirely.
+
+    Since the key changes whenever any input does, an entry is never stale; invalidating a user
+    just frees the entries that can no longer be hit. Both tiers evict the least recently used entries
+    once they go over their size in bytes. """
+
+    def __init__(self, memory_bytes: int, disk_bytes: int, path: str = PROFILE_CACHE_PATH) -> None:
+        """ Class init method.
+        :param memory_bytes: The maximum size of the memory tier.
+        :param disk_bytes: The maximum size of the disk tier.
+        :param path: The folder of the disk tier. [Optional][Default=PROFILE_CACHE_PATH] """
+
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.path = path
+        # digest -> (user ID, extension, data)
+        self._memory: Dict[str, Tuple[int, str, bytes]] = OrderedDict()
+        self._memory_size: int = 0
+        # digest -> (user ID, file path, size)
+        self._disk: Dict[str, Tuple[int, str, int]] = OrderedDict()
+        self._disk_size: int = 0
+        self._disk_loaded: bool = False
+        self._disk_lock: Optional[asyncio.Lock] = None
+        # user ID -> digests in either tier
+        self._user_digests: Dict[int, Set[str]] = {}
+        self.memory_hits: int = 0
+        self.disk_hits: int = 0
+        self.misses: int = 0
+
+    @staticmethod
+    def make_key(user_id: int, *inputs: Any) -> str:
+        """ Hashes a user's render inputs into a cache key.
+        :param user_id: The ID of the user.
+        :param inputs: Everything the render depends on, made of reprable builtins. """
+
+        return hashlib.sha256(repr((user_id,) + inputs).encode()).hexdigest()
+
+    @staticmethod
+    def get_file_versions(paths: List[str]) -> List[Tuple[str, float]]:
+        """ Gets the modification time of each file a render reads, so replacing a file
+        under the same name changes the cache key, as in ProfileLayerCache.
+        :param paths: The paths of the files. """
+
+        return [(path, os.path.getmtime(path)) for path in paths]
+
+    async def get(self, digest: str) -> Optional[Tuple[bytes, str]]:
+        """ Gets a rendered file and its extension.
+        :param digest: The cache key. """
+
+        if entry := self._memory.get(digest):
+            self._memory.move_to_end(digest)
+            self.memory_hits += 1
+            return entry[2], entry[1]
+
+        await self._load_disk()
+        if not (entry := self._disk.get(digest)):
+            self.misses += 1
+            return None
+
+        user_id, file_path, _ = entry
+        loop = asyncio.get_event_loop()
+        try:
+            data = await loop.run_in_executor(None, self._read_file, file_path)
+        except OSError:
+            self._drop(digest)
+            self.misses += 1
+            return None
+
+        if digest in self._disk:
+            self._disk.move_to_end(digest)
+        extension = file_path.rsplit('.', 1)[-1]
+        self._put_memory(user_id, digest, extension, data)
+        self.disk_hits += 1
+        return data, extension
+
+    async def put(self, user_id: int, digest: str, data: bytes, extension: str) -> None:
+        """ Stores a rendered file in both tiers.
+        :param user_id: The ID of the user.
+        :param digest: The cache key.
+        :param data: The rendered file.
+        :param extension: The extension of the file. """
+
+        self._put_memory(user_id, digest, extension, data)
+
+        await self._load_disk()
+        file_path = f"{self.path}/{user_id}_{digest}.{extension}"
+        loop = asyncio.get_event_loop()
+        try:
+            await loop.run_in_executor(None, self._write_file, file_path, data)
+        except OSError as e:
+            return print(f"[ProfileCache] Couldn't write {file_path}: {e}")
+
+        if digest in self._disk:
+            self._disk_size -= self._disk.pop(digest)[2]
+        self._disk[digest] = (user_id, file_path, len(data))
+        self._disk_size += len(data)
+        self._user_digests.setdefault(user_id, set()).add(digest)
+
+        removed = []
+        while self._disk_size > self.disk_bytes and self._disk:
+            old_digest, (old_user_id, old_path, size) = self._disk.popitem(last=False)
+            self._disk_size -= size
+            removed.append(old_path)
+            if old_digest not in self._memory:
+                self._forget(old_user_id, old_digest)
+
+        if removed:
+            await loop.run_in_executor(None, self._remove_files, removed)
+
+    def invalidate(self, *user_ids: int) -> None:
+        """ Drops the cached renders of users whose profile changed.
+        :param user_ids: The IDs of the users. """
+
+        removed = []
+        for user_id in user_ids:
+            for digest in self._user_digests.pop(user_id, set()):
+                if entry := self._memory.pop(digest, None):
+                    self._memory_size -= len(entry[2])
+                if entry := self._disk.pop(digest, None):
+                    self._disk_size -= entry[2]
+                    removed.append(entry[1])
+
+        if removed:
+            asyncio.get_event_loop().run_in_executor(None, self._remove_files, removed)
+
+    async def clear(self) -> None:
+        """ Drops every cached render from both tiers, e.g. after the item images are downloaded again. """
+
+        await self._load_disk()
+        removed = [file_path for _, file_path, _ in self._disk.values()]
+        self._memory.clear()
+        self._memory_size = 0
+        self._disk.clear()
+        self._disk_size = 0
+        self._user_digests.clear()
+
+        if removed:
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(None, self._remove_files, removed)
+
+    def _put_memory(self, user_id: int, digest: str, extension: str, data: bytes) -> None:
+        """ Stores a rendered file in the memory tier, evicting the least recently used ones over its size.
+        :param user_id: The ID of the user.
+        :param digest: The cache key.
+        :param extension: The extension of the file.
+        :param data: The rendered file. """
+
+        if len(data) > self.memory_bytes:
+            return
+
+        if digest in self._memory:
+            self._memory_size -= len(self._memory.pop(digest)[2])
+        self._memory[digest] = (user_id, extension, data)
+        self._memory_size += len(data)
+        self._user_digests.setdefault(user_id, set()).add(digest)
+
+        while self._memory_size > self.memory_bytes:
+            old_digest, (old_user_id, _, old_data) = self._memory.popitem(last=False)
+            self._memory_size -= len(old_data)
+            if old_digest not in self._disk:
+                self._forget(old_user_id, old_digest)
+
+    def _drop(self, digest: str) -> None:
+        """ Drops a digest whose file is gone from the disk tier.
+        :param digest: The cache key. """
+
+        if entry := self._disk.pop(digest, None):
+            self._disk_size -= entry[2]
+            if digest not in self._memory:
+                self._forget(entry[0], digest)
+
+    def _forget(self, user_id: int, digest: str) -> None:
+        """ Removes a digest that's in neither tier anymore from its user's digests.
+        :param user_id: The ID of the user.
+        :param digest: The cache key. """
+
+        if digests := self._user_digests.get(user_id):
+            digests.discard(digest)
+            if not digests:
+                del self._user_digests[user_id]
+
+    async def _load_disk(self) -> None:
+        """ Indexes the files the disk tier already has, oldest first, the first time it's used. """
+
+        if self._disk_loaded:
+            return
+
+        if not self._disk_lock:
+            self._disk_lock = asyncio.Lock()
+
+        async with self._disk_lock:
+            if self._disk_loaded:
+                return
+
+            loop = asyncio.get_event_loop()
+            files = await loop.run_in_executor(None, self._scan_files)
+            for file_path, size, _ in sorted(files, key=lambda file: file[2]):
+                name = os.path.basename(file_path).rsplit('.', 1)[0]
+                user_id, _, digest = name.partition('_')
+                if not user_id.isdigit() or not digest:
+                    continue
+                self._disk[digest] = (int(user_id), file_path, size)
+                self._disk_size += size
+                self._user_digests.setdefault(int(user_id), set()).add(digest)
+
+            self._disk_loaded = True
+
+    def _scan_files(self) -> List[Tuple[str, int, float]]:
+        """ Gets the path, size and modification time of each file in the disk tier. """
+
+        os.makedirs(self.path, exist_ok=True)
+        files = []
+        with os.scandir(self.path) as entries:
+            for entry in entries:
+                if entry.is_file() and not entry.name.endswith('.tmp'):
+                    stat = entry.stat()
+                    files.append((entry.path, stat.st_size, stat.st_mtime))
+        return files
+
+    @staticmethod
+    def _read_file(file_path: str) -> bytes:
+        """ Reads a file. """
+
+        with open(file_path, 'rb') as f:
+            return f.read()
+
+    @staticmethod
+    def _write_file(file_path: str, data: bytes) -> None:
+        """ Writes a file atomically, so a reader never gets half of it. """
+
+        temp_path = f"{file_path}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, file_path)
+
+    @staticmethod
+    def _remove_files(file_paths: List[str]) -> None:
+        """ Removes files, ignoring the ones that are already gone. """
+
+        for file_path in file_paths:
+            try:
+                os.remove(file_path)
+            except OSError:
+                pass
+
+
+profile_renderer = ProfileRenderer()
+rendered_profiles = RenderedProfileCache(profile_cache_memory_bytes, profile_cache_disk_bytes)
@@ -5,6 +5,10 @@ from typing import List, Tuple
 import discord
 from discord.ext import commands
 
+# import.local
+from extra.currency.profilerenderer import rendered_profiles
+from mysqldb import counter_buffer
+
 class UserCurrencyTable:
     """ Class for the UserCurrency table in the database. """
 
@@ -78,6 +82,7 @@ class UserCurrencyTable:
     async def get_top_ten_time_users(self) -> List[List[int]]:
         """ Gets the top ten users with the most time. """
 
+        await counter_buffer.flush()
         return await self.db.execute_query("SELECT * FROM UserServerActivity ORDER BY user_time DESC LIMIT 10", fetch="all")
 
     async def get_all_leaves_users(self) -> List[List[int]]:
@@ -94,6 +99,7 @@ class UserCurrencyTable:
     async def get_all_time_users(self) -> List[List[int]]:
         """ Gets all users with the most time. """
 
+        await counter_buffer.flush()
         return await self.db.execute_query("SELECT * FROM UserServerActivity ORDER BY user_time DESC", fetch="all")
 
     # ===== INSERT =====
@@ -112,6 +118,7 @@ class UserCurrencyTable:
         :param money: The money addition. (It can be negative)"""
 
         await self.db.execute_query("UPDATE UserCurrency SET user_money = user_money + %s WHERE user_id = %s", (money, user_id))
+        rendered_profiles.invalidate(user_id)
 
     async def update_user_premium_money(self, user_id: int, money: int) -> None:
         """ Updates the user money.
@@ -119,12 +126,14 @@ class UserCurrencyTable:
         :param premium_money: The money addition. (It can be negative)"""
 
         await self.db.execute_query("UPDATE UserCurrency SET user_premium_money = user_premium_money + %s WHERE user_id = %s", (money, user_id))
+        rendered_profiles.invalidate(user_id)
 
     async def update_user_many_money(self, users: List[Tuple[int, int]]) -> None:
         """ Updates many the money of many users.
         :param users: The users to update the money. """
 
         await self.db.execute_query("UPDATE UserCurrency SET user_money = user_money + %s WHERE user_id = %s", users, execute_many=True)
+        rendered_profiles.invalidate(*[user_id for _, user_id in users])
 
     async def update_user_purchase_ts(self, user_id: int, the_time: int) -> None:
         """ Updates the user purchase timestamp.
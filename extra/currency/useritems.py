@@ -1,11 +1,12 @@
 # import.standard
-from typing import List, Union
+from typing import Dict, List, Union
 
 # import.thirdparty
 import discord
 from discord.ext import commands
 
 # import.local
+from extra.currency.profilerenderer import rendered_profiles
 from mysqldb import DatabaseCore
 
 class UserItemsTable(commands.Cog):
@@ -85,6 +86,7 @@ class UserItemsTable(commands.Cog):
 
         await self.db.execute_query("INSERT INTO UserItems (user_id, item_name, enable, item_type, image_name) VALUES (%s, %s, %s, %s, %s)",
                                (user_id, item_name.title(), enable, item_type.lower(), item_image))
+        rendered_profiles.invalidate(user_id)
 
     # ===== DELETE =====
 
@@ -94,6 +96,7 @@ class UserItemsTable(commands.Cog):
         :param item_name: The name of the item to remove. """
 
         await self.db.execute_query("DELETE FROM UserItems WHERE item_name = %s and user_id = %s", (item_name, user_id))
+        rendered_profiles.invalidate(user_id)
 
     # ===== UPDATE =====
 
@@ -104,6 +107,7 @@ class UserItemsTable(commands.Cog):
         :param enable: The new state to set the item to. (equipped/unequipped) """
 
         await self.db.execute_query("UPDATE UserItems SET enable = %s WHERE user_id = %s and item_name = %s", (enable, user_id, item_name))
+        rendered_profiles.invalidate(user_id)
 
     # ===== SELECT =====
 
@@ -132,6 +136,26 @@ class UserItemsTable(commands.Cog):
             return f'./sloth_custom_images/{item_type}/{spec_type_items[1]}'
         return f'./sloth_custom_images/{item_type}/base_{item_type}.png'
 
+    async def get_user_equipped_items(self, user_id: int, item_types: List[str]) -> Dict[str, str]:
+        """ Gets the image path of the equipped item of each type from the user, with a single query.
+        :param user_id: The ID of the user from whom to get the items.
+        :param item_types: The types of the items to get.
+        :returns: A dict of item type -> image path, falling back to the base image of the type. """
+
+        equipped_items = await self.db.execute_query(
+            "SELECT item_type, image_name FROM UserItems WHERE user_id = %s and enable = 'equipped'", (user_id,),
+            fetch="all")
+
+        image_names = {}
+        for item_type, image_name in equipped_items:
+            image_names.setdefault(item_type, image_name)
+
+        return {
+            item_type: f'./sloth_custom_images/{item_type}/{image_names[item_type]}'
+            if image_names.get(item_type) else f'./sloth_custom_images/{item_type}/base_{item_type}.png'
+            for item_type in item_types
+        }
+
     async def check_user_can_equip(self, user_id: int, item_name: str) -> bool:
         """ Checks whether a user can equip a specific item.
         :param user_id: The ID of the user to check.
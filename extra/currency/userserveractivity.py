@@ -1,16 +1,21 @@
 # import.standard
 import os
-from typing import List
+from typing import List, Set
 
 # import.thirdparty
-from discord.ext import commands
+from discord.ext import commands, tasks
 
 # import.local
 from extra import utils
-from mysqldb import DatabaseCore
+from extra.currency.voicesessions import VoiceSessionTracker
+from extra.voice_events import VoiceEvent, VoiceTransition, voice_handler
+from mysqldb import DatabaseCore, counter_buffer
+
+# variables.id
+server_id = int(os.getenv('SERVER_ID', 123))
 
 # variables.voicechannel
-afk_channel_id = int(os.getenv('AFK_CHANNEL_ID', 123))
+voice_checkpoint_seconds = int(os.getenv('VOICE_CHECKPOINT_SECONDS', 60))
 
 class UserVoiceSystem(commands.Cog):
     """ Cog for the inner systems of UserVoice events. """
@@ -20,243 +25,93 @@ class UserVoiceSystem(commands.Cog):
 
         self.client = client
         self.db = DatabaseCore()
+        self.voice_sessions = VoiceSessionTracker()
+        self.voice_activity_users: Set[int] = set()
 
-    @commands.Cog.listener(name="on_voice_state_update")
-    async def on_voice_state_update_join_leave(self, member, before, after) -> None:
-        """ For when users join or leave the Voice Channel. """
+    @commands.Cog.listener(name="on_ready")
+    async def on_ready_voice_sessions(self) -> None:
+        """ Rebuilds the voice sessions of the members who are in a voice channel. """
 
-        if member.bot:
+        if not (guild := self.client.get_guild(server_id)):
             return
 
-        current_ts: int = await utils.get_timestamp()
-
-        # Get before/after channels and their categories
-        bc = before.channel
-        ac = after.channel
+        alt_graph = await self.client.get_cog('Moderation').get_alt_graph()
+        self.voice_sessions.rebuild(guild.voice_channels, alt_graph, await utils.get_timestamp())
+        if not self.checkpoint_voice_sessions.is_running():
+            self.checkpoint_voice_sessions.start()
 
-        # # Check voice states
-        if before.self_stream != after.self_stream:
-            if not before.self_stream and after.self_stream:
-                return
-            if bc == ac:
-                return
+    @voice_handler(
+        VoiceTransition.JOIN, VoiceTransition.LEAVE, VoiceTransition.SWITCH,
+        VoiceTransition.MUTE, VoiceTransition.UNMUTE, VoiceTransition.DEAFEN, VoiceTransition.UNDEAFEN,
+        VoiceTransition.SERVER_MUTE, VoiceTransition.SERVER_UNMUTE, VoiceTransition.SERVER_DEAFEN, VoiceTransition.SERVER_UNDEAFEN,
+        priority=10)
+    async def on_voice_state_update_join_leave(self, member, before, after, event: VoiceEvent) -> None:
+        """ Tracks the members' voice sessions, crediting their time on every transition. """
 
-        if before.self_video != after.self_video:
-            if not before.self_video and after.self_video:
-                return
-            if bc == ac:
-                return
+        if member.bot:
+            return
 
-        # Get before/after channels and their categories
+        # Get before/after channels
         bc = before.channel
         ac = after.channel
 
-        user_info = await self.get_user_activity_info(member.id)
-        if not user_info and not after.self_mute:
-            if ac:
-                return await self.insert_user_server_activity(member.id, 0, current_ts)
-            else:
-                return await self.insert_user_server_activity(member.id, 0)
-
-        if not user_info:
-            return
-
-        SlothClass: commands.Cog = self.client.get_cog('SlothClass')
-        Moderation: commands.Cog = self.client.get_cog('Moderation')
-
-        # Join
-        if ac and not bc:
-            if not after.self_mute and not after.self_deaf and not after.self_mute and not after.mute and not after.deaf and after.channel.id != afk_channel_id:
-                await self.update_user_server_timestamp(member.id, current_ts)
-
-        # Switch
-        elif (ac and bc) and (bc.id != ac.id):
-            alts = await Moderation.get_fake_accounts(member.id)
+        current_ts: int = event.timestamp
+        alt_graph = await self.client.get_cog('Moderation').get_alt_graph()
 
-            alts_list: List[int] = []
-            for alt in alts:
-                alts_list.append(alt[0])
-                alts_list.append(alt[1])
-
-            alts = list(set(alts_list))
-            try:
-                alts.remove(member.id)
-            except ValueError:
-                pass
-
-            people_in_vc: int = len([m for m in bc.members if not m.bot and m.id not in alts]) + 1
-            if people_in_vc < 2 or after.self_mute or after.mute or after.deaf or after.channel.id == afk_channel_id:
-                if before.self_mute:
-                    return await self.update_user_server_time(member.id, 0, None)
-                else:
-                    return await self.update_user_server_time(member.id, 0, current_ts)
-
-            if not user_info[0][3]: return
-            increment: int = current_ts - user_info[0][3]
-
-            effects = await SlothClass.get_user_effects(member)
-            if 'sabotaged' in effects:
-                increment = 0
-
-            await self.update_user_server_time(member.id, increment, current_ts)
-            await self.client.get_cog("SlothClass").complete_quest(member.id, 5, increment=increment)
+        # Leave
+        if bc and not ac:
+            self.voice_sessions.end(member.id, current_ts)
+            await counter_buffer.set("UserServerActivity", "user_timestamp", None, "user_id", member.id)
 
-        # Muted/unmuted
-        elif (ac and bc) and (bc.id == ac.id) and before.self_mute != after.self_mute:
+        # The members in both channels may have stopped or started being alone
+        if bc and bc != ac:
+            self.voice_sessions.update_channel(bc, alt_graph, current_ts)
 
-            if not after.self_mute and not after.self_deaf and not after.mute and not after.deaf and after.channel.id != afk_channel_id:
-                return await self.update_user_server_timestamp(member.id, current_ts)
-
-            alts = await Moderation.get_fake_accounts(member.id)
-            alts_list: List[int] = []
-            for alt in alts:
-                alts_list.append(alt[0])
-                alts_list.append(alt[1])
-
-            alts = list(set(alts_list))
-            try:
-                alts.remove(member.id)
-            except ValueError:
-                pass
-
-            people_in_vc: int = len([m for m in bc.members if not m.bot and m.id not in alts])
-            if people_in_vc < 2 and after.self_mute:
-                return await self.update_user_server_time(member.id, 0, None)
-
-            if not user_info[0][3]: return
-            increment: int = current_ts - user_info[0][3]
-
-            effects = await SlothClass.get_user_effects(member)
-            if 'sabotaged' in effects:
-                increment = 0
-
-            await self.update_user_server_time(member.id, increment, None)
-            await self.client.get_cog("SlothClass").complete_quest(member.id, 5, increment=increment)
-
-        # Deafened/undeafened
-        elif (ac and bc) and (bc.id == ac.id) and before.self_deaf != after.self_deaf:
-
-            if not after.self_mute and not after.self_deaf and not after.mute and not after.deaf and after.channel.id != afk_channel_id:
-                return await self.update_user_server_timestamp(member.id, current_ts)
-
-            alts = await Moderation.get_fake_accounts(member.id)
-            alts_list: List[int] = []
-            for alt in alts:
-                alts_list.append(alt[0])
-                alts_list.append(alt[1])
-
-            alts = list(set(alts_list))
-            try:
-                alts.remove(member.id)
-            except ValueError:
-                pass
-
-            people_in_vc: int = len([m for m in bc.members if not m.bot and m.id not in alts])
-            if people_in_vc < 2 and after.self_deaf:
-                return await self.update_user_server_time(member.id, 0, None)
-
-            if not user_info[0][3]: return
-            increment: int = current_ts - user_info[0][3]
-
-            effects = await SlothClass.get_user_effects(member)
-            if 'sabotaged' in effects:
-                increment = 0
-
-            await self.update_user_server_time(member.id, increment, None)
-            await self.client.get_cog("SlothClass").complete_quest(member.id, 5, increment=increment)
-
-        # Server Muted/unmuted
-        elif (ac and bc) and (bc.id == ac.id) and before.mute != after.mute:
-
-            if not after.self_mute and not after.self_deaf and not after.mute and not after.deaf and after.channel.id != afk_channel_id:
-                return await self.update_user_server_timestamp(member.id, current_ts)
-
-            alts = await Moderation.get_fake_accounts(member.id)
-            alts_list: List[int] = []
-            for alt in alts:
-                alts_list.append(alt[0])
-                alts_list.append(alt[1])
-
-            alts = list(set(alts_list))
-            try:
-                alts.remove(member.id)
-            except ValueError:
-                pass
+        if ac:
+            for session in self.voice_sessions.update_channel(ac, alt_graph, current_ts):
+                await counter_buffer.set("UserServerActivity", "user_timestamp", session.started_at, "user_id", session.member_id)
 
-            people_in_vc: int = len([m for m in bc.members if not m.bot and m.id not in alts])
-            if people_in_vc < 2 and after.mute:
-                return await self.update_user_server_time(member.id, 0, None)
+    @tasks.loop(seconds=voice_checkpoint_seconds)
+    async def checkpoint_voice_sessions(self) -> None:
+        """ Periodically saves the voice time the members have been credited with. """
 
-            if not user_info[0][3]: return
-            increment: int = current_ts - user_info[0][3]
+        await self.save_voice_sessions()
 
-            effects = await SlothClass.get_user_effects(member)
-            if 'sabotaged' in effects:
-                increment = 0
+    async def save_voice_sessions(self) -> None:
+        """ Saves the voice time the members have been credited with since the last checkpoint,
+        in a single batch through the write-behind buffer. """
 
-            await self.update_user_server_time(member.id, increment, None)
-            await self.client.get_cog("SlothClass").complete_quest(member.id, 5, increment=increment)
+        credits = self.voice_sessions.checkpoint(await utils.get_timestamp())
+        SlothClass: commands.Cog = self.client.get_cog('SlothClass')
 
-        # Server Deafened/undeafened
-        elif (ac and bc) and (bc.id == ac.id) and before.deaf != after.deaf:
+        for user_id, increment in credits.items():
+            await self.ensure_user_server_activity(user_id)
 
-            if not after.self_mute and not after.self_deaf and not after.mute and not after.deaf and after.channel.id != afk_channel_id:
-                return await self.update_user_server_timestamp(member.id, current_ts)
+            skill_actions = await SlothClass.get_cached_effect_skill_actions(user_id)
+            if 'sabotage' in skill_actions:
+                continue
 
-            alts = await Moderation.get_fake_accounts(member.id)
-            alts_list: List[int] = []
-            for alt in alts:
-                alts_list.append(alt[0])
-                alts_list.append(alt[1])
-
-            alts = list(set(alts_list))
-            try:
-                alts.remove(member.id)
-            except ValueError:
-                pass
+            await self.update_user_server_time(user_id, increment, buffered=True)
+            await SlothClass.complete_quest(user_id, 5, increment=increment)
 
-            people_in_vc: int = len([m for m in bc.members if not m.bot and m.id not in alts])
-            if people_in_vc < 2 and after.deaf:
-                return await self.update_user_server_time(member.id, 0, None)
+    async def ensure_user_server_activity(self, user_id: int) -> None:
+        """ Inserts a user into the UserServerActivity table if they are not there yet,
+        checking the database only once per user, or again next time if the check failed.
+        :param user_id: The ID of the user. """
 
-            if not user_info[0][3]: return
-            increment: int = current_ts - user_info[0][3]
+        if user_id in self.voice_activity_users:
+            return
 
-            effects = await SlothClass.get_user_effects(member)
-            if 'sabotaged' in effects:
-                increment = 0
+        try:
+            exists = await self.db.execute_query(
+                "SELECT 1 FROM UserServerActivity WHERE user_id = %s", (user_id,), fetch="one", raise_errors=True)
+        except Exception:
+            return
 
-            await self.update_user_server_time(member.id, increment, None)
-            await self.client.get_cog("SlothClass").complete_quest(member.id, 5, increment=increment)
-        
-        # Leave
-        elif bc and not ac:
-            alts = await Moderation.get_fake_accounts(member.id)
-            alts_list: List[int] = []
-            for alt in alts:
-                alts_list.append(alt[0])
-                alts_list.append(alt[1])
-
-            alts = list(set(alts_list))
-            try:
-                alts.remove(member.id)
-            except ValueError:
-                pass
-
-            
-            people_in_vc: int = len([m for m in bc.members if not m.bot and m.id not in alts]) + 1
-            if people_in_vc < 2 or before.self_mute or before.mute or before.deaf or before.channel.id == afk_channel_id:
-                return await self.update_user_server_timestamp(member.id, None)
-            
-            if not user_info[0][3]: return
-            increment: int = current_ts - user_info[0][3]
-            
-            effects = await SlothClass.get_user_effects(member)
-            if 'sabotaged' in effects:
-                increment = 0
-
-            await self.update_user_server_time(member.id, increment)
-            await self.client.get_cog("SlothClass").complete_quest(member.id, 5, increment=increment)
+        self.voice_activity_users.add(user_id)
+        if not exists:
+            session = self.voice_sessions.sessions.get(user_id)
+            await self.insert_user_server_activity(user_id, 0, session.started_at if session else None)
 
 
 class UserServerActivityTable(commands.Cog):
@@ -327,25 +182,36 @@ class UserServerActivityTable(commands.Cog):
 
     # ===== SELECT =====
 
-    async def get_user_activity_info(self, user_id: int) -> List[List[int]]:
+    async def get_user_activity_info(self, user_id: int, flush: bool = False) -> List[List[int]]:
         """ Gets a user from the UserServerActivity table.
-        :param user_id: The ID of the user to get. """
+        :param user_id: The ID of the user to get.
+        :param flush: Whether to write the buffered counters first, so the counts are up to date. [Optional][Default=False] """
 
+        if flush:
+            await counter_buffer.flush()
         return await self.db.execute_query("SELECT * FROM UserServerActivity WHERE user_id = %s", (user_id,), fetch="all")
 
     # ===== UPDATE =====
-    async def update_user_server_messages(self, user_id: int, add_msg: int) -> None:
+    async def update_user_server_messages(self, user_id: int, add_msg: int, buffered: bool = False) -> None:
         """ Updates the user's message counter.
         :param user_id: The ID of the user to update.
-        :param add_msg: The increment to apply to their current message counter. """
+        :param add_msg: The increment to apply to their current message counter.
+        :param buffered: Whether to coalesce the increment in the write-behind buffer. [Optional][Default=False] """
+
+        if buffered:
+            return await counter_buffer.increment("UserServerActivity", "user_messages", add_msg, "user_id", user_id)
 
         await self.db.execute_query("UPDATE UserServerActivity SET user_messages = user_messages + %s WHERE user_id = %s", (add_msg, user_id))
 
-    async def update_user_server_time(self, user_id: int, increment: int, current_ts: int = None) -> None:
+    async def update_user_server_time(self, user_id: int, increment: int, current_ts: int = None, buffered: bool = False) -> None:
         """ Updates the user's voice time information.
         :param user_id: The ID of the user to update.
         :param increment: The increment value in seconds to apply.
-        :param current_ts: The current timestamp. [Optional] """
+        :param current_ts: The current timestamp. [Optional]
+        :param buffered: Whether to coalesce the increment in the write-behind buffer, leaving the timestamp as is. [Optional][Default=False] """
+
+        if buffered:
+            return await counter_buffer.increment("UserServerActivity", "user_time", increment, "user_id", user_id)
 
         await self.db.execute_query("""
             UPDATE UserServerActivity SET user_time = user_time + %s, user_timestamp = %s WHERE user_id = %s
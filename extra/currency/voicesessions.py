@@ -0,0 +1,120 @@
+# import.standard
+import os
+from typing import Dict, Iterable, List, Optional
+
+# import.thirdparty
+import discord
+
+# import.local
+from extra.moderation.altgraph import AltAccountGraph
+
+# variables.voicechannel
+afk_channel_id = int(os.getenv('AFK_CHANNEL_ID', 123))
+
+
+class VoiceSession:
+    """ A member's current voice channel session. """
+
+    def __init__(self, member_id: int, channel_id: int, started_at: int) -> None:
+        """ Class init method.
+        :param member_id: The ID of the member.
+        :param channel_id: The ID of the voice channel the member is in.
+        :param started_at: The timestamp the member joined the voice channel. """
+
+        self.member_id = member_id
+        self.channel_id = channel_id
+        self.started_at = started_at
+        self.credited_at = started_at
+        self.muted: bool = False
+        self.deafened: bool = False
+        self.alone: bool = True
+
+    @property
+    def eligible(self) -> bool:
+        """ Whether the session is earning voice time. """
+
+        return not self.muted and not self.deafened and not self.alone and self.channel_id != afk_channel_id
+
+
+class VoiceSessionTracker:
+    """ In-memory state machine of the members' voice sessions. Time is credited on every
+    transition while a session is eligible and accumulates until it's checkpointed. """
+
+    def __init__(self) -> None:
+        """ Class init method. """
+
+        self.sessions: Dict[int, VoiceSession] = {}
+        # member ID -> seconds credited since the last checkpoint
+        self.credits: Dict[int, int] = {}
+
+    def _credit(self, session: VoiceSession, current_ts: int) -> None:
+        """ Credits the time since the session was last credited, if it was eligible meanwhile.
+        :param session: The voice session.
+        :param current_ts: The current timestamp. """
+
+        if session.eligible and current_ts > session.credited_at:
+            self.credits[session.member_id] = self.credits.get(session.member_id, 0) + current_ts - session.credited_at
+        session.credited_at = current_ts
+
+    def update_channel(self, channel: discord.abc.GuildChannel, alt_graph: AltAccountGraph, current_ts: int) -> List[VoiceSession]:
+        """ Credits and re-evaluates the sessions of all the members in a voice channel,
+        since someone joining or leaving changes whether the others are alone.
+        :param channel: The voice channel.
+        :param alt_graph: The fake accounts graph, so alts don't count as company.
+        :param current_ts: The current timestamp.
+        :returns: The sessions that started in the channel. """
+
+        started = []
+        humans = [member for member in channel.members if not member.bot]
+        human_ids = {member.id for member in humans}
+        for member in humans:
+            session = self.sessions.get(member.id)
+            if session and session.channel_id != channel.id:
+                # Switched channels, so the time up to now belongs to the previous one
+                self._credit(session, current_ts)
+                session.channel_id = channel.id
+            elif session:
+                self._credit(session, current_ts)
+            else:
+                session = self.sessions[member.id] = VoiceSession(member.id, channel.id, current_ts)
+                started.append(session)
+
+            voice: Optional[discord.VoiceState] = member.voice
+            session.muted = not voice or voice.self_mute or voice.mute
+            session.deafened = not voice or voice.self_deaf or voice.deaf
+            session.alone = len(human_ids - alt_graph.get_alt_ids(member.id)) < 2
+
+        return started
+
+    def end(self, member_id: int, current_ts: int) -> Optional[VoiceSession]:
+        """ Credits and ends a member's session.
+        :param member_id: The ID of the member who left.
+        :param current_ts: The current timestamp. """
+
+        if session := self.sessions.pop(member_id, None):
+            self._credit(session, current_ts)
+        return session
+
+    def rebuild(self, channels: Iterable[discord.abc.GuildChannel], alt_graph: AltAccountGraph, current_ts: int) -> None:
+        """ Starts the sessions of everyone currently in the voice channels, e.g. after a restart.
+        :param channels: The voice channels.
+        :param alt_graph: The fake accounts graph.
+        :param current_ts: The current timestamp. """
+
+        for session in self.sessions.values():
+            self._credit(session, current_ts)
+
+        self.sessions.clear()
+        for channel in channels:
+            self.update_channel(channel, alt_graph, current_ts)
+
+    def checkpoint(self, current_ts: int) -> Dict[int, int]:
+        """ Credits all the ongoing sessions and takes the accumulated seconds out.
+        :param current_ts: The current timestamp.
+        :returns: The seconds credited to each member since the last checkpoint. """
+
+        for session in self.sessions.values():
+            self._credit(session, current_ts)
+
+        credits, self.credits = self.credits, {}
+        return credits
@@ -0,0 +1,192 @@
+""" Builds the profile effect animations into sprite sheets, from the manifest in media/effects.
+
+Usage: python -m extra.effect_assets [--force] [effect ...]
+
+Each manifest entry maps an effect name to its source frames and how to prepare them:
+    "source": A GIF to split, or a glob of numbered PNG frames, relative to media/effects.
+    "transparency": The palette index of the GIF that is transparent. [Optional]
+    "background": {"key": [r, g, b], "tolerance": 0, "darken_above": null}, to make the key colour transparent
+        and, optionally, every other pixel whose red channel is above a threshold opaque black. [Optional]
+    "resize": [width, height], the size get_user_effects pastes the effect with in the profile, if it resizes it. [Optional]
+
+An effect is only rebuilt when its entry or source files change. """
+
+# import.standard
+import argparse
+import glob
+import hashlib
+import json
+import math
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+# import.thirdparty
+import numpy as np
+from PIL import Image, ImageSequence
+
+EFFECTS_PATH = 'media/effects'
+MANIFEST_PATH = f'{EFFECTS_PATH}/manifest.json'
+BUILD_PATH = f'{EFFECTS_PATH}/build'
+# Bump it whenever the output format changes, so every effect is rebuilt
+BUILD_VERSION = 2
+
+
+def load_manifest(path: str = MANIFEST_PATH) -> Dict[str, Dict[str, Any]]:
+    """ Loads the effect manifest.
+    :param path: The path of the manifest. [Optional][Default=MANIFEST_PATH] """
+
+    with open(path) as f:
+        return json.load(f)
+
+
+def get_source_files(entry: Dict[str, Any]) -> List[str]:
+    """ Gets the source files of an effect, with the numbered frames in numeric order.
+    :param entry: The effect's manifest entry. """
+
+    def frame_number(path: str) -> Tuple[int, str]:
+        numbers = re.findall(r'\d+', os.path.basename(path))
+        return (int(numbers[-1]) if numbers else 0, path)
+
+    return sorted(glob.glob(f"{EFFECTS_PATH}/{entry['source']}"), key=frame_number)
+
+
+def get_source_hash(entry: Dict[str, Any], files: List[str]) -> str:
+    """ Hashes an effect's manifest entry and source files.
+    :param entry: The effect's manifest entry.
+    :param files: The source files. """
+
+    digest = hashlib.sha256(f"{BUILD_VERSION}:{json.dumps(entry, sort_keys=True)}".encode())
+    for file_path in files:
+        digest.update(os.path.basename(file_path).encode())
+        with open(file_path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def read_frames(entry: Dict[str, Any], files: List[str]) -> List[Image.Image]:
+    """ Reads the frames of an effect as RGBA, splitting GIFs into their frames.
+    :param entry: The effect's manifest entry.
+    :param files: The source files. """
+
+    frames = []
+    for file_path in files:
+        with Image.open(file_path) as image:
+            if file_path.lower().endswith('.gif'):
+                for frame in ImageSequence.Iterator(image):
+                    frame = frame.copy()
+                    if entry.get('transparency') is not None and frame.mode == 'P':
+                        frame.info['transparency'] = entry['transparency']
+                    frames.append(frame.convert('RGBA'))
+            else:
+                frames.append(image.convert('RGBA'))
+    return frames
+
+
+def remove_background(frame: Image.Image, key: List[int], tolerance: int = 0, darken_above: Optional[int] = None) -> Image.Image:
+    """ Makes the pixels of a key colour transparent, with array masks instead of going through each pixel.
+    :param frame: The RGBA frame.
+    :param key: The RGB colour of the background.
+    :param tolerance: How far each channel can be from the key colour. [Optional][Default=0]
+    :param darken_above: The red value above which the remaining pixels are made opaque black. [Optional] """
+
+    pixels = np.array(frame)
+    rgb = pixels[..., :3].astype(np.int16)
+    background = (np.abs(rgb - np.array(key[:3], dtype=np.int16)) <= tolerance).all(axis=-1)
+
+    if darken_above is not None:
+        pixels[~background & (pixels[..., 0] > darken_above)] = (0, 0, 0, 255)
+
+    pixels[background, 3] = 0
+    return Image.fromarray(pixels, 'RGBA')
+
+
+def pack_frames(frames: List[Image.Image]) -> Tuple[Image.Image, List[List[int]]]:
+    """ Packs the visible area of each frame into a sprite sheet, in shelves from the tallest frame down.
+    :param frames: The RGBA frames.
+    :returns: The sprite sheet and the [x, y, width, height, offset x, offset y] of each frame in it. """
+
+    crops = []
+    for frame in frames:
+        bbox = frame.getchannel('A').getbbox() or (0, 0, 1, 1)
+        crops.append((frame.crop(bbox), bbox[:2]))
+
+    area = sum(crop.width * crop.height for crop, _ in crops)
+    sheet_width = max(max(crop.width for crop, _ in crops), math.ceil(math.sqrt(area)))
+
+    rects: List[Optional[List[int]]] = [None] * len(crops)
+    x = y = shelf_height = 0
+    for i in sorted(range(len(crops)), key=lambda i: -crops[i][0].height):
+        crop, (dx, dy) = crops[i]
+        if x + crop.width > sheet_width:
+            x, y, shelf_height = 0, y + shelf_height, 0
+        rects[i] = [x, y, crop.width, crop.height, dx, dy]
+        x += crop.width
+        shelf_height = max(shelf_height, crop.height)
+
+    sheet = Image.new('RGBA', (sheet_width, y + shelf_height), (0, 0, 0, 0))
+    for (crop, _), rect in zip(crops, rects):
+        sheet.paste(crop, (rect[0], rect[1]))
+
+    return sheet, rects
+
+
+def build_effect(name: str, entry: Dict[str, Any], force: bool = False) -> bool:
+    """ Builds an effect's sprite sheet and metadata, unless they're up to date.
+    :param name: The name of the effect.
+    :param entry: The effect's manifest entry.
+    :param force: Whether to rebuild it even if it's up to date. [Optional][Default=False]
+    :returns: Whether it was built. """
+
+    files = get_source_files(entry)
+    if not files:
+        raise FileNotFoundError(f"No source files match '{entry['source']}' for '{name}'")
+
+    source_hash = get_source_hash(entry, files)
+    metadata_path = f"{BUILD_PATH}/{name}.json"
+    sheet_path = f"{BUILD_PATH}/{name}.png"
+    if not force and os.path.isfile(metadata_path) and os.path.isfile(sheet_path):
+        with open(metadata_path) as f:
+            if json.load(f).get('hash') == source_hash:
+                return False
+
+    frames = read_frames(entry, files)
+    if background := entry.get('background'):
+        frames = [remove_background(frame, **background) for frame in frames]
+    if resize := entry.get('resize'):
+        frames = [frame.resize(tuple(resize)) for frame in frames]
+
+    sheet, rects = pack_frames(frames)
+    os.makedirs(BUILD_PATH, exist_ok=True)
+    sheet.save(sheet_path, optimize=True)
+    with open(metadata_path, 'w') as f:
+        json.dump({
+            'hash': source_hash,
+            'sheet': os.path.basename(sheet_path),
+            'size': list(frames[0].size),
+            'resize': resize,
+            'frames': rects,
+        }, f)
+
+    return True
+
+
+def main() -> None:
+    """ Builds the effects given in the command line, or all of them. """
+
+    parser = argparse.ArgumentParser(description="Builds the profile effect animations into sprite sheets.")
+    parser.add_argument('effects', nargs='*', help="The effects to build. [Default=All]")
+    parser.add_argument('--force', action='store_true', help="Rebuilds the effects even if they're up to date.")
+    args = parser.parse_args()
+
+    manifest = load_manifest()
+    for name in args.effects or manifest:
+        if name not in manifest:
+            parser.error(f"'{name}' isn't in {MANIFEST_PATH}")
+
+        built = build_effect(name, manifest[name], args.force)
+        print(f"{name}: {'built' if built else 'up to date'}")
+
+
+if __name__ == '__main__':
+    main()
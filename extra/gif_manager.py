@@ -1,50 +1,27 @@
 # import.standard
+import asyncio
 import glob
+import json
+import multiprocessing
 import os
-from itertools import cycle
-from typing import Any, Dict, Tuple, Union
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 # import.thirdparty
-from PIL import Image
-
-def defragment_gif(path: str, output: str) -> None:
-    """ Defragments a gif into frames.
-    :param path:
-    :param output: """
-
-    imageObject = Image.open(path)  # .convert('RGBA')
-
-    # Display individual frames from the loaded animated GIF file
-    for frame in range(0, imageObject.n_frames):
-        imageObject.seek(frame)
-        imageObject.convert('RGBA')
-        imageObject.save(f"{output}_{frame+1}.png", transparency=0)
-
-def remove_background(path: str, output: str) -> None:
-    """ Removes the background of image frames.
-    :param path:
-    :param output: """
-
-    # Display individual frames from the loaded animated GIF file
-    for i in range(len(glob.glob('./media/effects/fidget_spinner/*.png'))):
-        im = Image.open(f'./media/effects/fidget_spinner/fidget_spinner_{i+1}.png').convert('RGBA')
-        datas = im.getdata()
-
-        newData = []
-        # print(datas)
-        # break
-        # print(f'====={i+1}=====')
-        for item in datas:
-            if item[0] == 255 and item[1] == 255 and item[2] == 255:
-                newData.append((255, 255, 255, 0))
-            else:
-                if item[0] > 150:
-                    newData.append((0, 0, 0, 255))
-                else:
-                    newData.append(item)
+from PIL import GifImagePlugin, Image, ImageChops
+
+# variables.effects
+effect_gif_workers = int(os.getenv('EFFECT_GIF_WORKERS', 2))
+
+EFFECTS_PATH = 'media/effects'
+# Where extra/effect_assets.py builds the sprite sheets
+EFFECTS_BUILD_PATH = f'{EFFECTS_PATH}/build'
+MAX_GIF_FRAMES = 400
+# The palette index of the pixels a frame leaves as they were in the previous one
+TRANSPARENT_INDEX = 255
 
-        im.putdata(newData)
-        im.save(f"{output}_{i+1}.png")
 
 class GIF:
     """ A handler for GIF creations."""
@@ -78,131 +55,243 @@ class GIF:
         image.save(path, "GIF", save_all=True, append_images=self._frames,
                    duration=self._frame_duration, transparency=0, loop=0, **kwargs)
 
-if __name__ == '__main__':
-
-    # Puts a single effect onto an image #
-
-    # profile = Image.open('../profile.png').convert('RGBA')
-    # gif = GIF(image=profile, frame_duration=40)
-
-    # path = '../media/effects'
-    # effect = 'fidget_spinner'
-    # full_path = f"{path}/{effect}"
-
-    # if os.path.isdir(full_path):
-    #     for i in range(len(glob.glob('../media/effects/fidget_spinner/*.png'))):
-
-    #         base = gif.new_frame()
-    #         frame = Image.open(f"{full_path}/{effect}_{i+1}.png").resize((150, 150)).convert('RGBA')
-
-    #         base.paste(frame, (218, 222), frame)
-    #         gif.add_frame(base)
-
-    #     else:
-
-    #         gif.export('../temp_profile.gif')
-    #         print('Finished!')
-
-    # =========================================================#
-
-    # profile = Image.open('../test.png').convert('RGBA')
-    # path1 = '../media/effects/fidget_spinner/fidget_spinner_2.png'
-    # path2 = '../media/effects/star/star_stage_1.png'
-    # fidget_spinner = Image.open(path1).resize((150,150)).convert('RGBA')
-    # profile.paste(fidget_spinner, (218, 222), fidget_spinner)
-    # profile.save('../profile3.png')
-    # print('ye')
-
-    # defragment_gif(
-    #     path="./media/effects/fidget_spinner/fidget_spinner.gif",
-    #     output="./media/effects/fidget_spinner/fidget_spinner"
-    #     )
-
-    # remove_background(
-    #     path="./media/effects/fidget_spinner/fidget_spinner/*.png",
-    #     output="./media/effects/fidget_spinner/fidget_spinner"
-    # )
-
-    # =========================================================#
-    # ==========Adds=multiple=effects=onto=an=image============#
-    # =========================================================#
-
-    def smth():
-        profile = Image.open('../profile.png').convert('RGBA')
-        gif = GIF(image=profile, frame_duration=40)
-
-        path = '../media/effects'
-        all_effects = {
-            'fidget_spinner': {'frames': [], 'cords': (218, 222), 'resize': (150, 150)},
-            'star': {'frames': [], 'cords': (150, 10), 'resize': (50, 50)},
-            'transmutated': {'frames': [], 'cords': (0, 0), 'resize': None},
-            'protected': {'frames': [], 'cords': (0, 0), 'resize': None}
-        }
-        # Gets all frames of each effect and resize them properly, respectively.
-        for effect in all_effects:
-            # print('a')
-            full_path = f"{path}/{effect}"
-            # Checks whether the effect folder exists
-            if os.path.isdir(full_path):
-                # Gets all frame images from the folder
-                for i in range(len(glob.glob(f"{full_path}/*.png"))):
-                    # for i in range(73):
-                    frame = Image.open(f"{full_path}/{effect}_{i+1}.png")  # .rotate(-(i*5))
-                    # Checks whether frame has to be resized
-                    if all_effects[effect]['resize']:
-                        frame = frame.resize(all_effects[effect]['resize']).convert('RGBA')
-
-                    # Appends to its respective frame list
-                    all_effects[effect]['frames'].append(frame)
-
-        # Loops through the frames based on the amount of frames of the longest effect.
-        longest_gif = max([len(frames['frames']) for frames in all_effects.values()])
-
-        for efx in all_effects.keys():
-            all_effects[efx]['frames'] = cycle(all_effects[efx]['frames'])
-
-        for i in range(longest_gif):
-            print(i+1)
-            # Gets a frame of each effect in each iteration of the loop
-            base = gif.new_frame()
-            for efx, value in all_effects.items():
-                # print(all_effects[efx]['cords'])
-                cords = all_effects[efx]['cords']
-                frame = next(all_effects[efx]['frames'])
-                print(efx, frame)
-                base.paste(frame, cords, frame)
-                gif.add_frame(base)
-            print()
-
-            if i >= 400:
-                break
+class EffectFrameAtlas:
+    """ The frames of each effect, decoded, resized and converted to RGBA once per process,
+    and cropped to their visible area, since most of them are full-size overlays that are mostly transparent.
+
+    They're sliced from the sprite sheets built by extra/effect_assets.py, or read from the effect's
+    loose PNG frames if it hasn't been built with that size.
+    The frames are shared by every GIF, so they must only be pasted, never drawn on. """
+
+    def __init__(self, path: str = EFFECTS_PATH, build_path: str = EFFECTS_BUILD_PATH) -> None:
+        """ Class init method.
+        :param path: The folder of the effects. [Optional][Default=EFFECTS_PATH]
+        :param build_path: The folder of the sprite sheets. [Optional][Default=EFFECTS_BUILD_PATH] """
+
+        self.path = path
+        self.build_path = build_path
+        # (effect, size) -> ((frame, offset), ...)
+        self._frames: Dict[Tuple[str, Optional[Tuple[int, int]]], Tuple[Tuple[Image.Image, Tuple[int, int]], ...]] = {}
+
+    def load(self) -> None:
+        """ Loads the frames of every effect, from its sprite sheet if it's built. """
+
+        if not os.path.isdir(self.path):
+            return
+
+        for effect in sorted(os.listdir(self.path)):
+            effect_path = f"{self.path}/{effect}"
+            if not os.path.isdir(effect_path) or os.path.abspath(effect_path) == os.path.abspath(self.build_path):
+                continue
+
+            if metadata := self._read_metadata(effect):
+                resize = tuple(metadata['resize']) if metadata['resize'] else None
+                self.get(effect, resize)
+            else:
+                self.get(effect)
+
+    def get(self, effect: str, resize: Optional[Tuple[int, int]] = None) -> Tuple[Tuple[Image.Image, Tuple[int, int]], ...]:
+        """ Gets the frames of an effect, loading them the first time.
+        :param effect: The name of the effect.
+        :param resize: The size to resize the frames to. [Optional] """
+
+        key = (effect, resize)
+        if (frames := self._frames.get(key)) is None:
+            frames = self._frames[key] = self._load_sheet(effect, resize) or self._load_frames(effect, resize)
+        return frames
+
+    def _read_metadata(self, effect: str) -> Optional[Dict[str, Any]]:
+        """ Reads the metadata of an effect's sprite sheet, if it's built.
+        :param effect: The name of the effect. """
+
+        metadata_path = f"{self.build_path}/{effect}.json"
+        if not os.path.isfile(metadata_path):
+            return None
+
+        with open(metadata_path) as f:
+            return json.load(f)
+
+    def _load_sheet(self, effect: str, resize: Optional[Tuple[int, int]]) -> Tuple[Tuple[Image.Image, Tuple[int, int]], ...]:
+        """ Slices the frames of an effect out of its sprite sheet, if it was built with the given size.
+        :param effect: The name of the effect.
+        :param resize: The size of the frames. """
+
+        metadata = self._read_metadata(effect)
+        if not metadata or (tuple(metadata['resize']) if metadata['resize'] else None) != resize:
+            return ()
+
+        with Image.open(f"{self.build_path}/{metadata['sheet']}") as image:
+            sheet = image.convert('RGBA')
+
+        return tuple(
+            (sheet.crop((x, y, x + width, y + height)), (dx, dy))
+            for x, y, width, height, dx, dy in metadata['frames']
+        )
+
+    def _load_frames(self, effect: str, resize: Optional[Tuple[int, int]]) -> Tuple[Tuple[Image.Image, Tuple[int, int]], ...]:
+        """ Loads the frames of an effect from its folder.
+        :param effect: The name of the effect.
+        :param resize: The size to resize the frames to. """
+
+        full_path = f"{self.path}/{effect}"
+        if not os.path.isdir(full_path):
+            return ()
+
+        frames = []
+        for i in range(len(glob.glob(f"{full_path}/*.png"))):
+            with Image.open(f"{full_path}/{effect}_{i+1}.png") as image:
+                frame = image.resize(resize) if resize else image
+                frame = frame.convert('RGBA')
+
+            # Keeps only the visible area of the frame and where it goes
+            if bbox := frame.getchannel('A').getbbox():
+                frames.append((frame.crop(bbox), bbox[:2]))
+            else:
+                frames.append((frame.crop((0, 0, 1, 1)), (0, 0)))
+
+        return tuple(frames)
+
+
+effect_frames = EffectFrameAtlas()
+
+
+def make_palette(image: Image.Image) -> Image.Image:
+    """ Makes the palette every frame of a GIF is mapped to, out of its first frame.
+    It has an adaptive palette of up to 255 colours, padded to 256 with copies of the first colour,
+    so no pixel is ever mapped to the transparent index.
+    :param image: The RGB first frame. """
+
+    frame = image.quantize(colors=TRANSPARENT_INDEX, method=Image.Quantize.FASTOCTREE)
+    palette = frame.getpalette('RGB')[:TRANSPARENT_INDEX * 3]
+    frame.putpalette(palette + palette[:3] * (256 - len(palette) // 3))
+    return frame
+
+
+def make_effect_gif(profile: Image.Image, effects: List[Tuple[str, Tuple[int, int], Optional[Tuple[int, int]]]], frame_duration: int = 40) -> bytes:
+    """ Makes a GIF out of a profile image and effects, with one frame per tick.
+    Every frame is mapped to the palette of the first one, which is the GIF's only colour table.
+    Every frame after the first only stores the area that changed since the previous one,
+    and leaves the pixels in it that didn't change transparent, so the previous frame shows through them.
+    It's CPU-bound, so it runs in the effect GIF process pool.
+    :param profile: The profile image.
+    :param effects: The (name, coordinates, size to resize it to) of each effect.
+    :param frame_duration: The duration of each frame. [Optional][Default=40] """
+
+    layers = [(effect_frames.get(effect, resize), cords) for effect, cords, resize in effects]
+    layers = [(frames, cords) for frames, cords in layers if frames]
+    base = profile.convert('RGBA')
+    frame_count = min(max([len(frames) for frames, _ in layers], default=1), MAX_GIF_FRAMES)
+
+    # Only the area the effects are pasted on can change between frames
+    boxes = [
+        (x + dx, y + dy, x + dx + image.width, y + dy + image.height)
+        for frames, (x, y) in layers for image, (dx, dy) in frames[:frame_count]]
+    left, top = max(min([box[0] for box in boxes], default=0), 0), max(min([box[1] for box in boxes], default=0), 0)
+    right, bottom = min(max([box[2] for box in boxes], default=0), base.width), min(max([box[3] for box in boxes], default=0), base.height)
+
+    def compose(i: int, box: Tuple[int, int, int, int]) -> Image.Image:
+        frame = base.crop(box)
+        for frames, (x, y) in layers:
+            image, (dx, dy) = frames[i % len(frames)]
+            frame.paste(image, (x + dx - box[0], y + dy - box[1]), image)
+        return frame.convert('RGB')
+
+    first = compose(0, (0, 0, base.width, base.height))
+    palette = make_palette(first)
+    # [image, offset, duration]
+    frames = [[palette, None, frame_duration]]
+    if right <= left or bottom <= top:
+        frame_count = 1
+
+    previous = first.crop((left, top, right, bottom))
+    for i in range(1, frame_count):
+        current = compose(i, (left, top, right, bottom))
+        difference = ImageChops.difference(previous, current)
+        if not (bbox := difference.getbbox()):
+            # Nothing changed, so the previous frame just lasts longer
+            frames[-1][2] += frame_duration
+            continue
+
+        red, green, blue = difference.crop(bbox).split()
+        changed = ImageChops.lighter(ImageChops.lighter(red, green), blue).point(lambda value: 255 if value else 0)
+        image = current.crop(bbox).quantize(palette=palette, dither=Image.Dither.NONE)
+        image.paste(TRANSPARENT_INDEX, mask=ImageChops.invert(changed))
+        frames.append([image, (left + bbox[0], top + bbox[1]), frame_duration])
+        previous = current
+
+    buffer = BytesIO()
+    header, _ = GifImagePlugin.getheader(frames[0][0], info={'loop': 0})
+    buffer.write(b''.join(header))
+    for image, offset, duration in frames:
+        if offset is None:
+            data = GifImagePlugin.getdata(image, duration=duration)
         else:
-            gif.export('../double.gif')
-            print('Finished!')
-
-    # smth()
-    def get_frames():
-
-        for i in range(74):
-            # background = profile.copy()
-            print(i)
-            background = Image.open("../sloth_custom_images/foot/base_foot.png")
-            frame = Image.open(f"../media/effects/protected/protected_1.png")
-            # print(i)
-            # frame = Image.open(f"{full_path}/{effect}_{1}.png").rotate(-(i*5))
-            # Checks whether frame has to be resized
-            frame = frame.resize((400, 400)).convert('RGBA')
-            frame = frame.rotate(-(i*5))
-            background.paste(frame, (200, 150))
-            background.save(f'../media/effects/knocked_out/protected_{i+1}.png', 'png', quality=90)
-
-    # get_frames()
-
-    # base = gif.new_frame()
-
-    # frame = Image.open(f"{full_path}/{effect}_{i+1}.png").resize((150, 150)).convert('RGBA')
-    # base.paste(frame, (218, 222), frame)
-    # gif.add_frame(base)
-
-    # gif.export('../temp_profile.gif')
-    # print('Finished!')
+            # Keeps the previous frame under this one, so its transparent pixels show it
+            data = GifImagePlugin.getdata(
+                image, offset, duration=duration, transparency=TRANSPARENT_INDEX, disposal=1)
+        buffer.write(b''.join(data))
+    buffer.write(b';')
+    return buffer.getvalue()
+
+
+def _load_effect_frames() -> None:
+    """ Loads the effect frames of a worker process. """
+
+    effect_frames.load()
+
+
+def _warm_up() -> None:
+    """ Does nothing; submitting it makes the pool start its workers. """
+
+
+class EffectGIFPool:
+    """ Process pool that makes the effect GIFs, each worker holding its own effect frame atlas,
+    so compositing and encoding neither block the event loop nor contend for the GIL.
+    The workers are spawned rather than forked, since the bot process has threads, e.g. the executor's,
+    that could be holding a lock, like the profile layer cache's, which a forked worker would never see released. """
+
+    def __init__(self, workers: int) -> None:
+        """ Class init method.
+        :param workers: The amount of worker processes. """
+
+        self.workers = max(workers, 1)
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """ Gets the pool, starting it if needed. The workers load the effect frames when they start. """
+
+        if not self._executor:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'), initializer=_load_effect_frames)
+        return self._executor
+
+    async def warm_up(self) -> None:
+        """ Starts the workers, so the first GIF doesn't wait for them to load the effect frames. """
+
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(self._get_executor(), _warm_up)
+
+    async def make_gif(self, profile: Image.Image, effects: List[Tuple[str, Tuple[int, int], Optional[Tuple[int, int]]]]) -> BytesIO:
+        """ Makes a GIF out of a profile image and effects in a worker process.
+        :param profile: The profile image.
+        :param effects: The (name, coordinates, size to resize it to) of each effect. """
+
+        loop = asyncio.get_event_loop()
+        try:
+            data = await loop.run_in_executor(self._get_executor(), make_effect_gif, profile, effects)
+        except BrokenProcessPool:
+            # A worker died, so the next GIF gets a new pool
+            self._executor = None
+            raise
+
+        return BytesIO(data)
+
+    def close(self) -> None:
+        """ Stops the workers. """
+
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+effect_gifs = EffectGIFPool(effect_gif_workers)
@@ -0,0 +1,93 @@
+# import.standard
+import time
+from typing import Callable, Dict, List, Tuple
+
+# import.thirdparty
+import discord
+from discord.ext import commands
+
+
+class HandlerRegistry:
+    """ The cog methods registered by a decorator that sets a priority attribute on them, e.g. message_handler,
+    collected from the loaded cogs in priority order, along with how long each of them takes. """
+
+    def __init__(self, client: commands.Bot, priority_attribute: str, log_name: str) -> None:
+        """ Class init method.
+        :param client: The bot client.
+        :param priority_attribute: The attribute the decorator sets the handler's priority in.
+        :param log_name: The name the handler errors are printed with. """
+
+        self.client = client
+        self.priority_attribute = priority_attribute
+        self.log_name = log_name
+        # (priority, "Cog.method", bound method)
+        self.handlers: List[Tuple[int, str, Callable]] = []
+        self.handlers_key: Tuple[int, ...] = ()
+        # handler name -> [calls, total seconds, max seconds]
+        self.timings: Dict[str, List[float]] = {}
+
+    def get_handlers(self) -> List[Tuple[int, str, Callable]]:
+        """ Gets the registered handlers of the loaded cogs, sorted by priority.
+        They are only looked up again when a cog is loaded, unloaded or reloaded. """
+
+        cogs = list(self.client.cogs.values())
+        handlers_key = tuple(id(cog) for cog in cogs)
+        if handlers_key == self.handlers_key:
+            return self.handlers
+
+        handlers = []
+        for cog in cogs:
+            seen = set()
+            for cls in type(cog).__mro__:
+                for name, attr in vars(cls).items():
+                    if name in seen or not hasattr(attr, self.priority_attribute):
+                        continue
+                    seen.add(name)
+                    handlers.append((getattr(attr, self.priority_attribute), f"{cog.qualified_name}.{name}", getattr(cog, name)))
+
+        self.handlers = sorted(handlers, key=lambda handler: handler[0])
+        self.handlers_key = handlers_key
+        return self.handlers
+
+    async def run(self, name: str, handler: Callable, *args) -> None:
+        """ Runs a handler, timing it and printing its error instead of raising it.
+        :param name: The name of the handler.
+        :param handler: The handler.
+        :param args: The arguments to call it with. """
+
+        start = time.perf_counter()
+        try:
+            await handler(*args)
+        except Exception as e:
+            print(f"[{self.log_name}] Error at {name}: {e}")
+        finally:
+            elapsed = time.perf_counter() - start
+            timing = self.timings.setdefault(name, [0, 0.0, 0.0])
+            timing[0] += 1
+            timing[1] += elapsed
+            timing[2] = max(timing[2], elapsed)
+
+    def get_timing_lines(self) -> List[str]:
+        """ Gets a line with the priority and timings of each handler, in order. """
+
+        lines = []
+        for priority, name, _ in self.get_handlers():
+            calls, total, max_time = self.timings.get(name, [0, 0.0, 0.0])
+            average = (total / calls * 1000) if calls else 0
+            lines.append(f"[{priority}] {name}: {int(calls)} calls | avg {average:.2f}ms | max {max_time * 1000:.2f}ms")
+        return lines
+
+
+def make_stats_embed(ctx: commands.Context, title: str, lines: List[str], empty: str = 'No handlers registered.') -> discord.Embed:
+    """ Makes the embed of an admin stats command, with the lines in an ini code block.
+    :param ctx: The context of the command.
+    :param title: The title of the embed.
+    :param lines: The lines to show.
+    :param empty: What to show if there are no lines. [Optional][Default='No handlers registered.'] """
+
+    return discord.Embed(
+        title=f"__{title}__",
+        description=f"```ini\n{chr(10).join(lines) or empty}```",
+        color=ctx.author.color,
+        timestamp=ctx.message.created_at
+    )
@@ -0,0 +1,65 @@
+# import.standard
+from typing import List
+
+# import.thirdparty
+from PIL import Image
+
+IDENTITY: List[int] = list(range(256))
+
+
+def has_alpha(image: Image.Image) -> bool:
+    """ Checks whether an image has an alpha channel or a transparent colour.
+    :param image: The image to check. """
+
+    return image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+
+
+def change_brightness(image: Image.Image, multiplier: float, r: bool = True, g: bool = True, b: bool = True) -> Image.Image:
+    """ Multiplies the chosen colour channels of an image through a lookup table, clamped to 0-255.
+    The alpha channel, if any, is kept as is. It's blocking, so it should run in an executor.
+    :param image: The image to change.
+    :param multiplier: The value to multiply the channels by.
+    :param r: Whether to change the red channel. [Optional][Default=True]
+    :param g: Whether to change the green channel. [Optional][Default=True]
+    :param b: Whether to change the blue channel. [Optional][Default=True] """
+
+    alpha = has_alpha(image)
+    image = image.convert('RGBA' if alpha else 'RGB')
+
+    scaled = [min(255, max(0, int(value * multiplier))) for value in IDENTITY]
+    table = (scaled if r else IDENTITY) + (scaled if g else IDENTITY) + (scaled if b else IDENTITY)
+    if alpha:
+        table += IDENTITY
+
+    return image.point(table)
+
+
+def grayscale(image: Image.Image) -> Image.Image:
+    """ Converts an image to grayscale, keeping its alpha channel, if any.
+    It's blocking, so it should run in an executor.
+    :param image: The image to convert. """
+
+    return image.convert('LA' if has_alpha(image) else 'L')
+
+
+def posterize(image: Image.Image, bits: int) -> Image.Image:
+    """ Reduces the bits of each colour channel of an image through a lookup table.
+    Unlike ImageOps.posterize, it takes images with an alpha channel, e.g. from grayscale(), and keeps it as is.
+    It's blocking, so it should run in an executor.
+    :param image: The image to change.
+    :param bits: The amount of bits to keep in each channel, 1-8. """
+
+    alpha = has_alpha(image)
+    if image.mode in ('L', 'LA'):
+        image = image.convert('LA' if alpha else 'L')
+        bands = 1
+    else:
+        image = image.convert('RGBA' if alpha else 'RGB')
+        bands = 3
+
+    mask = ~(2 ** (8 - bits) - 1)
+    table = [value & mask for value in IDENTITY] * bands
+    if alpha:
+        table += IDENTITY
+
+    return image.point(table)
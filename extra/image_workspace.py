@@ -0,0 +1,105 @@
+# import.standard
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+# import.thirdparty
+from PIL import Image
+
+# variables.images
+image_workspace_max_bytes = int(os.getenv('IMAGE_WORKSPACE_MAX_BYTES', 67108864))
+image_workspace_ttl = int(os.getenv('IMAGE_WORKSPACE_TTL', 900))
+image_workspace_max_side = int(os.getenv('IMAGE_WORKSPACE_MAX_SIDE', 1024))
+
+
+class ImageWorkspaces:
+    """ The working image of each user for chained edits, so concurrent users don't overwrite each other's.
+
+    Images are stored downscaled to a maximum working size, and the least recently used ones are dropped
+    once their decoded bytes go over the limit, or when they haven't been edited for a while.
+    Assets, e.g. an avatar that was just shown, take no decoded bytes until they're edited. """
+
+    def __init__(self, max_bytes: int, ttl: int, max_side: int) -> None:
+        """ Class init method.
+        :param max_bytes: The maximum decoded bytes of all workspaces.
+        :param ttl: The seconds a workspace lasts since it was last set.
+        :param max_side: The maximum width and height of a stored image. """
+
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.max_side = max_side
+        # key -> (expiration monotonic time, image or asset, decoded bytes)
+        self._entries: Dict[Hashable, Tuple[float, Any, int]] = OrderedDict()
+        self._size: int = 0
+
+    def __len__(self) -> int:
+        """ The amount of workspaces. """
+
+        return len(self._entries)
+
+    @property
+    def size(self) -> int:
+        """ The decoded bytes of all workspaces. """
+
+        return self._size
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """ Gets a workspace's image or asset, if it hasn't expired.
+        :param key: The key of the workspace, e.g. the user ID. """
+
+        if not (entry := self._entries.get(key)):
+            return None
+
+        if entry[0] <= time.monotonic():
+            self.discard(key)
+            return None
+
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def set(self, key: Hashable, item: Any) -> None:
+        """ Sets a workspace's image or asset, downscaling images bigger than the working size.
+        :param key: The key of the workspace, e.g. the user ID.
+        :param item: The image or asset. """
+
+        self.discard(key)
+
+        size = 0
+        if isinstance(item, Image.Image):
+            if max(item.size) > self.max_side:
+                item = item.copy()
+                item.thumbnail((self.max_side, self.max_side))
+            size = item.width * item.height * len(item.getbands())
+
+        if size > self.max_bytes:
+            return
+
+        self._entries[key] = (time.monotonic() + self.ttl, item, size)
+        self._size += size
+        self._evict()
+
+    def discard(self, key: Hashable) -> None:
+        """ Drops a workspace.
+        :param key: The key of the workspace. """
+
+        if entry := self._entries.pop(key, None):
+            self._size -= entry[2]
+
+    def sweep(self) -> None:
+        """ Drops the expired workspaces, so their images don't outlive the TTL when no one is editing. """
+
+        now = time.monotonic()
+        for key in [key for key, entry in self._entries.items() if entry[0] <= now]:
+            self.discard(key)
+
+    def _evict(self) -> None:
+        """ Drops the expired workspaces, then the least recently used ones while over the size limit. """
+
+        self.sweep()
+        while self._size > self.max_bytes:
+            _, (_, _, size) = self._entries.popitem(last=False)
+            self._size -= size
+
+
+image_workspaces = ImageWorkspaces(image_workspace_max_bytes, image_workspace_ttl, image_workspace_max_side)
@@ -1,6 +1,6 @@
 # import.standard
 import asyncio
-from typing import Any, Dict, Optional, Union
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
 
 # import.thirdparty
 import discord
@@ -428,8 +428,7 @@ class SnipeLooping(menus.ListPageSource):
 
         for i, message in enumerate(entries, start=offset):
 
-            member_id = next(iter(message.keys()))
-            message = message[member_id]
+            member_id = message["author_id"]
 
             if len (message["content"]) > 850:
                 content = message["content"][:850] + '...'
@@ -496,4 +495,54 @@ class PaginatorView(discord.ui.View):
             lentries=len(self.data), entries=self.data, title=self.title, 
             result=self.result, **self.kwargs
         )
-        return embed
\ No newline at end of file
+        return embed
+
+
+class QueryPaginatorView(discord.ui.View):
+    """ View for an embed paginator that fetches each page from the database when it's shown. """
+
+    def __init__(self, fetch_page: Callable[[int, int], Awaitable[List[Any]]], total: int, page_size: int,
+        make_embed: Callable[[List[Any], int, int], Awaitable[discord.Embed]], timeout: Optional[float] = 180) -> None:
+        """ Class init method.
+        :param fetch_page: Coroutine function that fetches a page of records, given a limit and an offset.
+        :param total: The total amount of records.
+        :param page_size: The amount of records per page.
+        :param make_embed: Coroutine function that makes the embed of a page, given its records, page number and amount of pages.
+        :param timeout: The view's timeout. [Optional][Default=180] """
+
+        super().__init__(timeout=timeout)
+        self.fetch_page = fetch_page
+        self.page_size = page_size
+        self.pages: int = max(1, -(-total // page_size))
+        self.change_embed = make_embed
+        self.page: int = 0
+
+    @discord.ui.button(label="Left", emoji="⬅", style=discord.ButtonStyle.blurple, custom_id="query_left_button_id")
+    async def button_left(self, button: discord.ui.button, interaction: discord.Interaction) -> None:
+        """ Flips the page to the left. """
+
+        await interaction.response.defer()
+
+        if self.page > 0:
+            self.page -= 1
+
+        embed = await self.make_embed()
+        await interaction.followup.edit_message(interaction.message.id, embed=embed)
+
+    @discord.ui.button(label="Right", emoji="➡", style=discord.ButtonStyle.blurple, custom_id="query_right_button_id")
+    async def button_right(self, button: discord.ui.button, interaction: discord.Interaction) -> None:
+        """ Flips the page to the right. """
+
+        await interaction.response.defer()
+
+        if self.page < self.pages - 1:
+            self.page += 1
+
+        embed = await self.make_embed()
+        await interaction.followup.edit_message(interaction.message.id, embed=embed)
+
+    async def make_embed(self) -> discord.Embed:
+        """ Fetches the current page and makes its embed. """
+
+        records = await self.fetch_page(self.page_size, self.page * self.page_size)
+        return await self.change_embed(records, self.page + 1, self.pages)
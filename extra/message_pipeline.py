@@ -0,0 +1,127 @@
+# import.standard
+import asyncio
+import os
+from functools import cached_property
+from typing import Any, Callable, Dict, Optional, Set
+
+# import.thirdparty
+import discord
+from discord.ext import commands
+
+# import.local
+from mysqldb import DatabaseCore
+
+# variables.role
+admin_role_id = int(os.getenv('ADMIN_ROLE_ID', 123))
+mod_role_id = int(os.getenv('MOD_ROLE_ID', 123))
+staff_manager_role_id = int(os.getenv('STAFF_MANAGER_ROLE_ID', 123))
+owner_role_id = int(os.getenv('OWNER_ROLE_ID', 123))
+
+staff_role_ids: Set[int] = {owner_role_id, admin_role_id, staff_manager_role_id, mod_role_id}
+
+
+def message_handler(priority: int = 100, sequential: bool = False) -> Callable:
+    """ Registers a cog method as a handler of the on_message pipeline.
+    The method is called with the message and its MessageContext.
+    :param priority: The order in which the handler is started; lower starts first. [Optional][Default=100]
+    :param sequential: Whether it runs on its own, before the concurrent handlers. Only these can stop the pipeline,
+    so they should be quick, like checks that drop a message or buffered counters. [Optional][Default=False] """
+
+    def decorator(func: Callable) -> Callable:
+        func.__message_handler_priority__ = priority
+        func.__message_handler_sequential__ = sequential
+        return func
+
+    return decorator
+
+
+class MessageContext:
+    """ Per-message facts shared by all the on_message pipeline handlers.
+    Everything is computed lazily, at most once per message, even for handlers running concurrently,
+    since the lookups store their pending task, which the others await. """
+
+    def __init__(self, client: commands.Bot, message: discord.Message) -> None:
+        """ Class init method.
+        :param client: The bot client.
+        :param message: The message being handled. """
+
+        self.client = client
+        self.message = message
+        self.stopped: bool = False
+        self._effects: Optional[asyncio.Task] = None
+        self._tables: Dict[str, asyncio.Task] = {}
+
+    def stop(self) -> None:
+        """ Stops the pipeline, so the handlers after the current one don't run.
+        PS: It only has an effect from a sequential handler. """
+
+        self.stopped = True
+
+    @property
+    def author(self) -> discord.abc.User:
+        """ The author of the message. """
+
+        return self.message.author
+
+    @property
+    def guild(self) -> Optional[discord.Guild]:
+        """ The guild of the message, if any. """
+
+        return self.message.guild
+
+    @property
+    def is_bot(self) -> bool:
+        """ Whether the message was sent by a bot. """
+
+        return self.message.author.bot
+
+    @property
+    def is_guild_member_message(self) -> bool:
+        """ Whether it's a guild message sent by a non-bot member. """
+
+        return bool(self.message.guild) and not self.message.author.bot
+
+    @cached_property
+    def role_ids(self) -> Set[int]:
+        """ The IDs of the author's roles. """
+
+        return {role.id for role in getattr(self.message.author, "roles", [])}
+
+    def has_role(self, role_id: int) -> bool:
+        """ Checks whether the author has a role.
+        :param role_id: The ID of the role. """
+
+        return role_id in self.role_ids
+
+    @cached_property
+    def is_staff(self) -> bool:
+        """ Whether the author is an administrator or has a Staff role. """
+
+        if not self.role_ids.isdisjoint(staff_role_ids):
+            return True
+
+        if isinstance(self.message.author, discord.Member):
+            return self.message.channel.permissions_for(self.message.author).administrator
+
+        return False
+
+    @cached_property
+    def lower_content(self) -> str:
+        """ The message content in lowercase. """
+
+        return self.message.content.lower()
+
+    async def get_effects(self) -> Dict[str, Dict[str, Any]]:
+        """ Gets the effects the author is under. """
+
+        if self._effects is None:
+            self._effects = asyncio.ensure_future(self.client.get_cog('SlothClass').get_user_effects(self.message.author))
+        return await self._effects
+
+    async def table_exists(self, table_name: str) -> bool:
+        """ Checks whether a table exists.
+        :param table_name: The name of the table. """
+
+        if table_name not in self._tables:
+            self._tables[table_name] = asyncio.ensure_future(DatabaseCore().table_exists(table_name))
+        return await self._tables[table_name]
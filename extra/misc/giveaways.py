@@ -1,11 +1,12 @@
 # import.standard
-from random import choice
+from functools import partial
 from typing import List, Optional, Union
 
 # import.thirdparty
 from discord.ext import commands
 
 # import.local
+from extra.scheduler import scheduler
 from mysqldb import DatabaseCore
 
 class GiveawaysTable(commands.Cog):
@@ -93,6 +94,19 @@ class GiveawaysTable(commands.Cog):
             INSERT INTO Giveaways (message_id, channel_id, prize, winners, deadline_ts, role_id, user_id)
             VALUES (%s, %s, %s, %s, %s, %s, %s)""", (
                 message_id, channel_id, prize, winners, deadline_ts, role_id, user_id))
+        self.schedule_giveaway(message_id, deadline_ts)
+
+    def schedule_giveaway(self, message_id: int, deadline_ts: int, notified: Optional[int] = 0) -> None:
+        """ Schedules a giveaway to be ended at its deadline or, if it has already ended, to be deleted 2 days after it.
+        :param message_id: The ID of the message of the giveaway.
+        :param deadline_ts: The deadline timestamp of the giveaway.
+        :param notified: Whether the giveaway has already ended. [Optional][Default = 0 = False] """
+
+        if notified:
+            scheduler.cancel(("giveaway", message_id))
+            scheduler.schedule(("old_giveaway", message_id), deadline_ts + 172800, partial(self.delete_giveaway, message_id))
+        else:
+            scheduler.schedule(("giveaway", message_id), deadline_ts, partial(self.end_due_giveaway, message_id))
 
     async def get_giveaways(self) -> List[List[Union[str, int]]]:
         """ Gets all active giveaways. """
@@ -136,12 +150,8 @@ class GiveawaysTable(commands.Cog):
         :param message_id: The ID of the message in which the giveaway is attached to. """
 
         await self.db.execute_query("DELETE FROM Giveaways WHERE message_id = %s", (message_id,))
-
-    async def delete_old_giveaways(self, current_ts: int) -> None:
-        """ Deletes old ended giveaways of at least 2 days ago. """
-
-        await self.db.execute_query("""
-            DELETE FROM Giveaways WHERE notified = 1 AND %s - deadline_ts >= 172800""", (current_ts,))
+        scheduler.cancel(("giveaway", message_id))
+        scheduler.cancel(("old_giveaway", message_id))
 
 
 class GiveawayEntriesTable(commands.Cog):
@@ -237,29 +247,22 @@ class GiveawayEntriesTable(commands.Cog):
 
         await self.db.execute_query("DELETE FROM GiveawayEntries WHERE user_id = %s AND message_id = %s", (user_id, message_id))
 
-    async def get_winners(self, giveaway: List[Union[str, int]], entries: List[List[Union[str, int]]]) -> str:
+    async def count_giveaway_entries(self, message_id: int) -> int:
+        """ Counts the entries of a giveaway.
+        :param message_id: The ID of the message of the giveaway. """
+
+        entries = await self.db.execute_query("SELECT COUNT(*) FROM GiveawayEntries WHERE message_id = %s", (message_id,), fetch="one")
+        return entries[0] if entries else 0
+
+    async def get_winners(self, giveaway: List[Union[str, int]]) -> str:
         """ Gets text-formatted winners from giveaways.
+        The winners are sampled by the database, so the entries aren't loaded however many there are.
         :param giveaway: The giveaway to get the winners from. """
 
-        if not entries:
+        winners = await self.db.execute_query("""
+            SELECT user_id FROM GiveawayEntries WHERE message_id = %s
+            ORDER BY RAND() LIMIT %s""", (giveaway[0], giveaway[3]), fetch="all")
+        if not winners:
             return 'No one, since there were no entries in this giveaway'
 
-        amount_of_winners = giveaway[3]
-
-        winners = []
-
-        while True:
-            winner = choice(entries)
-            # Checks whether winner is not in the list yet
-            if winner not in winners:
-                winners.append(winner)
-
-            # Checks whether it sorted the required amount of winners
-            if len(winners) == amount_of_winners:
-                break
-
-            # Checks whether there are enough entries to sort more winners
-            if len(entries) < amount_of_winners:
-                break
-
         return ', '.join([f"<@{w[0]}>" for w in winners])
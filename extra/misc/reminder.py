@@ -1,10 +1,12 @@
 # import.standard
-from typing import List, Union
+from functools import partial
+from typing import Iterable, List, Union
 
 # import.thirdparty
 from discord.ext import commands
 
 # import.local
+from extra.scheduler import scheduler
 from mysqldb import DatabaseCore
 
 class MemberReminderTable(commands.Cog):
@@ -74,9 +76,25 @@ class MemberReminderTable(commands.Cog):
         :param reminder_timestamp: The current timestamp.
         :param remind_in: The amount of seconds to wait until reminding the user. """
 
-        await self.db.execute_query("""
+        reminder_id = await self.db.execute_query("""
         INSERT INTO MemberReminder (user_id, text, reminder_timestamp, remind_in) 
-        VALUES (%s, %s, %s, %s)""", (user_id, text, reminder_timestamp, remind_in))
+        VALUES (%s, %s, %s, %s)""", (user_id, text, reminder_timestamp, remind_in), fetch="lastrowid")
+        if reminder_id:
+            self.schedule_member_reminder(reminder_id, user_id, text, reminder_timestamp + remind_in)
+
+    def schedule_member_reminder(self, reminder_id: int, user_id: int, text: str, remind_at: int) -> None:
+        """ Schedules a reminder to be sent when it's due.
+        :param reminder_id: The ID of the reminder.
+        :param user_id: The ID of the user.
+        :param text: The text that has to be reminded.
+        :param remind_at: The timestamp to remind the user at. """
+
+        scheduler.schedule(("reminder", reminder_id), remind_at, partial(self.queue_member_reminder, reminder_id, user_id, text, remind_at))
+
+    async def get_pending_reminders(self) -> List[List[Union[str, int]]]:
+        """ Gets all the reminders that haven't been sent yet. """
+
+        return await self.db.execute_query("SELECT * FROM MemberReminder", fetch="all")
 
     async def get_member_reminders(self, user_id: int) -> List[List[Union[str, int]]]:
         """ Gets the user's reminders.
@@ -102,3 +120,17 @@ class MemberReminderTable(commands.Cog):
         :param reminder_id: The ID of the reminder to delete. """
 
         await self.db.execute_query("DELETE FROM MemberReminder WHERE reminder_id = %s", (reminder_id,))
+        scheduler.cancel(("reminder", reminder_id))
+
+    async def delete_member_reminders(self, reminder_ids: Iterable[int]) -> None:
+        """ Deletes reminders at once.
+        :param reminder_ids: The IDs of the reminders to delete. """
+
+        reminder_ids = list(reminder_ids)
+        if not reminder_ids:
+            return
+
+        placeholders = ', '.join(['%s'] * len(reminder_ids))
+        await self.db.execute_query(f"DELETE FROM MemberReminder WHERE reminder_id IN ({placeholders})", reminder_ids)
+        for reminder_id in reminder_ids:
+            scheduler.cancel(("reminder", reminder_id))
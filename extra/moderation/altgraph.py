@@ -0,0 +1,133 @@
+# import.standard
+from typing import Dict, Iterable, List, Set, Tuple
+
+
+class AltAccountGraph:
+    """ In-memory connected components of the FakeAccounts links (union-find),
+    so a user's alt accounts can be looked up without querying the database. """
+
+    def __init__(self) -> None:
+        """ Class init method. """
+
+        self.loaded: bool = False
+        self._parent: Dict[int, int] = {}
+        # root -> accounts of its component
+        self._components: Dict[int, Set[int]] = {}
+        # account -> links it's part of, as stored in the database (user_id, fake_user_id)
+        self._links: Dict[int, Set[Tuple[int, int]]] = {}
+
+    def load(self, links: Iterable[Tuple[int, int]]) -> None:
+        """ Replaces the graph with a new list of links.
+        :param links: The (user_id, fake_user_id) links. """
+
+        self._parent, self._components, self._links = {}, {}, {}
+        for user_id, fake_user_id in links:
+            self.add(user_id, fake_user_id)
+        self.loaded = True
+
+    def _find(self, account_id: int) -> int:
+        """ Gets the root of an account's component, compressing the path to it.
+        :param account_id: The ID of the account. """
+
+        parent = self._parent
+        root = account_id
+        while parent[root] != root:
+            root = parent[root]
+
+        while parent[account_id] != root:
+            parent[account_id], account_id = root, parent[account_id]
+
+        return root
+
+    def _make_set(self, account_id: int) -> None:
+        """ Adds an account as a component of its own, if it's not in the graph yet.
+        :param account_id: The ID of the account. """
+
+        if account_id not in self._parent:
+            self._parent[account_id] = account_id
+            self._components[account_id] = {account_id}
+            self._links[account_id] = set()
+
+    def _union(self, first_id: int, second_id: int) -> None:
+        """ Merges the components of two accounts, the smaller one into the bigger one.
+        :param first_id: The ID of the first account.
+        :param second_id: The ID of the second account. """
+
+        first_root, second_root = self._find(first_id), self._find(second_id)
+        if first_root == second_root:
+            return
+
+        if len(self._components[first_root]) < len(self._components[second_root]):
+            first_root, second_root = second_root, first_root
+
+        self._parent[second_root] = first_root
+        self._components[first_root] |= self._components.pop(second_root)
+
+    def add(self, user_id: int, fake_user_id: int) -> None:
+        """ Links two accounts.
+        :param user_id: The ID of the user's main account.
+        :param fake_user_id: The ID of the user's fake account. """
+
+        self._make_set(user_id)
+        self._make_set(fake_user_id)
+        link = (user_id, fake_user_id)
+        self._links[user_id].add(link)
+        self._links[fake_user_id].add(link)
+        self._union(user_id, fake_user_id)
+
+    def get_links(self, account_id: int) -> Set[Tuple[int, int]]:
+        """ Gets the links an account is directly part of.
+        :param account_id: The ID of the account. """
+
+        return set(self._links.get(account_id, ()))
+
+    def remove(self, links: Iterable[Tuple[int, int]]) -> None:
+        """ Unlinks accounts. Union-find can't split components,
+        so the affected components are rebuilt from their remaining links.
+        :param links: The (user_id, fake_user_id) links to remove. """
+
+        affected: Set[int] = set()
+        for link in links:
+            for account_id in link:
+                if account_id in self._parent:
+                    self._links[account_id].discard(link)
+                    affected.add(self._find(account_id))
+
+        accounts: Set[int] = set()
+        for root in affected:
+            accounts |= self._components.pop(root)
+
+        remaining = set()
+        for account_id in accounts:
+            remaining |= self._links.pop(account_id)
+            del self._parent[account_id]
+
+        for user_id, fake_user_id in remaining:
+            self.add(user_id, fake_user_id)
+
+    def get_component(self, account_id: int) -> Set[int]:
+        """ Gets all the accounts linked to an account, directly or not, including itself.
+        :param account_id: The ID of the account. """
+
+        if account_id not in self._parent:
+            return {account_id}
+
+        return set(self._components[self._find(account_id)])
+
+    def get_alt_ids(self, account_id: int) -> Set[int]:
+        """ Gets the IDs of the other accounts of the same user.
+        :param account_id: The ID of the account. """
+
+        alt_ids = self.get_component(account_id)
+        alt_ids.discard(account_id)
+        return alt_ids
+
+    def get_component_links(self, account_id: int) -> List[Tuple[int, int]]:
+        """ Gets all the links of an account's component.
+        :param account_id: The ID of the account. """
+
+        links = set()
+        for alt_id in self.get_component(account_id):
+            links |= self._links.get(alt_id, set())
+
+        return list(links)
@@ -0,0 +1,69 @@
+# import.standard
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+# import.thirdparty
+import discord
+
+
+class DeletedMessageStore:
+    """ Bounded store of the latest deleted messages, for the snipe command.
+    A global ring buffer holds the messages in deletion order, indexed per user. """
+
+    def __init__(self, capacity: Optional[int] = None, max_age: Optional[int] = None) -> None:
+        """ Class init method.
+        :param capacity: Maximum amount of messages kept. [Optional][Default=SNIPE_CAPACITY or 1000]
+        :param max_age: Seconds after which a deleted message is dropped. [Optional][Default=SNIPE_MAX_AGE or 1 day] """
+
+        self.capacity: int = capacity or int(os.getenv("SNIPE_CAPACITY", 1000))
+        self.max_age: int = max_age or int(os.getenv("SNIPE_MAX_AGE", 86400))
+        self.messages: Deque[Dict[str, Any]] = deque()
+        self.user_messages: Dict[int, Deque[Dict[str, Any]]] = {}
+
+    def __len__(self) -> int:
+        self.evict()
+        return len(self.messages)
+
+    def add(self, message: discord.Message) -> None:
+        """ Stores a deleted message.
+        :param message: The deleted message. """
+
+        entry = {
+            "author_id": message.author.id,
+            "content": message.content,
+            "time": message.created_at.timestamp(),
+            "channel": message.channel,
+            "deleted_at": time.time(),
+        }
+        self.messages.append(entry)
+        self.user_messages.setdefault(entry["author_id"], deque()).append(entry)
+        self.evict()
+
+    def evict(self) -> None:
+        """ Drops the oldest messages while over the capacity or older than the max age. """
+
+        oldest_allowed = time.time() - self.max_age
+        while self.messages and (len(self.messages) > self.capacity or self.messages[0]["deleted_at"] < oldest_allowed):
+            entry = self.messages.popleft()
+            # The index is in the same order, so the entry is always the first of its user
+            entries = self.user_messages[entry["author_id"]]
+            entries.popleft()
+            if not entries:
+                del self.user_messages[entry["author_id"]]
+
+    def latest(self, amount: int = 1) -> List[Dict[str, Any]]:
+        """ Gets the latest deleted messages, from the oldest to the newest.
+        :param amount: The amount of messages to get. [Optional][Default=1] """
+
+        self.evict()
+        amount = min(amount, len(self.messages))
+        return [self.messages[i] for i in range(len(self.messages) - amount, len(self.messages))]
+
+    def from_user(self, user_id: int) -> List[Dict[str, Any]]:
+        """ Gets a user's deleted messages, from the oldest to the newest.
+        :param user_id: The ID of the user. """
+
+        self.evict()
+        return list(self.user_messages.get(user_id, ()))
@@ -1,6 +1,6 @@
 # import.standard
 import os
-from typing import List, Union
+from typing import List, Set, Tuple, Union
 
 # import.thirdparty
 import discord
@@ -8,6 +8,7 @@ from discord.ext import commands
 
 # import.local
 from extra import utils
+from extra.moderation.altgraph import AltAccountGraph
 from extra.prompt.menu import Confirm
 from mysqldb import DatabaseCore
 
@@ -19,6 +20,7 @@ class ModerationFakeAccountsTable(commands.Cog):
     def __init__(self, client) -> None:
         self.client = client
         self.db = DatabaseCore()
+        self.alt_graph = AltAccountGraph()
 
     @commands.command(aliases=['link_fake', 'linkfake', 'add_fake', 'addfake', 'lfa'])
     @utils.is_allowed(allowed_roles, throw_exc=True)
@@ -146,6 +148,7 @@ class ModerationFakeAccountsTable(commands.Cog):
 
         await ctx.message.delete()
         await self.db.execute_query("DELETE FROM FakeAccounts")
+        self.alt_graph.load([])
 
         return await ctx.send("**Table __FakeAccounts__ reset!**", delete_after=3)
 
@@ -165,48 +168,59 @@ class ModerationFakeAccountsTable(commands.Cog):
         OR user_id = %s AND fake_user_id = %s
         """, (member_id, fake_member_id, fake_member_id, member_id), fetch="one")
 
-    async def get_fake_accounts(self, account_id: int) -> List[List[int]]:
-        """ Gets all fake account associations with a user account.
+    async def get_fake_accounts(self, account_id: int) -> List[Tuple[int, int]]:
+        """ Gets all fake account associations with a user account, directly or not.
         :param account_id: The ID of the account to get the associations from. """
 
-        all_fake_accounts = []
+        alt_graph = await self.get_alt_graph()
+        return alt_graph.get_component_links(account_id)
 
-        sql = "SELECT * FROM FakeAccounts WHERE user_id = %s OR fake_user_id = %s"
-        origin = await self.db.execute_query(sql, (account_id, account_id), fetch="all")
-        all_fake_accounts.extend(origin)
+    async def get_alt_graph(self) -> AltAccountGraph:
+        """ Gets the in-memory graph of fake accounts, loading it if it wasn't loaded yet. """
 
-        for fake_account in all_fake_accounts:
-            accounts = []
+        if not self.alt_graph.loaded:
+            await self.load_alt_graph()
+        return self.alt_graph
 
-            # First combination
-            first = await self.db.execute_query(sql, (fake_account[0], fake_account[0]), fetch="all")
-            accounts.extend(first)
+    async def load_alt_graph(self) -> None:
+        """ Loads all the fake account associations into the in-memory graph.
+        PS: An empty graph is only marked as loaded when the table really is empty.
+        If the query fails, it's loaded again on the next lookup. """
 
-            # Second combination
-            second = await self.db.execute_query(sql, (fake_account[1], fake_account[1]), fetch="all")
-            accounts.extend(second)
+        try:
+            links = await self.db.execute_query("SELECT user_id, fake_user_id FROM FakeAccounts", fetch="all", raise_errors=True)
+        except Exception:
+            return
 
-            for account in list(set(accounts)):
-                if account not in all_fake_accounts:
-                    all_fake_accounts.append(account)
+        self.alt_graph.load(links)
+
+    async def get_alt_ids(self, account_id: int) -> Set[int]:
+        """ Gets the IDs of all the other accounts associated with a user account.
+        :param account_id: The ID of the account. """
+
+        alt_graph = await self.get_alt_graph()
+        return alt_graph.get_alt_ids(account_id)
 
-        return list(set(all_fake_accounts))
-    
     async def insert_fake_account(self, user_id: int, fake_account_id: int) -> None:
         """ Inserts a fake account association into the database.
         :param user_id: The ID of the user's main account.
         :param fake_account_id: The ID of the user's fake account. """
 
         await self.db.execute_query("INSERT INTO FakeAccounts (user_id, fake_user_id) VALUES (%s, %s)", (user_id, fake_account_id))
+        if self.alt_graph.loaded:
+            self.alt_graph.add(user_id, fake_account_id)
 
     async def delete_fake_account(self, fake_account_id: int) -> None:
         """ Deletes associations with a fake account.
         :param fake_account_id: The ID of the fake account. """
 
         await self.db.execute_query("DELETE FROM FakeAccounts WHERE fake_user_id = %s", (fake_account_id,))
+        links = self.alt_graph.get_links(fake_account_id)
+        self.alt_graph.remove([link for link in links if link[1] == fake_account_id])
 
     async def delete_fake_accounts(self, user_id: int) -> None:
         """ Deletes associations with all fake accounts.
         :param user_id: The ID of the user's main account. """
 
         await self.db.execute_query("DELETE FROM FakeAccounts WHERE user_id = %s OR fake_user_id = %s", (user_id, user_id))
+        self.alt_graph.remove(self.alt_graph.get_links(user_id))
@@ -0,0 +1,86 @@
+# import.standard
+import asyncio
+import time
+from typing import Optional, Set
+
+# import.thirdparty
+import discord
+
+
+class GuildInviteRegistry:
+    """ In-memory registry of a guild's invite codes, kept current through the
+    invite create/delete events, so invite links can be checked without a REST call. """
+
+    def __init__(self, refresh_cooldown: int = 60) -> None:
+        """ Class init method.
+        :param refresh_cooldown: Minimum amount of seconds between two refreshes. [Optional][Default=60] """
+
+        self.codes: Set[str] = set()
+        self.refresh_cooldown = refresh_cooldown
+        self.last_attempt: float = 0
+        self.loaded: bool = False
+        self.failed: bool = False
+        self._lock = asyncio.Lock()
+
+    async def load(self, guild: discord.Guild) -> None:
+        """ Loads all the guild's invite codes.
+        :param guild: The guild to load the invites from. """
+
+        async with self._lock:
+            await self._fetch(guild)
+
+    async def _fetch(self, guild: discord.Guild) -> None:
+        """ Fetches the guild's invites and replaces the registered codes with them.
+        :param guild: The guild to fetch the invites from. """
+
+        self.last_attempt = time.monotonic()
+        try:
+            invites = await guild.invites()
+        except discord.HTTPException as e:
+            self.failed = True
+            print(f"[InviteRegistry] Couldn't fetch the invites: {e}")
+            return
+
+        codes = {invite.code for invite in invites}
+        if guild.vanity_url_code:
+            codes.add(guild.vanity_url_code)
+        self.codes = codes
+        self.loaded = True
+        self.failed = False
+
+    def add(self, code: str) -> None:
+        """ Registers an invite code.
+        :param code: The invite code. """
+
+        self.codes.add(code)
+
+    def remove(self, code: str) -> None:
+        """ Unregisters an invite code.
+        :param code: The invite code. """
+
+        self.codes.discard(code)
+
+    async def contains(self, guild: discord.Guild, code: Optional[str]) -> bool:
+        """ Checks whether an invite code belongs to the guild. On a miss, the invites
+        are fetched again, at most once every refresh_cooldown seconds.
+        While the invites couldn't be fetched, unknown codes are considered the guild's,
+        so no one is punished for posting one of its invites.
+        :param guild: The guild the code should belong to.
+        :param code: The invite code. """
+
+        if not code:
+            return False
+
+        if code in self.codes:
+            return True
+
+        if time.monotonic() - self.last_attempt >= self.refresh_cooldown:
+            async with self._lock:
+                # Someone else may have just refreshed it while waiting for the lock
+                if time.monotonic() - self.last_attempt >= self.refresh_cooldown:
+                    await self._fetch(guild)
+
+        if not self.loaded or self.failed:
+            return True
+
+        return code in self.codes
@@ -0,0 +1,112 @@
+# import.standard
+import re
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set
+
+
+class ScamMatcher:
+    """ Case-insensitive multi-pattern substring matcher (Aho-Corasick automaton),
+    so a message is scanned once no matter how many scam phrases there are. """
+
+    def __init__(self, patterns: Iterable[str] = ()) -> None:
+        """ Class init method.
+        :param patterns: The phrases to look for. """
+
+        self.patterns: List[str] = []
+        self.rebuild(patterns)
+
+    def rebuild(self, patterns: Iterable[str]) -> None:
+        """ Compiles the automaton for a new list of phrases.
+        :param patterns: The phrases to look for. """
+
+        self.patterns = [pattern.lower() for pattern in patterns if pattern]
+        goto: List[Dict[str, int]] = [{}]
+        output: List[Optional[str]] = [None]
+
+        # Builds the trie
+        for pattern in self.patterns:
+            state = 0
+            for char in pattern:
+                if char not in goto[state]:
+                    goto.append({})
+                    output.append(None)
+                    goto[state][char] = len(goto) - 1
+                state = goto[state][char]
+            output[state] = output[state] or pattern
+
+        # Builds the failure links breadth-first, inheriting the outputs of the fallback states
+        fail: List[int] = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in goto[state].items():
+                queue.append(next_state)
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[next_state] = goto[fallback].get(char, 0)
+                output[next_state] = output[next_state] or output[fail[next_state]]
+
+        self._goto = goto
+        self._fail = fail
+        self._output = output
+
+    def search(self, text: str) -> Optional[str]:
+        """ Gets the first phrase found in the text, if any.
+        :param text: The text to scan. """
+
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for char in text.lower():
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                return output[state]
+
+        return None
+
+
+class BannedLinkIndex:
+    """ Hash set of normalized banned links, so each word of a message is checked in O(1). """
+
+    # Matches "https://", "http://" and the broken "https/" forms
+    SCHEME_REGEX = re.compile(r"^https?:?/+", re.IGNORECASE)
+
+    def __init__(self, links: Iterable[str] = ()) -> None:
+        """ Class init method.
+        :param links: The banned links. """
+
+        self.links: Set[str] = set()
+        self.rebuild(links)
+
+    @classmethod
+    def normalize(cls, url: str) -> str:
+        """ Normalizes a link, ignoring its scheme, 'www.', query string, fragment, trailing slash and case.
+        :param url: The link to normalize. """
+
+        url = cls.SCHEME_REGEX.sub("", url.strip().strip("<>"))
+        url = url.split("?", 1)[0].split("#", 1)[0].rstrip("/").lower()
+        return url[4:] if url.startswith("www.") else url
+
+    def rebuild(self, links: Iterable[str]) -> None:
+        """ Indexes a new list of banned links.
+        :param links: The banned links. """
+
+        self.links = {normalized for link in links if (normalized := self.normalize(link))}
+
+    def is_banned(self, url: str) -> bool:
+        """ Checks whether a link is banned.
+        :param url: The link to check. """
+
+        return self.normalize(url) in self.links
+
+    def search(self, text: str) -> Optional[str]:
+        """ Gets the first banned link in a text, if any.
+        :param text: The text to check. """
+
+        for word in text.split():
+            if self.is_banned(word):
+                return word
+
+        return None
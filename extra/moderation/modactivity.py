@@ -7,7 +7,7 @@ from discord.ext import commands
 
 # import.local
 from extra import utils
-from mysqldb import DatabaseCore
+from mysqldb import DatabaseCore, counter_buffer
 
 class ModActivityTable(commands.Cog):
     """ Class for managing the ModActivity table in the database. """
@@ -144,6 +144,7 @@ class ModActivityTable(commands.Cog):
     async def get_mod_activities(self) -> List[List[int]]:
         """ Gets all Mod activities data from the database. """
 
+        await counter_buffer.flush()
         return await self.db.execute_query("SELECT * FROM ModActivity ORDER BY time DESC, messages DESC", fetch="all")
 
     async def get_moderator_current_timestamp(self, mod_id: int, old_ts: Optional[int] = None) -> int:
@@ -175,7 +176,7 @@ class ModActivityTable(commands.Cog):
         """ Updates the moderator's message counter.
         :param mod_id: The moderator's ID. """
 
-        await self.db.execute_query("UPDATE ModActivity SET messages = messages + 1 WHERE mod_id = %s", (mod_id,))
+        await counter_buffer.increment("ModActivity", "messages", 1, "mod_id", mod_id)
 
     async def update_moderator_timestamp(self, mod_id: int) -> None:
         """ Updates the moderator's timestamp.
@@ -194,11 +195,13 @@ class ModActivityTable(commands.Cog):
     async def reset_mod_activity(self) -> None:
         """ Reset data from the ModActivity table """
 
+        await counter_buffer.flush()
         await self.db.execute_query("UPDATE ModActivity SET time = 0, timestamp = 0, messages = 0")
 
     async def delete_mod_activity(self) -> None:
         """ Deletes all the data from the ModActivity table. """
 
+        await counter_buffer.flush()
         await self.db.execute_query("DELETE FROM ModActivity")
         
     async def set_mod_activity_min_text(self, min_text: int) -> int:
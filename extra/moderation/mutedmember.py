@@ -5,6 +5,7 @@ from typing import List, Optional, Tuple
 from discord.ext import commands
 
 # import.local
+from extra.scheduler import scheduler
 from mysqldb import DatabaseCore
 
 class ModerationMutedMemberTable(commands.Cog):
@@ -79,12 +80,28 @@ class ModerationMutedMemberTable(commands.Cog):
             "SELECT DISTINCT(user_id) FROM mutedmember WHERE (%s -  mute_ts) >= %s", (current_ts, seconds_ago), fetch="all")
         return list(map(lambda m: m[0], muted_members))
 
+    async def get_tempmutes(self) -> List[Tuple[int, int]]:
+        """ Gets the users who are temporarily muted and when their mutes expire. """
+
+        return await self.db.execute_query(
+            "SELECT user_id, MAX(mute_ts + muted_for_seconds) FROM mutedmember WHERE muted_for_seconds IS NOT NULL GROUP BY user_id", fetch="all")
+
+    def schedule_tempmute(self, user_id: int, expires_at: int) -> None:
+        """ Schedules the user to be unmuted when their tempmute expires.
+        :param user_id: The ID of the user.
+        :param expires_at: The timestamp the tempmute expires at. """
+
+        scheduler.schedule(("tempmute", user_id), expires_at, self.unmute_expired_tempmutes)
+
     async def insert_in_muted(self, user_role_ids: List[Tuple[int]]):
         await self.db.execute_query(
             """
             INSERT INTO mutedmember (
             user_id, role_id, mute_ts, muted_for_seconds) VALUES (%s, %s, %s, %s)""", user_role_ids, execute_many=True
             )
+        for user_id, _, mute_ts, muted_for_seconds in user_role_ids:
+            if muted_for_seconds is not None:
+                self.schedule_tempmute(user_id, mute_ts + muted_for_seconds)
 
     async def get_muted_roles(self, user_id: int):
         return await self.db.execute_query("SELECT * FROM mutedmember WHERE user_id = %s", (user_id,), fetch="all")
@@ -97,9 +114,11 @@ class ModerationMutedMemberTable(commands.Cog):
         :param user_id: The ID of the user. """
 
         await self.db.execute_query("DELETE FROM mutedmember WHERE user_id = %s", (user_id,), execute_many=True)
+        scheduler.cancel(("tempmute", user_id))
 
     async def update_mute_time(self, user_id: int, current_time: int, time: int):
         await self.db.execute_query("UPDATE mutedmember SET mute_ts = %s, muted_for_seconds = %s WHERE user_id = %s", (current_time, time, user_id))
+        self.schedule_tempmute(user_id, current_time + time)
 
     async def get_mute_time(self, user_id: int):
         return await self.db.execute_query(
@@ -4,6 +4,12 @@ from typing import List
 # import.thirdparty
 from discord.ext import commands
 
+# import.local
+from extra.scheduler import scheduler
+
+# variables.reportsupport
+inactive_case_seconds = 68400
+
 class OpenChannels(commands.Cog):
     """ Cog for managing user open channels. """
 
@@ -123,6 +129,19 @@ class OpenChannels(commands.Cog):
             INSERT INTO OpenChannels (
                 user_id, channel_id, created_at, last_message_at
             ) VALUES (%s, %s, %s, %s)""", (member_id, channel_id, current_ts, current_ts))
+        self.schedule_case_inactivity(channel_id, current_ts)
+
+    def schedule_case_inactivity(self, channel_id: int, last_message_at: int) -> None:
+        """ Schedules the check for inactive cases for when a case channel would become inactive.
+        :param channel_id: The ID of the case channel.
+        :param last_message_at: The timestamp of the last message in the case channel. """
+
+        scheduler.schedule(("case", channel_id), last_message_at + inactive_case_seconds, self.close_inactive_cases)
+
+    async def get_open_channels(self) -> List[List[int]]:
+        """ Gets all the open case channels. """
+
+        return await self.db.execute_query("SELECT * FROM OpenChannels", fetch="all")
 
     async def remove_user_open_channel(self, member_id: int) -> None:
         """ Removes an open channel.
@@ -146,6 +165,7 @@ class OpenChannels(commands.Cog):
         await self.db.execute_query("""
             UPDATE OpenChannels SET last_message_at = %s WHERE channel_id = %s
         """, (current_ts, channel_id))
+        self.schedule_case_inactivity(channel_id, current_ts)
 
     async def get_inactive_cases(self, current_ts: int) -> List[List[int]]:
         """ Gets all case rooms that are inactive for 19h or more.
@@ -153,5 +173,5 @@ class OpenChannels(commands.Cog):
 
         return await self.db.execute_query("""
             SELECT * FROM OpenChannels
-            WHERE %s - last_message_at >= 68400
-        """, (current_ts,), fetch="all")
+            WHERE %s - last_message_at >= %s
+        """, (current_ts, inactive_case_seconds), fetch="all")
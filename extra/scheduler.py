@@ -0,0 +1,148 @@
+# import.standard
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+
+class DeadlineScheduler:
+    """ Min-heap of deadlines shared by the cogs, which sleeps exactly until the next one is due
+    instead of each cog polling the database every minute.
+
+    Entries are keyed, so scheduling a key again moves its deadline and cancelling it is O(1);
+    the outdated heap items are skipped when they reach the top. """
+
+    def __init__(self) -> None:
+        """ Class init method. """
+
+        # (due timestamp, sequence, key)
+        self._heap: List[Tuple[float, int, Hashable]] = []
+        # key -> (due timestamp, sequence, callback)
+        self._entries: Dict[Hashable, Tuple[float, int, Callable[[], Awaitable]]] = {}
+        self._sequence = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._runner: Optional[asyncio.Task] = None
+        self._running: Set[asyncio.Task] = set()
+        self.fired: int = 0
+        self.failed: int = 0
+        self.total_lateness: float = 0.0
+        self.max_lateness: float = 0.0
+
+    def __len__(self) -> int:
+        """ The amount of pending deadlines. """
+
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        """ Whether a key has a pending deadline. """
+
+        return key in self._entries
+
+    def schedule(self, key: Hashable, due_ts: float, callback: Callable[[], Awaitable]) -> None:
+        """ Schedules a callback, replacing the key's previous deadline if there was one.
+        Deadlines in the past are run right away.
+        :param key: The key of the deadline, e.g. ("reminder", reminder_id).
+        :param due_ts: The timestamp the callback is due at.
+        :param callback: The coroutine function to call, without arguments. """
+
+        sequence = next(self._sequence)
+        self._entries[key] = (due_ts, sequence, callback)
+        heapq.heappush(self._heap, (due_ts, sequence, key))
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._compact()
+
+        self._ensure_running()
+        if self._heap[0][1] == sequence:
+            # It's the new earliest deadline, so the runner has to sleep less
+            self._wakeup.set()
+
+    def cancel(self, key: Hashable) -> bool:
+        """ Cancels a key's deadline.
+        :param key: The key of the deadline.
+        :returns: Whether there was a deadline to cancel. """
+
+        return self._entries.pop(key, None) is not None
+
+    def get_due_ts(self, key: Hashable) -> Optional[float]:
+        """ Gets the timestamp a key is due at, if it's scheduled.
+        :param key: The key of the deadline. """
+
+        if entry := self._entries.get(key):
+            return entry[0]
+
+    def _compact(self) -> None:
+        """ Rebuilds the heap without the cancelled and rescheduled items. """
+
+        self._heap = [(due_ts, sequence, key) for key, (due_ts, sequence, _) in self._entries.items()]
+        heapq.heapify(self._heap)
+
+    def _is_current(self, item: Tuple[float, int, Hashable]) -> bool:
+        """ Whether a heap item is still the key's deadline.
+        :param item: The heap item. """
+
+        entry = self._entries.get(item[2])
+        return entry is not None and entry[1] == item[1]
+
+    def _ensure_running(self) -> None:
+        """ Starts the runner task on the current event loop, if it's not running yet. """
+
+        if self._runner and not self._runner.done():
+            return
+
+        self._wakeup = asyncio.Event()
+        self._runner = asyncio.get_event_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        """ Sleeps until the earliest deadline, or until an earlier one is scheduled, and fires the due ones. """
+
+        while True:
+            while self._heap and not self._is_current(self._heap[0]):
+                heapq.heappop(self._heap)
+
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            delay = self._heap[0][0] - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            due_ts, _, key = heapq.heappop(self._heap)
+            _, _, callback = self._entries.pop(key)
+            task = asyncio.get_event_loop().create_task(self._fire(key, callback, time.time() - due_ts))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _fire(self, key: Hashable, callback: Callable[[], Awaitable], lateness: float) -> None:
+        """ Runs a due callback.
+        :param key: The key of the deadline.
+        :param callback: The callback.
+        :param lateness: How many seconds after its deadline it's running. """
+
+        self.fired += 1
+        self.total_lateness += lateness
+        self.max_lateness = max(self.max_lateness, lateness)
+        try:
+            await callback()
+        except Exception as e:
+            self.failed += 1
+            print(f"[Scheduler] Error at {key}: {e}")
+
+    async def close(self) -> None:
+        """ Stops the runner and waits for the callbacks that are already running. """
+
+        if self._runner:
+            self._runner.cancel()
+            self._runner = None
+
+        if self._running:
+            await asyncio.gather(*self._running, return_exceptions=True)
+
+
+scheduler = DeadlineScheduler()
@@ -1481,6 +1481,7 @@ class Munk(Player):
         await self.db.execute_query("""
             UPDATE SlothSkills SET target_id = %s, edited_timestamp = %s 
             WHERE user_id = %s AND skill_type = %s""", (target_id, current_ts, user_id, skill_type))
+        Player.invalidate_user_effects()
 
     async def update_sloth_skill_user_and_target_id(self, user_id: int, target_id: int, current_ts: int, skill_type: str) -> None:
         """ Updates the skill's user and target id.
@@ -1492,6 +1493,7 @@ class Munk(Player):
         await self.db.execute_query("""
             UPDATE SlothSkills SET user_id = %s, target_id = %s, edited_timestamp = %s 
             WHERE user_id = %s AND skill_type = %s""", (target_id, target_id, current_ts, user_id, skill_type))
+        Player.invalidate_user_effects()
 
     async def update_sloth_skill_user_and_target_id_and_int_content(self, user_id: int, target_id: int, int_content: int, current_ts: int, skill_type: str) -> None:
         """ Updates the skill's user and target id.
@@ -1504,6 +1506,7 @@ class Munk(Player):
         await self.db.execute_query("""
             UPDATE SlothSkills SET user_id = %s, target_id = %s, int_content = %s, edited_timestamp = %s 
             WHERE user_id = %s AND skill_type = %s""", (target_id, target_id, int_content, current_ts, user_id, skill_type))
+        Player.invalidate_user_effects()
 
     @tribe.command(aliases=["transferquest", "tq"])
     @commands.cooldown(1, 5, commands.BucketType.user)
@@ -3,7 +3,7 @@ import os
 from datetime import datetime
 from enum import Enum
 from random import choice, random
-from typing import Any, Dict, List, Tuple, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 # import.thirdparty
 import discord
@@ -12,11 +12,13 @@ from pytz import timezone
 
 # import.local
 from extra import utils
+from extra.currency.profilerenderer import rendered_profiles
 from extra.customerrors import (ActionSkillOnCooldown, ActionSkillsLocked,
                                 CommandNotReady, KidnappedCommandError,
                                 MissingRequiredSlothClass,
                                 PoisonedCommandError, SkillsUsedRequirement)
 from mysqldb import DatabaseCore
+from .skillexpiry import skill_expiries
 from .userbabies import UserBabiesTable
 from .userpets import UserPetsTable
 from .usermarriages import UserMarriagesTable
@@ -38,6 +40,27 @@ class Skill(Enum):
 
 class Player(*additional_cogs):
 
+    # Skill types that put an effect on their target, in the order they are shown.
+    # 'munk' doesn't come from a skill action, but from the member's nickname
+    EFFECT_SKILL_TYPES: Dict[str, Dict[str, Any]] = {
+        'divine_protection': {'name': 'protected', 'cooldown': None, 'has_gif': True, 'debuff': False},
+        'transmutation': {'name': 'transmutated', 'cooldown': None, 'has_gif': True, 'debuff': False},
+        'hack': {'name': 'hacked', 'cooldown': None, 'has_gif': False, 'debuff': True},
+        'wire': {'name': 'wired', 'cooldown': None, 'has_gif': False, 'debuff': True},
+        'hit': {'name': 'knocked_out', 'cooldown': None, 'has_gif': False, 'debuff': True},
+        'frog': {'name': 'frogged', 'cooldown': None, 'has_gif': False, 'debuff': True},
+        'munk': {'name': 'munk', 'cooldown': "Endless", 'has_gif': False, 'debuff': True},
+        'reflect': {'name': 'reflect', 'cooldown': None, 'has_gif': False, 'debuff': False},
+        'sabotage': {'name': 'sabotaged', 'cooldown': None, 'has_gif': False, 'debuff': True},
+        'lock': {'name': 'locked', 'cooldown': "Ends when completing a Quest", 'has_gif': False, 'debuff': True},
+        'poison': {'name': 'poisoned', 'cooldown': None, 'has_gif': False, 'debuff': True},
+        'kidnap': {'name': 'kidnapped', 'cooldown': "Ends when rescue is paid", 'has_gif': False, 'debuff': True},
+    }
+
+    # target_id -> (timestamp of the earliest expiring effect, {skill_type: skill_timestamp})
+    _effects_cache: Dict[int, Tuple[Optional[int], Dict[str, int]]] = {}
+    EFFECTS_CACHE_MAX_SIZE: int = 10000
+
     def __init__(self, client) -> None:
         self.client = client
         self.db = DatabaseCore()
@@ -230,107 +253,80 @@ class Player(*additional_cogs):
         effects = {}
         general_cooldown = 86400 # Worth a day in seconds
 
-        if then := await self.get_skill_action_by_target_id_and_skill_type(target_id=member.id, skill_type='divine_protection'):
-            effects['protected'] = {}
-    
-            effects['protected']['cooldown'] = f"Ends <t:{int(then[2]) + general_cooldown}:R>" if then else 'Ends in ??'
-            effects['protected']['frames'] = []
-            effects['protected']['cords'] = (0, 0)
-            effects['protected']['resize'] = None
-            effects['protected']['has_gif'] = True
-            effects['protected']['debuff'] = False
-
-        if then := await self.get_skill_action_by_target_id_and_skill_type(target_id=member.id, skill_type='transmutation'):
-            effects['transmutated'] = {}
-            effects['transmutated']['cooldown'] = f"Ends <t:{int(then[2]) + general_cooldown}:R>" if then else 'Ends in ??'
-            effects['transmutated']['frames'] = []
-            effects['transmutated']['cords'] = (0, 0)
-            effects['transmutated']['resize'] = None
-            effects['transmutated']['has_gif'] = True
-            effects['transmutated']['debuff'] = False
-
-        if then := await self.get_skill_action_by_target_id_and_skill_type(target_id=member.id, skill_type='hack'):
-            effects['hacked'] = {}
-            effects['hacked']['cooldown'] = f"Ends <t:{int(then[2]) + general_cooldown}:R>" if then else 'Ends in ??'
-            effects['hacked']['frames'] = []
-            effects['hacked']['cords'] = (0, 0)
-            effects['hacked']['resize'] = None
-            effects['hacked']['debuff'] = True
-
-        if then := await self.get_skill_action_by_target_id_and_skill_type(target_id=member.id, skill_type='wire'):
-            effects['wired'] = {}
-            effects['wired']['cooldown'] = f"Ends <t:{int(then[2]) + general_cooldown}:R>" if then else 'Ends in ??'
-            effects['wired']['frames'] = []
-            effects['wired']['cords'] = (0, 0)
-            effects['wired']['resize'] = None
-            effects['wired']['debuff'] = True
-
-        if then := await self.get_skill_action_by_target_id_and_skill_type(target_id=member.id, skill_type='hit'):
-            effects['knocked_out'] = {}
-            effects['knocked_out']['cooldown'] = f"Ends <t:{int(then[2]) + general_cooldown}:R>" if then else 'Ends in ??'
-            effects['knocked_out']['frames'] = []
-            effects['knocked_out']['cords'] = (0, 0)
-            effects['knocked_out']['resize'] = None
-            effects['knocked_out']['debuff'] = True
-
-        if then := await self.get_skill_action_by_target_id_and_skill_type(target_id=member.id, skill_type='frog'):
-            effects['frogged'] = {}
-            effects['frogged']['cooldown'] = f"Ends <t:{int(then[2]) + general_cooldown}:R>" if then else 'Ends in ??'
-            effects['frogged']['frames'] = []
-            effects['frogged']['cords'] = (0, 0)
-            effects['frogged']['resize'] = None
-            effects['frogged']['debuff'] = True
-
-        if 'Munk' in member.display_name:
-            effects['munk'] = {}
-            effects['munk']['cooldown'] = "Endless"
-            effects['munk']['frames'] = []
-            effects['munk']['cords'] = (0, 0)
-            effects['munk']['resize'] = None
-            effects['munk']['debuff'] = True
-
-        if then := await self.get_skill_action_by_target_id_and_skill_type(target_id=member.id, skill_type='reflect'):
-            effects['reflect'] = {}
-            effects['reflect']['cooldown'] = f"Ends <t:{int(then[2]) + general_cooldown}:R>" if then else 'Ends in ??'
-            effects['reflect']['frames'] = []
-            effects['reflect']['cords'] = (0, 0)
-            effects['reflect']['resize'] = None
-            effects['reflect']['debuff'] = False
-
-        if then := await self.get_skill_action_by_target_id_and_skill_type(target_id=member.id, skill_type='sabotage'):
-            effects['sabotaged'] = {}
-            effects['sabotaged']['cooldown'] = f"Ends <t:{int(then[2]) + general_cooldown}:R>" if then else 'Ends in ??'
-            effects['sabotaged']['frames'] = []
-            effects['sabotaged']['cords'] = (0, 0)
-            effects['sabotaged']['resize'] = None
-            effects['sabotaged']['debuff'] = True
-
-        if then := await self.get_skill_action_by_target_id_and_skill_type(target_id=member.id, skill_type='lock'):
-            effects['locked'] = {}
-            effects['locked']['cooldown'] = "Ends when completing a Quest"
-            effects['locked']['frames'] = []
-            effects['locked']['cords'] = (0, 0)
-            effects['locked']['resize'] = None
-            effects['locked']['debuff'] = True
-
-        if then := await self.get_skill_action_by_target_id_and_skill_type(target_id=member.id, skill_type='poison'):
-            effects['poisoned'] = {}
-            effects['poisoned']['cooldown'] = f"Ends <t:{int(then[2]) + general_cooldown}:R>" if then else 'Ends in ??'
-            effects['poisoned']['frames'] = []
-            effects['poisoned']['cords'] = (0, 0)
-            effects['poisoned']['resize'] = None
-            effects['poisoned']['debuff'] = True
-
-        if then := await self.get_skill_action_by_target_id_and_skill_type(target_id=member.id, skill_type='kidnap'):
-            effects['kidnapped'] = {}
-            effects['kidnapped']['cooldown'] = f"Ends when rescue is paid"
-            effects['kidnapped']['frames'] = []
-            effects['kidnapped']['cords'] = (0, 0)
-            effects['kidnapped']['resize'] = None
-            effects['kidnapped']['debuff'] = True
+        skill_actions = await self.get_cached_effect_skill_actions(member.id)
+        for skill_type, effect in Player.EFFECT_SKILL_TYPES.items():
+            if skill_type == 'munk':
+                if 'Munk' not in member.display_name:
+                    continue
+            elif skill_type not in skill_actions:
+                continue
+
+            if effect['cooldown']:
+                cooldown = effect['cooldown']
+            else:
+                cooldown = f"Ends <t:{int(skill_actions[skill_type]) + general_cooldown}:R>"
+
+            effects[effect['name']] = {}
+            effects[effect['name']]['cooldown'] = cooldown
+            effects[effect['name']]['frames'] = []
+            effects[effect['name']]['cords'] = (0, 0)
+            effects[effect['name']]['resize'] = None
+            if effect['has_gif']:
+                effects[effect['name']]['has_gif'] = True
+            effects[effect['name']]['debuff'] = effect['debuff']
 
         return effects
 
+    async def get_cached_effect_skill_actions(self, target_id: int) -> Dict[str, int]:
+        """ Gets the effect skill types and timestamps targeting a user, from the effects cache
+        or with a single query if not cached or if the earliest effect has already expired.
+        :param target_id: The ID of the target user.
+        PS: A failed read is not cached, so it doesn't make the user look like they have no effects. """
+
+        current_ts = await utils.get_timestamp()
+        if cached := Player._effects_cache.get(target_id):
+            expires_at, skill_actions = cached
+            if expires_at is None or current_ts < expires_at:
+                return skill_actions
+
+        skill_types = [skill_type for skill_type in Player.EFFECT_SKILL_TYPES if skill_type != 'munk']
+        try:
+            rows = await self.db.execute_query(
+                f"SELECT skill_type, skill_timestamp FROM SlothSkills WHERE target_id = %s AND skill_type IN ({', '.join(['%s'] * len(skill_types))})",
+                (target_id, *skill_types), fetch="all", raise_errors=True)
+        except Exception:
+            # Falls back to the last known effects, without caching anything
+            return cached[1] if cached else {}
+
+        skill_actions: Dict[str, int] = {}
+        for skill_type, skill_timestamp in rows:
+            skill_actions.setdefault(skill_type, skill_timestamp)
+
+        # Timed effects end a day after their timestamp; locks and kidnaps only end by being deleted
+        timed_ends = [
+            int(ts) + 86400 for skill_type, ts in skill_actions.items()
+            if not Player.EFFECT_SKILL_TYPES[skill_type]['cooldown']]
+        expires_at = min(timed_ends) if timed_ends else None
+        if expires_at is not None and expires_at <= current_ts:
+            # Already expired, but not removed by the expiry loop yet, so checks it again soon
+            expires_at = current_ts + 60
+
+        if len(Player._effects_cache) >= Player.EFFECTS_CACHE_MAX_SIZE:
+            Player._effects_cache.pop(next(iter(Player._effects_cache)))
+        Player._effects_cache[target_id] = (expires_at, skill_actions)
+        return skill_actions
+
+    @staticmethod
+    def invalidate_user_effects(*target_ids: int) -> None:
+        """ Drops users from the effects cache, or the whole cache if no user is given.
+        :param target_ids: The IDs of the target users whose effects changed. """
+
+        if not target_ids:
+            return Player._effects_cache.clear()
+
+        for target_id in target_ids:
+            Player._effects_cache.pop(target_id, None)
+
     async def get_sloth_class_skills(self, sloth_class: str) -> List[commands.Command]:
         """ Gets all skills for a given Sloth Class.
         :param sloth_class: The name of the Sloth Class. """
@@ -362,6 +358,9 @@ class Player(*additional_cogs):
         await self.db.execute_query("""
             INSERT INTO SlothSkills (user_id, skill_type, skill_timestamp, target_id, message_id, channel_id, emoji, price, content)
             VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)""", (user_id, skill_type, skill_timestamp, target_id, message_id, channel_id, emoji, price, content))
+        Player.invalidate_user_effects(target_id)
+        rendered_profiles.invalidate(target_id)
+        skill_expiries.add(skill_type, user_id, target_id, skill_timestamp)
 
     # ========== GET ========== #
 
@@ -573,12 +572,14 @@ class Player(*additional_cogs):
         :param message_id: The ID of the skill action. """
 
         await self.db.execute_query("DELETE FROM SlothSkills WHERE message_id = %s", (message_id,))
+        Player.invalidate_user_effects()
 
     async def delete_skill_action_by_target_id(self, target_id: int) -> None:
         """ Deletes a skill action by target ID.
         :param target_id: The ID of the target member. """
 
         await self.db.execute_query("DELETE FROM SlothSkills WHERE target_id = %s", (target_id,))
+        Player.invalidate_user_effects(target_id)
 
     async def delete_debuff_skill_action_by_target_id(self, target_id: int) -> None:
         """ Deletes debuff skill actions by target ID.
@@ -587,6 +588,7 @@ class Player(*additional_cogs):
         await self.db.execute_query("""
         DELETE FROM SlothSkills WHERE target_id = %s AND skill_type IN ('hack', 'wire', 'frog', 'hit', 'sabotage')
         """, (target_id,))
+        Player.invalidate_user_effects(target_id)
 
     async def delete_skill_action_by_target_id_and_skill_type(self, target_id: int, skill_type: str, multiple: bool = False) -> None:
         """ Deletes a skill action by target ID.
@@ -595,6 +597,7 @@ class Player(*additional_cogs):
 
         sql = "DELETE FROM SlothSkills WHERE target_id = %s AND skill_type = %s" + "LIMIT 1" if not multiple else ""
         await self.db.execute_query(sql, (target_id, skill_type))
+        Player.invalidate_user_effects(target_id)
 
     async def delete_skill_action_by_user_id_and_skill_type(self, user_id: int, skill_type: str, multiple: bool = False) -> None:
         """ Deletes a skill action by user ID.
@@ -603,6 +606,7 @@ class Player(*additional_cogs):
 
         sql = "DELETE FROM SlothSkills WHERE user_id = %s AND skill_type = %s" + "LIMIT 1" if not multiple else ""
         await self.db.execute_query(sql, (user_id, skill_type))
+        Player.invalidate_user_effects()
 
     async def delete_skill_actions_by_target_id_and_skill_type(self, users: List[Tuple[int, str]]) -> None:
         """ Deletes a skill action by user ID.
@@ -611,6 +615,7 @@ class Player(*additional_cogs):
 
         sql = "DELETE FROM SlothSkills WHERE target_id = %s AND skill_type = %s"
         await self.db.execute_query(sql, users, execute_many=True)
+        Player.invalidate_user_effects(*[target_id for target_id, _ in users])
 
     async def delete_skill_action_by_user_id_or_target_id_and_skill_type_and_price(self, user_id: int, skill_type: str, price: str, multiple: bool = False) -> None:
         """ Deletes a skill action by user_id or target ID and skill type and price.
@@ -621,6 +626,7 @@ class Player(*additional_cogs):
 
         sql = "DELETE FROM SlothSkills WHERE (user_id = %s OR target_id = %s) AND skill_type = %s AND price = %s" + "LIMIT 1" if not multiple else ""
         await self.db.execute_query(sql, (user_id, user_id, skill_type, price))
+        Player.invalidate_user_effects()
 
     # ========== UPDATE ========== #
     async def update_user_skills_used(self, user_id: int, addition: int = 1) -> None:
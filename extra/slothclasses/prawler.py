@@ -243,7 +243,7 @@ class Prawler(Player):
 				sloth_profile = await self.get_sloth_profile(steal[0])
 				stack = sloth_profile[6]
 				if stack:
-					return await self.double_steal(channel=channel, attacker_id=steal[0], target_id=steal[3], stack=stack)
+					await self.double_steal(channel=channel, attacker_id=steal[0], target_id=steal[3], stack=stack)
 
 	async def double_steal(self, channel: discord.TextChannel, attacker_id: int, target_id: int, stack: int, loop: int = 1, init_rob_money: int = 5) -> None:
 		""" Tries to double the steal based on the attacker's knife sharpness stack.
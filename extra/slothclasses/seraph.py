@@ -15,6 +15,7 @@ from extra.prompt.menu import Confirm, ConfirmButton
 from extra.view import UserBabyView
 from mysqldb import DatabaseCore
 from .player import Player, Skill
+from .skillexpiry import skill_expiries
 
 # variables.textchannel
 bots_and_commands_channel_id = int(os.getenv('BOTS_AND_COMMANDS_CHANNEL_ID', 123))
@@ -218,6 +219,8 @@ class Seraph(Player):
         await self.db.execute_query("""
             UPDATE SlothSkills SET skill_timestamp = skill_timestamp + %s WHERE user_id = %s
             AND skill_type = 'divine_protection'""", (increment, perpetrator_id))
+        Player.invalidate_user_effects()
+        await skill_expiries.load(['divine_protection'])
 
     async def reinforce_shield(self, user_id: int, increment: Optional[int] = 86400) -> None:
         """ Reinforces a specific active Divine Protection shield.
@@ -227,6 +230,8 @@ class Seraph(Player):
         await self.db.execute_query("""
         UPDATE SlothSkills SET skill_timestamp = skill_timestamp + %s WHERE target_id = %s
         AND skill_type = 'divine_protection'""", (increment, user_id))
+        Player.invalidate_user_effects(user_id)
+        await skill_expiries.load(['divine_protection'])
 
     async def get_expired_protections(self) -> None:
         """ Gets expired divine protection skill actions. """
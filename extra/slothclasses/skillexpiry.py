@@ -0,0 +1,167 @@
+# import.standard
+import asyncio
+import time
+from functools import partial
+from typing import Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+# import.local
+from extra.scheduler import scheduler
+from mysqldb import DatabaseCore
+
+# SlothSkills skill type -> seconds until it expires
+SKILL_DURATIONS: Dict[str, int] = {
+    'reflect': 86400,
+    'steal': 2400,
+    'divine_protection': 86400,
+    'transmutation': 86400,
+    'potion': 86400,
+    'ring': 36000,
+    'pet_egg': 432000,
+    'hack': 86400,
+    'hit': 86400,
+    'wire': 86400,
+    'tribe_creation': 0,
+    'frog': 86400,
+    'sabotage': 86400,
+    'poison': 86400,
+}
+
+# Skill types whose rows are inserted by the website instead of the bot, so they're looked for periodically
+EXTERNAL_SKILL_TYPES: Tuple[str, ...] = ('tribe_creation',)
+
+# food kind -> (table, type column, type that doesn't eat yet)
+FOOD_KINDS: Dict[str, Tuple[str, str, str]] = {
+    'pet_food': ('UserPets', 'pet_breed', 'egg'),
+    'baby_food': ('UserBabies', 'baby_class', 'embryo'),
+}
+FOOD_INTERVAL: int = 7200
+# How long to wait before checking again rows that are still due after their handler ran
+RETRY_SECONDS: int = 60
+
+
+class SkillExpiryIndex:
+    """ Index of when each timed SlothSkills row expires, so each skill type's expiry handler
+    runs right when one of its rows expires instead of every type being scanned every minute.
+
+    Pets and babies get hungry every FOOD_INTERVAL seconds after their last meal,
+    so only the earliest due meal of each table is kept. """
+
+    def __init__(self) -> None:
+        """ Class init method. """
+
+        self.db = DatabaseCore()
+        # kind -> expiry handler
+        self.handlers: Dict[str, Callable[[], Awaitable]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._queued: Set[str] = set()
+        # kind -> [runs, failures, total seconds, max seconds, max lateness]
+        self.stats: Dict[str, List[float]] = {}
+
+    def register(self, kind: str, handler: Callable[[], Awaitable]) -> None:
+        """ Registers the expiry handler of a skill type or food kind.
+        :param kind: The skill type or food kind.
+        :param handler: The coroutine function that handles its expired rows. """
+
+        self.handlers[kind] = handler
+
+    def add(self, skill_type: str, user_id: int, target_id: Optional[int], skill_timestamp: int, retry: bool = False) -> None:
+        """ Indexes a SlothSkills row, if its skill type expires.
+        :param skill_type: The type of the skill action.
+        :param user_id: The ID of the perpetrator of the skill action.
+        :param target_id: The ID of the target of the skill action.
+        :param skill_timestamp: The timestamp of the skill action.
+        :param retry: Whether its handler has just run, so a row that's still due is retried later. [Optional][Default=False] """
+
+        if (duration := SKILL_DURATIONS.get(skill_type)) is None:
+            return
+
+        due_ts = skill_timestamp + duration
+        if retry and due_ts <= time.time():
+            due_ts = time.time() + RETRY_SECONDS
+        self._schedule(("skill_expiry", user_id, target_id, skill_type), skill_type, due_ts)
+
+    def schedule_food(self, kind: str, due_ts: float) -> None:
+        """ Schedules a food check, unless an earlier one is already scheduled.
+        :param kind: The food kind.
+        :param due_ts: The timestamp a pet or baby gets hungry at. """
+
+        self._schedule(("skill_expiry", kind), kind, due_ts)
+
+    def _schedule(self, key: Hashable, kind: str, due_ts: float) -> None:
+        """ Schedules a kind's handler, unless the key is already scheduled earlier,
+        e.g. by another row of the same user, target and skill type that expires first.
+        :param key: The key of the deadline.
+        :param kind: The skill type or food kind.
+        :param due_ts: The timestamp the handler is due at. """
+
+        current_ts = scheduler.get_due_ts(key)
+        if current_ts is None or due_ts < current_ts:
+            scheduler.schedule(key, due_ts, partial(self.run, kind, due_ts))
+
+    async def load(self, skill_types: Iterable[str] = SKILL_DURATIONS, retry: bool = False) -> None:
+        """ Indexes the SlothSkills rows of the given skill types with a single query.
+        :param skill_types: The skill types to index. [Optional][Default=All the ones that expire]
+        :param retry: Whether their handler has just run, so rows that are still due are retried later. [Optional][Default=False] """
+
+        skill_types = tuple(skill_types)
+        placeholders = ', '.join(['%s'] * len(skill_types))
+        rows = await self.db.execute_query(f"""
+            SELECT user_id, target_id, skill_type, skill_timestamp FROM SlothSkills
+            WHERE skill_type IN ({placeholders})""", skill_types, fetch="all")
+        for user_id, target_id, skill_type, skill_timestamp in rows:
+            self.add(skill_type, user_id, target_id, skill_timestamp, retry)
+
+    async def load_food(self, kind: str, retry: bool = False) -> None:
+        """ Schedules the next food check of a kind from the earliest meal in its table.
+        :param kind: The food kind.
+        :param retry: Whether the handler has just run, so rows that are still due are retried later. [Optional][Default=False] """
+
+        table, column, unborn = FOOD_KINDS[kind]
+        row = await self.db.execute_query(
+            f"SELECT MIN(food_ts) FROM {table} WHERE LOWER({column}) != %s", (unborn,), fetch="one")
+        if not row or row[0] is None:
+            return
+
+        due_ts = row[0] + FOOD_INTERVAL
+        if retry and due_ts <= time.time():
+            due_ts = time.time() + RETRY_SECONDS
+        self.schedule_food(kind, due_ts)
+
+    async def run(self, kind: str, due_ts: float) -> None:
+        """ Runs a kind's handler, once at a time; if it's already waiting to run, it's not queued again.
+        The deadlines of its rows are gone once they fire, so the kind is indexed again afterwards,
+        and the rows the run didn't get to, e.g. because it failed halfway, are retried later.
+        :param kind: The skill type or food kind.
+        :param due_ts: The timestamp the handler was due at. """
+
+        handler = self.handlers.get(kind)
+        if not handler or kind in self._queued:
+            return
+
+        if kind not in self._locks:
+            self._locks[kind] = asyncio.Lock()
+
+        self._queued.add(kind)
+        async with self._locks[kind]:
+            self._queued.discard(kind)
+            stats = self.stats.setdefault(kind, [0, 0, 0.0, 0.0, 0.0])
+            stats[4] = max(stats[4], time.time() - due_ts)
+            start = time.perf_counter()
+            try:
+                await handler()
+            except Exception as e:
+                stats[1] += 1
+                print(f"[SkillExpiry] Error at {kind}: {e}")
+            finally:
+                elapsed = time.perf_counter() - start
+                stats[0] += 1
+                stats[2] += elapsed
+                stats[3] = max(stats[3], elapsed)
+
+        if kind in FOOD_KINDS:
+            await self.load_food(kind, retry=True)
+        else:
+            await self.load([kind], retry=True)
+
+
+skill_expiries = SkillExpiryIndex()
@@ -7,6 +7,7 @@ from discord.ext import commands
 
 # import.local
 from extra import utils
+from extra.slothclasses.skillexpiry import FOOD_INTERVAL, skill_expiries
 from mysqldb import DatabaseCore
 
 class UserBabiesTable(commands.Cog):
@@ -96,6 +97,7 @@ class UserBabiesTable(commands.Cog):
                 INSERT INTO UserBabies (
                     parent_one, parent_two, life_points_ts, food_ts, birth_ts
                 ) VALUES (%s, %s, %s, %s, %s)""", (parent_one, parent_two, other_ts, other_ts, current_ts))
+        skill_expiries.schedule_food('baby_food', other_ts + FOOD_INTERVAL)
 
     async def get_user_baby(self, parent_id: int) -> List[Union[str, int]]:
         """ Get the user's baby.
@@ -127,6 +129,7 @@ class UserBabiesTable(commands.Cog):
         :param baby_class: The new baby class to update to. """
 
         await self.db.execute_query("UPDATE UserBabies SET baby_class = %s WHERE parent_one = %s OR parent_two = %s", (baby_class, parent_id, parent_id))
+        await skill_expiries.load_food('baby_food')
 
     async def update_user_baby_lp(self, parent_id: int, increment: int = 5, current_ts: Optional[int] = None) -> None:
         """ Updates the User Baby's life points.
@@ -7,6 +7,7 @@ from discord.ext import commands
 
 # import.local
 from extra import utils
+from extra.slothclasses.skillexpiry import FOOD_INTERVAL, skill_expiries
 from mysqldb import DatabaseCore
 
 class UserPetsTable(commands.Cog):
@@ -93,6 +94,7 @@ class UserPetsTable(commands.Cog):
             INSERT INTO UserPets (
                 user_id, life_points_ts, food_ts, birth_ts
             ) VALUES (%s, %s, %s, %s)""", (user_id, other_ts, other_ts, current_ts))
+        skill_expiries.schedule_food('pet_food', other_ts + FOOD_INTERVAL)
 
     async def get_user_pet(self, user_id: int) -> List[Union[str, int]]:
         """ Get the user's pet.
@@ -124,6 +126,7 @@ class UserPetsTable(commands.Cog):
         :param pet_breed: The new pet breed to update to. """
 
         await self.db.execute_query("UPDATE UserPets SET pet_breed = %s WHERE user_id = %s", (pet_breed, user_id))
+        await skill_expiries.load_food('pet_food')
 
     async def update_user_pet_name_breed_and_birth_ts(self, user_id: int, pet_name: str, pet_breed: str, birth_ts: int) -> None:
         """ Updates the User Pet's breed.
@@ -135,6 +138,7 @@ class UserPetsTable(commands.Cog):
         await self.db.execute_query("""
             UPDATE UserPets SET pet_name = %s, pet_breed = %s, birth_ts = %s WHERE user_id = %s
         """, (pet_name, pet_breed, birth_ts, user_id))
+        await skill_expiries.load_food('pet_food')
 
     async def update_user_pet_lp(self, user_id: int, increment: int = 5, current_ts: Optional[int] = None) -> None:
         """ Updates the User Pet's life points.
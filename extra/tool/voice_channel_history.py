@@ -1,13 +1,16 @@
 # import.standard
-from typing import List, Optional, Union
+from typing import Dict, List, Optional, Union
 
 # import.thirdparty
-from discord.ext import commands, tasks
+from discord.ext import commands
 
 # import.local
-from extra import utils
+from extra.voice_events import VoiceEvent, VoiceTransition, voice_handler, voice_writes
 from mysqldb import DatabaseCore
 
+# The amount of records kept in each user's Voice Channel history
+VOICE_CHANNEL_HISTORY_CAPACITY = 50
+
 class VoiceChannelHistoryTable(commands.Cog):
     """ Class for managing the VoiceChannelHistory table in the database. """
 
@@ -16,6 +19,8 @@ class VoiceChannelHistoryTable(commands.Cog):
 
         self.client = client
         self.db = DatabaseCore()
+        # user ID -> sequence number of their last record
+        self.history_seqs: Dict[int, int] = {}
 
     @commands.command(hidden=True)
     @commands.has_permissions(administrator=True)
@@ -33,11 +38,65 @@ class VoiceChannelHistoryTable(commands.Cog):
                 action_label VARCHAR(6) NOT NULL,
                 action_ts BIGINT NOT NULL,
                 vc_id BIGINT NOT NULL,
-                vc2_id BIGINT DEFAULT NULL
+                vc2_id BIGINT DEFAULT NULL,
+                slot SMALLINT NOT NULL,
+                seq BIGINT NOT NULL,
+                PRIMARY KEY (user_id, slot)
             )""")
 
         await ctx.send(f"**Table `VoiceChannelHistory` created, {member.mention}!**")
 
+    @commands.command(hidden=True)
+    @commands.has_permissions(administrator=True)
+    async def migrate_voice_channel_history_table(self, ctx: commands.Context) -> None:
+        """ Migrates a VoiceChannelHistory table from before the per-user slots, keeping the
+        last records of each user, numbered by their timestamps. """
+
+        member = ctx.author
+
+        if not await self.check_voice_channel_history_exists():
+            return await ctx.send(f"**Table `VoiceChannelHistory` doesn't exist, {member.mention}!**")
+
+        if await self.db.execute_query("SHOW COLUMNS FROM VoiceChannelHistory LIKE 'seq'", fetch="one"):
+            return await ctx.send(f"**Table `VoiceChannelHistory` is already migrated, {member.mention}!**")
+
+        await self.db.execute_query("DROP TABLE IF EXISTS VoiceChannelHistoryMigration")
+        await self.db.execute_query("""
+            CREATE TABLE VoiceChannelHistoryMigration (
+                user_id BIGINT NOT NULL,
+                action_label VARCHAR(6) NOT NULL,
+                action_ts BIGINT NOT NULL,
+                vc_id BIGINT NOT NULL,
+                vc2_id BIGINT DEFAULT NULL,
+                slot SMALLINT NOT NULL,
+                seq BIGINT NOT NULL,
+                PRIMARY KEY (user_id, slot)
+            )""")
+        await self.db.execute_query("""
+            INSERT INTO VoiceChannelHistoryMigration (user_id, slot, seq, action_label, action_ts, vc_id, vc2_id)
+            SELECT user_id, seq %% %s, seq, action_label, action_ts, vc_id, vc2_id FROM (
+                SELECT *,
+                    ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY action_ts) - 1 AS seq,
+                    ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY action_ts DESC) AS recency
+                FROM VoiceChannelHistory
+            ) AS numbered
+            WHERE recency <= %s""", (VOICE_CHANNEL_HISTORY_CAPACITY, VOICE_CHANNEL_HISTORY_CAPACITY))
+
+        old_count = await self.db.execute_query("SELECT COUNT(DISTINCT user_id) FROM VoiceChannelHistory", fetch="one")
+        new_count = await self.db.execute_query("SELECT COUNT(DISTINCT user_id) FROM VoiceChannelHistoryMigration", fetch="one")
+        if not old_count or not new_count or old_count[0] != new_count[0]:
+            await self.db.execute_query("DROP TABLE IF EXISTS VoiceChannelHistoryMigration")
+            return await ctx.send(f"**Couldn't migrate the `VoiceChannelHistory` table, it was left as it was, {member.mention}!**")
+
+        # Swaps both tables at once, so no insert goes to a missing table
+        await self.db.execute_query("""
+            RENAME TABLE VoiceChannelHistory TO VoiceChannelHistoryOld,
+            VoiceChannelHistoryMigration TO VoiceChannelHistory""")
+        await self.db.execute_query("DROP TABLE VoiceChannelHistoryOld")
+        self.history_seqs.clear()
+
+        await ctx.send(f"**Table `VoiceChannelHistory` migrated, {member.mention}!**")
+
     @commands.command(hidden=True)
     @commands.has_permissions(administrator=True)
     async def drop_voice_channel_history_table(self, ctx: commands.Context) -> None:
@@ -49,6 +108,7 @@ class VoiceChannelHistoryTable(commands.Cog):
             return await ctx.send(f"**Table `VoiceChannelHistory` doesn't exist, {member.mention}!**")
 
         await self.db.execute_query("DROP TABLE VoiceChannelHistory")
+        self.history_seqs.clear()
 
         await ctx.send(f"**Table `VoiceChannelHistory` dropped, {member.mention}!**")
 
@@ -63,6 +123,7 @@ class VoiceChannelHistoryTable(commands.Cog):
             return await ctx.send(f"**Table `VoiceChannelHistory` doesn't exist yet, {member.mention}!**")
 
         await self.db.execute_query("DELETE FROM VoiceChannelHistory")
+        self.history_seqs.clear()
 
         await ctx.send(f"**Table `VoiceChannelHistory` reset, {member.mention}!**")
 
@@ -71,43 +132,51 @@ class VoiceChannelHistoryTable(commands.Cog):
 
         return await self.db.table_exists("VoiceChannelHistory")
 
-    async def insert_voice_channel_history(self, user_id: int, action_label: str, action_ts: int, vc_id: int, vc2_id: Optional[int] = None) -> None:
-        """ Inserts a channel into the user's Voice Channel history.
+    async def get_next_voice_channel_history_seq(self, user_id: int) -> int:
+        """ Gets the sequence number of the user's next Voice Channel history record,
+        loading the user's last one from the database the first time.
+        :param user_id: The user ID. """
+
+        if user_id not in self.history_seqs:
+            last_seq = await self.db.execute_query(
+                "SELECT MAX(seq) FROM VoiceChannelHistory WHERE user_id = %s", (user_id,), fetch="one")
+            # Another event of the same user may have loaded it meanwhile
+            self.history_seqs.setdefault(user_id, last_seq[0] if last_seq and last_seq[0] is not None else -1)
+
+        self.history_seqs[user_id] += 1
+        return self.history_seqs[user_id]
+
+    async def insert_voice_channel_history(self, user_id: int, action_label: str, action_ts: int, vc_id: int, vc2_id: Optional[int] = None, buffered: bool = False) -> None:
+        """ Inserts a channel into the user's Voice Channel history, overwriting their oldest record once it's full.
         :param user_id: The user ID.
         :param action_label: The action label.
         :param action_ts: The timestamp of the action.
         :param vc_id: The Voice Channel ID.
-        :param vc2_id: The second Voice Channel ID, if any. [Optional] """
+        :param vc2_id: The second Voice Channel ID, if any. [Optional]
+        :param buffered: Whether to queue the insert for the voice events' next batched write. [Optional][Default=False] """
 
-        return await self.db.execute_query("""
+        seq = await self.get_next_voice_channel_history_seq(user_id)
+        values = (user_id, seq % VOICE_CHANNEL_HISTORY_CAPACITY, seq, action_label, action_ts, vc_id, vc2_id)
+        query = """
             INSERT INTO VoiceChannelHistory (
-                user_id, action_label, action_ts, vc_id, vc2_id
-            ) VALUES (%s, %s, %s, %s, %s)
-        """, (user_id, action_label, action_ts, vc_id, vc2_id))
+                user_id, slot, seq, action_label, action_ts, vc_id, vc2_id
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                seq = VALUES(seq), action_label = VALUES(action_label), action_ts = VALUES(action_ts),
+                vc_id = VALUES(vc_id), vc2_id = VALUES(vc2_id)
+        """
+        if buffered:
+            return voice_writes.add(query, values)
+
+        return await self.db.execute_query(query, values)
 
     async def get_voice_channel_history(self, user_id: int) -> List[List[Union[int, str]]]:
-        """ Gets the user's Voice Channel history.
+        """ Gets the user's Voice Channel history, from the newest to the oldest record.
         :param user_id: The user's ID. """
 
-        return await self.db.execute_query("SELECT * FROM VoiceChannelHistory WHERE user_id = %s ORDER BY action_ts DESC", (user_id,), fetch="all")
-
-    async def get_users_exceeding_records(self, limit: int = 10) -> List[List[int]]:
-        """ Gets all IDs of the users that have an amount of Voice Channel records
-        that exceeds the limit.
-        :param limit: The limit of records one can have. """
-
         return await self.db.execute_query("""
-            SELECT * FROM (
-                SELECT COUNT(*) AS records_count, user_id 
-                FROM VoiceChannelHistory GROUP BY user_id
-            ) AS result WHERE records_count >= %s;
-        """, (limit,), fetch="all")
-
-    async def delete_voice_channel_history(self, users: List[int]) -> None:
-        """ Deletes Voice Channels from the users' Voice Channel histories.
-        :param users: A list of users from whom to delete records from their history. """
-
-        await self.db.execute_query("DELETE FROM VoiceChannelHistory WHERE user_id = %s LIMIT %s", users, execute_many=True)
+            SELECT user_id, action_label, action_ts, vc_id, vc2_id FROM VoiceChannelHistory
+            WHERE user_id = %s ORDER BY seq DESC""", (user_id,), fetch="all")
 
 
 class VoiceChannelHistorySystem(commands.Cog):
@@ -118,44 +187,17 @@ class VoiceChannelHistorySystem(commands.Cog):
 
         self.client = client
 
-    @tasks.loop(minutes=1)
-    async def check_exceeding_voice_channels_from_history(self) -> None:
-        """ Checks for channels that are exceeding the amount of Voice Channel records
-        in people's histories. """
-
-        records_limit: int = 55
-        delete_records_limit: int = 5
-        if raw_users := await self.get_users_exceeding_records(limit=records_limit):
-            users = list(map(lambda result: [result[1], delete_records_limit], raw_users))
-            await self.delete_voice_channel_history(users)
-
-
-    @commands.Cog.listener(name="on_voice_state_update")
-    async def on_voice_state_update_voice_channel_history(self, member, before, after):
-        """ Registers a member whenever they join a channel. """
-
-        # === Checks whether the user just changed their state being in the same VC. ===
-        if before.self_mute != after.self_mute:
-            return
-        if before.self_deaf != after.self_deaf:
-            return
-        if before.self_stream != after.self_stream:
-            return
-        if before.self_video != after.self_video:
-            return
-
-        if before.mute != after.mute:
-            return
-        if before.deaf != after.deaf:
-            return
+    @voice_handler(VoiceTransition.JOIN, VoiceTransition.SWITCH, VoiceTransition.LEAVE, priority=40)
+    async def on_voice_state_update_voice_channel_history(self, member, before, after, event: VoiceEvent):
+        """ Registers a member whenever they join, switch or leave a channel. """
 
         bc, ac = before.channel, after.channel
 
-        current_ts = await utils.get_timestamp()
+        current_ts = event.timestamp
 
         if not bc and ac: # Join
-            await self.insert_voice_channel_history(member.id, "join", current_ts, ac.id)
+            await self.insert_voice_channel_history(member.id, "join", current_ts, ac.id, buffered=True)
         elif bc and ac: # Switch
-            await self.insert_voice_channel_history(member.id, "switch", current_ts, bc.id, ac.id)
+            await self.insert_voice_channel_history(member.id, "switch", current_ts, bc.id, ac.id, buffered=True)
         else: # Leave
-            await self.insert_voice_channel_history(member.id, "leave", current_ts, bc.id)
+            await self.insert_voice_channel_history(member.id, "leave", current_ts, bc.id, buffered=True)
@@ -0,0 +1,271 @@
+# import.standard
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+# import.thirdparty
+import discord
+from discord.ext import commands, tasks
+
+# import.local
+from extra.voice_events import VoiceEvent, VoiceTransition, voice_handler, voice_writes
+from mysqldb import DatabaseCore
+
+# variables.voicechannel
+voice_presence_retention_hours = int(os.getenv('VOICE_PRESENCE_RETENTION_HOURS', 6))
+voice_presence_max_interval_hours = int(os.getenv('VOICE_PRESENCE_MAX_INTERVAL_HOURS', 6))
+
+# Intervals are split every voice_presence_max_interval_hours, checked every 10 minutes, so no interval
+# starts earlier than this before a time it overlaps, which lets the lookups use a range on start_at
+PRESENCE_LOOKBACK = timedelta(hours=voice_presence_max_interval_hours, minutes=10)
+
+# Opens an interval, or closes it if it was already opened, since (member_id, start_at, channel_id) is the primary key.
+# The channel is part of it because start_at has a one-second resolution, so quick switches can open intervals
+# in different channels within the same second, and going back to a channel within it just extends its interval
+UPSERT_PRESENCE_QUERY = """
+    INSERT INTO VoicePresence (member_id, channel_id, start_at, end_at) VALUES (%s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE end_at = VALUES(end_at)"""
+
+
+class VoicePresenceTable(commands.Cog):
+    """ Class for managing the VoicePresence tables in the database, which store
+    the members' voice channel presences as (member, channel, start, end) intervals. """
+
+    def __init__(self, client: commands.Bot) -> None:
+        """ Class init method. """
+
+        self.client = client
+        self.db = DatabaseCore()
+
+    @commands.command(hidden=True)
+    @commands.has_permissions(administrator=True)
+    async def create_table_voice_presence(self, ctx) -> None:
+        """ Creates the VoicePresence, VoiceChannelNames and VoiceMemberNames tables. """
+
+        if await self.table_voice_presence_exists():
+            return await ctx.send("**The __VoicePresence__ table already exists!**")
+
+        await self.db.execute_query("""
+            CREATE TABLE VoicePresence (
+                member_id BIGINT NOT NULL,
+                channel_id BIGINT NOT NULL,
+                start_at DATETIME NOT NULL,
+                end_at DATETIME DEFAULT NULL,
+                PRIMARY KEY (member_id, start_at, channel_id),
+                INDEX channel_start (channel_id, start_at),
+                INDEX (end_at)
+            )""")
+        await self.db.execute_query("""
+            CREATE TABLE IF NOT EXISTS VoiceChannelNames (
+                channel_id BIGINT NOT NULL,
+                channel_name VARCHAR(100) NOT NULL,
+                PRIMARY KEY (channel_id)
+            ) DEFAULT CHARSET utf8mb4""")
+        await self.db.execute_query("""
+            CREATE TABLE IF NOT EXISTS VoiceMemberNames (
+                member_id BIGINT NOT NULL,
+                member_name VARCHAR(100) NOT NULL,
+                PRIMARY KEY (member_id)
+            ) DEFAULT CHARSET utf8mb4""")
+        await ctx.send("**Table __VoicePresence__ created!**")
+
+    @commands.command(hidden=True)
+    @commands.has_permissions(administrator=True)
+    async def drop_table_voice_presence(self, ctx) -> None:
+        """ Drops the VoicePresence, VoiceChannelNames and VoiceMemberNames tables. """
+
+        if not await self.table_voice_presence_exists():
+            return await ctx.send("**The __VoicePresence__ table doesn't exist!**")
+
+        await self.db.execute_query("DROP TABLE VoicePresence")
+        await self.db.execute_query("DROP TABLE IF EXISTS VoiceChannelNames")
+        await self.db.execute_query("DROP TABLE IF EXISTS VoiceMemberNames")
+        await ctx.send("**Table __VoicePresence__ dropped!**")
+
+    @commands.command(hidden=True)
+    @commands.has_permissions(administrator=True)
+    async def reset_table_voice_presence(self, ctx) -> None:
+        """ Resets the VoicePresence table. """
+
+        if not await self.table_voice_presence_exists():
+            return await ctx.send("**The __VoicePresence__ table doesn't exist yet!**")
+
+        await self.db.execute_query("DELETE FROM VoicePresence")
+        await ctx.send("**Table __VoicePresence__ reset!**")
+
+    async def table_voice_presence_exists(self) -> bool:
+        """ Checks whether the VoicePresence table exists. """
+
+        return await self.db.table_exists("VoicePresence")
+
+    async def close_open_voice_presences(self, end_at: datetime) -> None:
+        """ Closes the intervals that were left open, e.g. by a restart, at most at their maximum length.
+        :param end_at: The time to close them at. """
+
+        await self.db.execute_query(
+            "UPDATE VoicePresence SET end_at = LEAST(%s, start_at + INTERVAL %s HOUR) WHERE end_at IS NULL",
+            (end_at, voice_presence_max_interval_hours))
+
+    async def delete_old_voice_presences(self, older_than: datetime) -> None:
+        """ Deletes the intervals that ended before a given time.
+        :param older_than: The retention limit. """
+
+        await self.db.execute_query("DELETE FROM VoicePresence WHERE end_at < %s", (older_than,))
+
+    async def get_channel_presences(self, channel_id: int, start: datetime, end: datetime, limit: int, offset: int = 0) -> List[Tuple[int, str]]:
+        """ Gets a page of the members who were in a voice channel at some point of a time window,
+        scanning only the (channel_id, start_at) index range that can overlap it.
+        :param channel_id: The ID of the voice channel.
+        :param start: The start of the time window.
+        :param end: The end of the time window.
+        :param limit: The amount of members to get.
+        :param offset: The amount of members to skip. [Optional][Default=0] """
+
+        return await self.db.execute_query("""
+            SELECT VP.member_id, MAX(VMN.member_name)
+            FROM VoicePresence AS VP
+            LEFT JOIN VoiceMemberNames AS VMN ON VMN.member_id = VP.member_id
+            WHERE VP.channel_id = %s AND VP.start_at BETWEEN %s AND %s AND (VP.end_at IS NULL OR VP.end_at >= %s)
+            GROUP BY VP.member_id ORDER BY MIN(VP.start_at), VP.member_id LIMIT %s OFFSET %s""",
+            (channel_id, start - PRESENCE_LOOKBACK, end, start, limit, offset), fetch="all")
+
+    async def count_channel_presences(self, channel_id: int, start: datetime, end: datetime) -> int:
+        """ Counts the members who were in a voice channel at some point of a time window.
+        :param channel_id: The ID of the voice channel.
+        :param start: The start of the time window.
+        :param end: The end of the time window. """
+
+        count = await self.db.execute_query("""
+            SELECT COUNT(DISTINCT member_id) FROM VoicePresence
+            WHERE channel_id = %s AND start_at BETWEEN %s AND %s AND (end_at IS NULL OR end_at >= %s)""",
+            (channel_id, start - PRESENCE_LOOKBACK, end, start), fetch="one")
+        return count[0] if count else 0
+
+    async def get_member_presences(self, member_id: int, start: datetime, end: datetime, limit: int, offset: int = 0) -> List[Tuple[int, str]]:
+        """ Gets a page of the voice channels a member was in at some point of a time window,
+        scanning only the (member_id, start_at) index range that can overlap it.
+        :param member_id: The ID of the member.
+        :param start: The start of the time window.
+        :param end: The end of the time window.
+        :param limit: The amount of channels to get.
+        :param offset: The amount of channels to skip. [Optional][Default=0] """
+
+        return await self.db.execute_query("""
+            SELECT VP.channel_id, MAX(VCN.channel_name)
+            FROM VoicePresence AS VP
+            LEFT JOIN VoiceChannelNames AS VCN ON VCN.channel_id = VP.channel_id
+            WHERE VP.member_id = %s AND VP.start_at BETWEEN %s AND %s AND (VP.end_at IS NULL OR VP.end_at >= %s)
+            GROUP BY VP.channel_id ORDER BY MIN(VP.start_at), VP.channel_id LIMIT %s OFFSET %s""",
+            (member_id, start - PRESENCE_LOOKBACK, end, start, limit, offset), fetch="all")
+
+    async def count_member_presences(self, member_id: int, start: datetime, end: datetime) -> int:
+        """ Counts the voice channels a member was in at some point of a time window.
+        :param member_id: The ID of the member.
+        :param start: The start of the time window.
+        :param end: The end of the time window. """
+
+        count = await self.db.execute_query("""
+            SELECT COUNT(DISTINCT channel_id) FROM VoicePresence
+            WHERE member_id = %s AND start_at BETWEEN %s AND %s AND (end_at IS NULL OR end_at >= %s)""",
+            (member_id, start - PRESENCE_LOOKBACK, end, start), fetch="one")
+        return count[0] if count else 0
+
+    def upsert_voice_channel_name(self, channel_id: int, channel_name: str) -> None:
+        """ Queues the update of a voice channel's name in the lookup table.
+        :param channel_id: The ID of the voice channel.
+        :param channel_name: The name of the voice channel. """
+
+        voice_writes.add("""
+            INSERT INTO VoiceChannelNames (channel_id, channel_name) VALUES (%s, %s)
+            ON DUPLICATE KEY UPDATE channel_name = VALUES(channel_name)""", (channel_id, channel_name))
+
+    def upsert_voice_member_name(self, member_id: int, member_name: str) -> None:
+        """ Queues the update of a member's name in the lookup table.
+        :param member_id: The ID of the member.
+        :param member_name: The name of the member. """
+
+        voice_writes.add("""
+            INSERT INTO VoiceMemberNames (member_id, member_name) VALUES (%s, %s)
+            ON DUPLICATE KEY UPDATE member_name = VALUES(member_name)""", (member_id, member_name))
+
+
+class VoicePresenceSystem(commands.Cog):
+    """ Class for the VoicePresence system, which opens and closes
+    the members' presence intervals from the voice events. """
+
+    def __init__(self, client: commands.Bot) -> None:
+        """ Class init method. """
+
+        self.client = client
+        # member ID -> (channel ID, start of the open interval)
+        self.open_presences: Dict[int, Tuple[int, datetime]] = {}
+        # ID -> last name written to the lookup tables
+        self.known_names: Dict[int, str] = {}
+
+    async def rebuild_voice_presences(self, guild: discord.Guild) -> None:
+        """ Closes the intervals left open by a restart and opens the ones of everyone in a voice channel.
+        :param guild: The guild to look at the voice channels of. """
+
+        current_time = datetime.utcnow().replace(microsecond=0)
+        for member_id in list(self.open_presences):
+            self.close_voice_presence(member_id, current_time)
+        await voice_writes.flush()
+        await self.close_open_voice_presences(current_time)
+
+        self.open_presences.clear()
+        for channel in guild.voice_channels:
+            for member in channel.members:
+                self.open_voice_presence(member, channel, current_time)
+
+    def open_voice_presence(self, member: discord.Member, channel: discord.abc.GuildChannel, start_at: datetime) -> None:
+        """ Opens a member's presence interval in a voice channel.
+        :param member: The member.
+        :param channel: The voice channel.
+        :param start_at: When the member joined the channel. """
+
+        self.open_presences[member.id] = (channel.id, start_at)
+        voice_writes.add(UPSERT_PRESENCE_QUERY, (member.id, channel.id, start_at, None))
+
+        for target_id, name, upsert in (
+            (member.id, member.name, self.upsert_voice_member_name), (channel.id, channel.name, self.upsert_voice_channel_name)
+        ):
+            if self.known_names.get(target_id) != name:
+                self.known_names[target_id] = name
+                upsert(target_id, name)
+
+    def close_voice_presence(self, member_id: int, end_at: datetime) -> None:
+        """ Closes a member's open presence interval, if any.
+        :param member_id: The ID of the member.
+        :param end_at: When the member left the channel. """
+
+        if presence := self.open_presences.pop(member_id, None):
+            channel_id, start_at = presence
+            voice_writes.add(UPSERT_PRESENCE_QUERY, (member_id, channel_id, start_at, end_at))
+
+    @voice_handler(VoiceTransition.JOIN, VoiceTransition.SWITCH, VoiceTransition.LEAVE, priority=30)
+    async def on_voice_state_update_voice_presence(self, member, before, after, event: VoiceEvent) -> None:
+        """ Closes the presence interval in the channel the member left and opens one in the channel they joined. """
+
+        current_time = datetime.utcfromtimestamp(event.timestamp)
+        self.close_voice_presence(member.id, current_time)
+        if after.channel:
+            self.open_voice_presence(member, after.channel, current_time)
+
+    def split_long_voice_presences(self, current_time: datetime) -> None:
+        """ Closes the open intervals that reached their maximum length and opens new ones in the same channels.
+        :param current_time: The current time. """
+
+        max_length = timedelta(hours=voice_presence_max_interval_hours)
+        for member_id, (channel_id, start_at) in list(self.open_presences.items()):
+            if current_time - start_at >= max_length:
+                voice_writes.add(UPSERT_PRESENCE_QUERY, (member_id, channel_id, start_at, current_time))
+                voice_writes.add(UPSERT_PRESENCE_QUERY, (member_id, channel_id, current_time, None))
+                self.open_presences[member_id] = (channel_id, current_time)
+
+    @tasks.loop(minutes=10)
+    async def delete_old_voice_presences_loop(self) -> None:
+        """ Splits the intervals that got too long and deletes the ones older than the retention window. """
+
+        current_time = datetime.utcnow().replace(microsecond=0)
+        self.split_long_voice_presences(current_time)
+        await self.delete_old_voice_presences(current_time - timedelta(hours=voice_presence_retention_hours))
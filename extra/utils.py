@@ -1,10 +1,11 @@
 # import.standard
+import asyncio
 import re
 import shlex
 from collections import OrderedDict
 from datetime import datetime
 from io import BytesIO
-from typing import Dict, Iterable, List, Optional, Union
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Union
 
 # import.thirdparty
 import aiohttp
@@ -417,9 +418,19 @@ async def get_user_pfp(member, thumb_width: int = 59) -> Image:
 
     async with session.get(str(member.display_avatar)) as response:
         image_bytes = await response.content.read()
-        with BytesIO(image_bytes) as pfp:
-            image = Image.open(pfp)
-            im = image.convert('RGBA')
+
+    # Decoding and masking the avatar is CPU-bound, so it's kept off the event loop
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(None, make_round_thumbnail, image_bytes, thumb_width)
+
+def make_round_thumbnail(image_bytes: bytes, thumb_width: int) -> Image:
+    """ Makes a round thumbnail out of an image. It's blocking, so it should run in an executor.
+    :param image_bytes: The bytes of the image.
+    :param thumb_width: The width of the thumbnail. """
+
+    with BytesIO(image_bytes) as pfp:
+        image = Image.open(pfp)
+        im = image.convert('RGBA')
 
     def crop_center(pil_img, crop_width, crop_height):
         img_width, img_height = pil_img.size
@@ -478,3 +489,16 @@ async def get_subscriptions_count(member_id: int, guild: discord.Guild) -> int:
         ent for ent in entitlements
         if ent.type in (EntitlementType.application_subscription, EntitlementType.purchase)
     ])
+
+async def retry_on_rate_limit(func: Callable[..., Awaitable[Any]], *args, attempts: int = 3, **kwargs) -> Any:
+    """ Calls a Discord API coroutine, waiting and retrying it when it's rate limited or Discord is briefly unavailable.
+    :param func: The coroutine function to call.
+    :param attempts: How many times to try it before giving up. [Optional][Default=3] """
+
+    for attempt in range(attempts):
+        try:
+            return await func(*args, **kwargs)
+        except discord.HTTPException as e:
+            if attempt == attempts - 1 or e.status not in (429, 502, 503, 504):
+                raise
+            await asyncio.sleep(getattr(e, 'retry_after', None) or 2 ** attempt)
@@ -430,11 +430,15 @@ class ExchangeActivityView(discord.ui.View):
         member = interaction.user
         ctx.author = member
 
+        await interaction.response.defer()
+        SlothCurrency = self.client.get_cog('SlothCurrency')
+        # Exchanges the current counters rather than the ones shown when the command was run
+        if user_info := await SlothCurrency.get_user_activity_info(member.id, flush=True):
+            self.user_info = user_info[0]
+
         m, s = divmod(self.user_info[2], 60)
         h, m = divmod(m, 60)
 
-        await interaction.response.defer()
-        SlothCurrency = self.client.get_cog('SlothCurrency')
         is_sub = await utils.is_subscriber(check_adm=False, throw_exc=False).predicate(ctx)
         cmsg, message_times = await SlothCurrency.convert_messages(self.user_info[1], is_sub)
         ctime, time_times = await SlothCurrency.convert_time(self.user_info[2], is_sub)
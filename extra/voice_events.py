@@ -0,0 +1,161 @@
+# import.standard
+import enum
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+# import.thirdparty
+import discord
+
+# import.local
+from mysqldb import DatabaseCore
+
+
+class VoiceTransition(enum.Enum):
+    """ Class for the kinds of voice state transitions. """
+
+    JOIN = "join"
+    LEAVE = "leave"
+    SWITCH = "switch"
+    MUTE = "mute"
+    UNMUTE = "unmute"
+    DEAFEN = "deafen"
+    UNDEAFEN = "undeafen"
+    SERVER_MUTE = "server_mute"
+    SERVER_UNMUTE = "server_unmute"
+    SERVER_DEAFEN = "server_deafen"
+    SERVER_UNDEAFEN = "server_undeafen"
+    STREAM_START = "stream_start"
+    STREAM_END = "stream_end"
+    VIDEO_START = "video_start"
+    VIDEO_END = "video_end"
+
+
+CHANNEL_TRANSITIONS = {VoiceTransition.JOIN, VoiceTransition.LEAVE, VoiceTransition.SWITCH}
+
+# VoiceState attribute -> (transition when it's turned on, transition when it's turned off)
+STATE_TRANSITIONS: Dict[str, Tuple[VoiceTransition, VoiceTransition]] = {
+    "self_mute": (VoiceTransition.MUTE, VoiceTransition.UNMUTE),
+    "self_deaf": (VoiceTransition.DEAFEN, VoiceTransition.UNDEAFEN),
+    "mute": (VoiceTransition.SERVER_MUTE, VoiceTransition.SERVER_UNMUTE),
+    "deaf": (VoiceTransition.SERVER_DEAFEN, VoiceTransition.SERVER_UNDEAFEN),
+    "self_stream": (VoiceTransition.STREAM_START, VoiceTransition.STREAM_END),
+    "self_video": (VoiceTransition.VIDEO_START, VoiceTransition.VIDEO_END),
+}
+
+
+def voice_handler(*kinds: VoiceTransition, priority: int = 100) -> Callable:
+    """ Registers a cog method as a handler of the voice event bus.
+    The method is called with the member, the before and after voice states and the VoiceEvent,
+    only for the events that contain at least one of the given transitions.
+    :param kinds: The transitions to handle.
+    :param priority: The order in which the handler is started; lower starts first.
+    The handlers of an event run concurrently, so it only orders the parts before their first await. [Optional][Default=100] """
+
+    def decorator(func: Callable) -> Callable:
+        func.__voice_handler_kinds__ = frozenset(kinds)
+        func.__voice_handler_priority__ = priority
+        return func
+
+    return decorator
+
+
+class VoiceEvent:
+    """ A gateway voice state update, normalized into its transitions once for all the handlers. """
+
+    def __init__(self, member: discord.Member, before: discord.VoiceState, after: discord.VoiceState, timestamp: int) -> None:
+        """ Class init method.
+        :param member: The member whose voice state changed.
+        :param before: The voice state before the update.
+        :param after: The voice state after the update.
+        :param timestamp: The timestamp of the update. """
+
+        self.member = member
+        self.before = before
+        self.after = after
+        self.timestamp = timestamp
+        self.kinds: Set[VoiceTransition] = self.get_transitions(before, after)
+
+    @staticmethod
+    def get_transitions(before: discord.VoiceState, after: discord.VoiceState) -> Set[VoiceTransition]:
+        """ Gets the transitions between two voice states.
+        :param before: The voice state before the update.
+        :param after: The voice state after the update. """
+
+        kinds = set()
+        bc, ac = before.channel, after.channel
+        if ac and not bc:
+            kinds.add(VoiceTransition.JOIN)
+        elif bc and not ac:
+            kinds.add(VoiceTransition.LEAVE)
+        elif bc and ac and bc.id != ac.id:
+            kinds.add(VoiceTransition.SWITCH)
+
+        for attribute, (turned_on, turned_off) in STATE_TRANSITIONS.items():
+            was, now = getattr(before, attribute), getattr(after, attribute)
+            if was != now:
+                kinds.add(turned_on if now else turned_off)
+
+        return kinds
+
+    @property
+    def before_channel(self) -> Optional[discord.abc.GuildChannel]:
+        """ The channel the member was in, if any. """
+
+        return self.before.channel
+
+    @property
+    def after_channel(self) -> Optional[discord.abc.GuildChannel]:
+        """ The channel the member is in, if any. """
+
+        return self.after.channel
+
+    @property
+    def is_channel_change(self) -> bool:
+        """ Whether the member joined, left or switched channels. """
+
+        return not self.kinds.isdisjoint(CHANNEL_TRANSITIONS)
+
+
+class VoiceWriteBatch:
+    """ Collects the voice handlers' inserts and writes them once per tick,
+    one executemany per statement.
+    PS: Writes that are read back within the same flow, e.g. ModActivity's join timestamp
+    or TeacherFeedback's class rows, are still written directly. """
+
+    def __init__(self) -> None:
+        """ Class init method. """
+
+        self.db = DatabaseCore()
+        # query -> rows
+        self._pending: Dict[str, List[Iterable[Any]]] = {}
+        self.flushes: int = 0
+        self.statements: int = 0
+        self.rows: int = 0
+
+    def add(self, query: str, values: Iterable[Any]) -> None:
+        """ Queues a row to be written in the next flush.
+        :param query: The query to run, which must be the same for all the rows of a statement.
+        :param values: The values of the row. """
+
+        self._pending.setdefault(query, []).append(values)
+
+    def __len__(self) -> int:
+        """ The amount of rows waiting to be written. """
+
+        return sum(len(rows) for rows in self._pending.values())
+
+    async def flush(self) -> None:
+        """ Writes all the queued rows. """
+
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return
+
+        for query, rows in pending.items():
+            await self.db.execute_query(query, rows, execute_many=True)
+            self.statements += 1
+            self.rows += len(rows)
+        self.flushes += 1
+
+
+voice_writes = VoiceWriteBatch()
+
@@ -18,8 +18,12 @@ from extra.customerrors import (ActionSkillOnCooldown, ActionSkillsLocked,
                                 MissingRequiredSlothClass, NotSubscribed,
                                 SkillsUsedRequirement, StillInRehabError,
                                 SlothAccountNotFound, NotEnoughMoneyError)
+from extra.gif_manager import effect_gifs
 from extra.menu import PaginatorView
+from extra.scheduler import scheduler
 from extra.useful_variables import patreon_roles
+from extra.voice_events import voice_writes
+from mysqldb import DatabaseCore, counter_buffer
 
 load_dotenv()
 
@@ -60,13 +64,30 @@ shades_of_pink = cycle([(252, 15, 192), (255, 0, 255), (248, 24, 148),
               (223, 82, 134), (254, 127, 156), (253, 171, 159)
               ])
 
+class SlothBot(commands.Bot):
+    """ The bot client, closing the shared database pools on shutdown. """
+
+    async def close(self) -> None:
+        """ Closes the bot, stops the deadline scheduler and the effect GIF workers, saves the ongoing
+        voice sessions, drains the write-behind buffer and closes the database pools. """
+
+        await scheduler.close()
+        effect_gifs.close()
+        if SlothCurrency := self.get_cog('SlothCurrency'):
+            await SlothCurrency.save_voice_sessions()
+        await super().close()
+        await voice_writes.flush()
+        await counter_buffer.close()
+        await DatabaseCore.close_pools()
+
 # Making the client variable
-client = commands.Bot(command_prefix='z!', intents=discord.Intents.all(), help_command=None, case_insensitive=True)
+client = SlothBot(command_prefix='z!', intents=discord.Intents.all(), help_command=None, case_insensitive=True)
 
 # Tells when the bot is online
 @client.event
 async def on_ready() -> None:
     change_color.start()
+    await DatabaseCore().load_schema_cache()
     print('[sloth] Bot is ready!')
 
 
@@ -352,6 +373,24 @@ async def uptime(ctx: commands.Context) -> None:
     await ctx.send(f"I've been online for {uptime_stamp}")
 
 
+@client.command(hidden=True, aliases=['pool_stats'])
+@commands.has_permissions(administrator=True)
+async def db_pool_stats(ctx: commands.Context) -> None:
+    """ (ADM) Shows the usage stats of the database connection pools. """
+
+    stats = DatabaseCore.get_pool_stats()
+    if not stats:
+        return await ctx.send("**No database pool has been opened yet!**")
+
+    embed = discord.Embed(title="__Database Pools__", color=ctx.author.color, timestamp=ctx.message.created_at)
+    for database_name, pool_stats in stats.items():
+        embed.add_field(
+            name=database_name.title(),
+            value=f"```ini\n[In use]: {pool_stats['in_use']}/{pool_stats['max_size']}\n[Free]: {pool_stats['free']}\n[Acquired]: {pool_stats['acquired']}\n[Avg wait]: {pool_stats['avg_wait_ms']}ms\n[Max wait]: {pool_stats['max_wait_ms']}ms```",
+            inline=True)
+    await ctx.send(embed=embed)
+
+
 async def make_help_embed(req: str, member: Union[discord.Member, discord.User], search: str, example: Any, 
     offset: int, lentries: int, entries: Dict[str, Any], title: str = None, result: str = None, **kwargs: Dict[str, Any]) -> discord.Embed:
     """ Makes an embed for .
@@ -546,8 +585,10 @@ forbidden_files: List[str] = [
     # 'createdynamicroom.py'
 ]
 
-for filename in os.listdir('./cogs'):
-    if filename.endswith('.py') and filename not in forbidden_files:
-        client.load_extension(f'cogs.{filename[:-3]}')
+# The effect GIF workers are spawned, so they import this module too, and mustn't start the bot
+if __name__ == '__main__':
+    for filename in os.listdir('./cogs'):
+        if filename.endswith('.py') and filename not in forbidden_files:
+            client.load_extension(f'cogs.{filename[:-3]}')
 
-client.run(os.getenv('TOKEN'))
+    client.run(os.getenv('TOKEN'))
@@ -1,8 +1,9 @@
 # import.standard
 import asyncio
 import os
+import time
 #from contextlib import asynccontextmanager
-from typing import Any, Dict, Iterable, Literal, Optional, Tuple, Union
+from typing import Any, Dict, Iterable, Literal, Optional, Set, Tuple, Union
 
 # import.thirdparty
 import aiomysql
@@ -41,41 +42,133 @@ class DatabaseCore:
         "CREATE", "DROP", "INSERT",
         "UPDATE", "DELETE",
     )
+    SCHEMA_CHANGING_METHODS = (
+        "CREATE", "DROP", "ALTER", "RENAME",
+    )
+
+    # Table names of each database, loaded once and dropped on schema changes
+    _schema_cache: Dict[str, Set[str]] = {}
+
+    # One shared, lazily created pool per logical database ("sloth", "django")
+    _pools: Dict[str, aiomysql.Pool] = {}
+    _pool_locks: Dict[str, asyncio.Lock] = {}
+    _pool_waits: Dict[str, Dict[str, float]] = {}
+    # Set once shutdown starts, so no new pools get created behind close_pools()
+    _closing_pools: bool = False
+
+    async def get_pool(self, database_name: str) -> aiomysql.Pool:
+        """ Gets the shared connection pool of a database, creating it on first use.
+        :param database_name: The name of the database to get the pool from. """
+
+        if DatabaseCore._closing_pools:
+            raise RuntimeError("The database pools are closing")
+
+        if (pool := DatabaseCore._pools.get(database_name)) and not pool._closing:
+            return pool
+
+        lock = DatabaseCore._pool_locks.setdefault(database_name, asyncio.Lock())
+        async with lock:
+            if DatabaseCore._closing_pools:
+                raise RuntimeError("The database pools are closing")
+            if (pool := DatabaseCore._pools.get(database_name)) and not pool._closing:
+                return pool
+
+            prefix: str = database_name.upper()
+            pool = await aiomysql.create_pool(
+                host=os.getenv(f"{prefix}_DB_HOST"),
+                user=os.getenv(f"{prefix}_DB_USER"),
+                password=os.getenv(f"{prefix}_DB_PASSWORD"),
+                db=os.getenv(f"{prefix}_DB_NAME"),
+                minsize=int(os.getenv(f"{prefix}_DB_POOL_MIN_SIZE", 1)),
+                maxsize=int(os.getenv(f"{prefix}_DB_POOL_MAX_SIZE", 10)),
+                pool_recycle=int(os.getenv(f"{prefix}_DB_POOL_RECYCLE", 3600)),
+                autocommit=True,
+            )
+            DatabaseCore._pools[database_name] = pool
+            DatabaseCore._pool_waits.setdefault(database_name, {"acquired": 0, "wait_total": 0.0, "wait_max": 0.0})
+            return pool
     
     async def get_connection(self, database_name: str) -> Tuple[object, object]:
-        """ Gets the database connection.
-        :param database_name: The name of the database to get. """
+        """ Gets a database connection from the shared pool.
+        :param database_name: The name of the database to get.
+        PS: The connection has to be given back with release_connection(). """
         
-        pool = await aiomysql.create_pool(
-            host=os.getenv(f"{database_name.upper()}_DB_HOST"),
-            user=os.getenv(f"{database_name.upper()}_DB_USER"),
-            password=os.getenv(f"{database_name.upper()}_DB_PASSWORD"),
-            db=os.getenv(f"{database_name.upper()}_DB_NAME"),
-            loop=django_loop,
-        )
+        pool = await self.get_pool(database_name)
 
+        start = time.perf_counter()
         db = await pool.acquire()
+        waited = time.perf_counter() - start
+
+        waits = DatabaseCore._pool_waits[database_name]
+        waits["acquired"] += 1
+        waits["wait_total"] += waited
+        waits["wait_max"] = max(waits["wait_max"], waited)
+
         mycursor = await db.cursor()
         return mycursor, db
+
+    async def release_connection(self, database_name: str, db: object) -> None:
+        """ Gives a connection back to its database pool.
+        :param database_name: The name of the database the connection belongs to.
+        :param db: The connection to release. """
+
+        if pool := DatabaseCore._pools.get(database_name):
+            pool.release(db)
+
+    @classmethod
+    async def close_pools(cls) -> None:
+        """ Closes all database pools, waiting for the in-use connections to be released.
+        PS: The pools stay registered until they're closed, so running queries can still release their connections. """
+
+        cls._closing_pools = True
+        pools = list(cls._pools.values())
+        for pool in pools:
+            pool.close()
+        for pool in pools:
+            await pool.wait_closed()
+        cls._pools.clear()
+
+    @classmethod
+    def get_pool_stats(cls) -> Dict[str, Dict[str, Union[int, float]]]:
+        """ Gets the in-use, free and wait time stats of each database pool. """
+
+        stats = {}
+        for database_name, pool in cls._pools.items():
+            waits = cls._pool_waits.get(database_name, {})
+            acquired = waits.get("acquired", 0)
+            stats[database_name] = {
+                "size": pool.size,
+                "in_use": pool.size - pool.freesize,
+                "free": pool.freesize,
+                "max_size": pool.maxsize,
+                "acquired": acquired,
+                "avg_wait_ms": round(waits.get("wait_total", 0) / acquired * 1000, 3) if acquired else 0,
+                "max_wait_ms": round(waits.get("wait_max", 0) * 1000, 3),
+            }
+        return stats
     
     async def execute_query(self,
         query: str,
         values: Iterable = [],
         connection: Optional[Tuple[object, object]] = None,
         execute_many: bool = False,
-        fetch: Optional[Literal["one", "all"]] = None,
+        fetch: Optional[Literal["one", "all", "lastrowid"]] = None,
         database_name: Literal["sloth", "django"] = "sloth",
-        description: bool = False
+        description: bool = False,
+        raise_errors: bool = False
     ) -> Union[Tuple[Dict[str, Any], Optional[Any], Optional[Any]]]:
         """ Executes a database query.
         :param query: The query itself to run.
         :param values: The values to pass in to the query.
-        :param fetch: Whether to fetch one, all or no objects from the cursor.
+        :param fetch: Whether to fetch one, all or no objects from the cursor, or the ID of the inserted row.
+        :param raise_errors: Whether to raise the query's error instead of returning an empty result,
+        for callers that must tell a failed read from an empty one. [Optional][Default=False]
         """
 
         data = [] if fetch == "all" else None
         fetch = None if not fetch else fetch.lower()
-        if not connection:
+        pooled: bool = not connection
+        if pooled:
             mycursor, db = await self.get_connection(database_name)
         else:
             mycursor, db = connection
@@ -90,27 +183,189 @@ class DatabaseCore:
             if query.upper().strip().startswith(self.COMMITABLE_METHODS):
                 await db.commit()
 
+            if query.upper().strip().startswith(self.SCHEMA_CHANGING_METHODS):
+                DatabaseCore._schema_cache.pop(database_name, None)
+
             if fetch == "one":
                 data = await mycursor.fetchone()
 
             elif fetch == "all":
                 data = await mycursor.fetchall()
+
+            elif fetch == "lastrowid":
+                data = mycursor.lastrowid
         except Exception as e:
             print("Error at query:", str(query))
             print("Error:", str(e))
+            if raise_errors:
+                raise
         finally:
             await mycursor.close()
+            if pooled:
+                await self.release_connection(database_name, db)
 
         if description:
             return data, mycursor.description
         return data
 
-    async def table_exists(self, table_name: str) -> bool:
-        """ Checks whether a given table exists or not.
-        :param table_name: The table name to check. """
+    async def load_schema_cache(self, database_name: Literal["sloth", "django"] = "sloth") -> Set[str]:
+        """ Loads the table names of a database into the schema cache.
+        :param database_name: The name of the database to load. [Default=sloth] """
+
+        tables = await self.execute_query("SHOW TABLES", fetch="all", database_name=database_name)
+        if not tables:
+            # Failed queries also come back empty, so it only caches a real table list
+            return set()
+
+        # Lowercased, since table_exists() is case-insensitive, as SHOW TABLE STATUS LIKE was
+        table_names = {table[0].lower() for table in tables}
+        DatabaseCore._schema_cache[database_name] = table_names
+        return table_names
+
+    async def table_exists(self, table_name: str, database_name: Literal["sloth", "django"] = "sloth") -> bool:
+        """ Checks whether a given table exists or not, case-insensitively, using the schema cache.
+        :param table_name: The table name to check.
+        :param database_name: The name of the database to check. [Default=sloth] """
+
+        table_names = DatabaseCore._schema_cache.get(database_name)
+        if table_names is None:
+            table_names = await self.load_schema_cache(database_name)
+
+        return table_name.lower() in table_names
+
+
+class CounterBuffer:
+    """ Write-behind buffer that coalesces hot per-message counter updates
+    and flushes them as one multi-row UPDATE per table column. """
+
+    def __init__(self, flush_interval: float = None, max_entries: int = None) -> None:
+        """ Class init method.
+        :param flush_interval: Seconds between periodic flushes. [Optional][Default=COUNTER_BUFFER_FLUSH_SECONDS or 10]
+        :param max_entries: Amount of pending entries that triggers an early flush. [Optional][Default=COUNTER_BUFFER_MAX_ENTRIES or 500] """
+
+        self.db = DatabaseCore()
+        self.flush_interval = flush_interval or float(os.getenv("COUNTER_BUFFER_FLUSH_SECONDS", 10))
+        self.max_entries = max_entries or int(os.getenv("COUNTER_BUFFER_MAX_ENTRIES", 500))
+        # (table, column, key_column, operation) -> {key: value}
+        self._pending: Dict[Tuple[str, str, Optional[str], str], Dict[Any, Any]] = {}
+        self._in_flight: Dict[Tuple[str, str, Optional[str], str], Dict[Any, Any]] = {}
+        self._entries: int = 0
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        self._flushing: Optional[asyncio.Task] = None
+
+    def _ensure_started(self) -> None:
+        """ Starts the periodic flushing task if it's not running yet. """
+
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def _run(self) -> None:
+        """ Flushes the buffer every flush_interval seconds. """
+
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def _add_entry(self, group: Tuple[str, str, Optional[str], str], key: Any, value: Any) -> None:
+        """ Adds or merges a value into a pending group and triggers an early flush if the buffer is full. """
+
+        self._ensure_started()
+        entries = self._pending.setdefault(group, {})
+        if key not in entries:
+            self._entries += 1
+            entries[key] = value
+        elif group[3] == "add":
+            entries[key] += value
+        else:
+            entries[key] = value
+
+        if self._entries >= self.max_entries and (self._flushing is None or self._flushing.done()):
+            self._flushing = asyncio.ensure_future(self.flush())
+
+    async def increment(self, table: str, column: str, delta: int = 1, key_column: Optional[str] = None, key: Any = None) -> None:
+        """ Buffers an increment of a counter column.
+        :param table: The table to update.
+        :param column: The counter column to increment.
+        :param delta: The value to add to the counter. [Default=1]
+        :param key_column: The column identifying the row, if not a single-row table. [Optional]
+        :param key: The value of the key column. [Optional] """
+
+        self._add_entry((table, column, key_column, "add"), key, delta)
+
+    async def set(self, table: str, column: str, value: Any, key_column: Optional[str] = None, key: Any = None) -> None:
+        """ Buffers a value assignment of a column; the latest value wins.
+        :param table: The table to update.
+        :param column: The column to set.
+        :param value: The value to set.
+        :param key_column: The column identifying the row, if not a single-row table. [Optional]
+        :param key: The value of the key column. [Optional] """
+
+        self._add_entry((table, column, key_column, "set"), key, value)
+
+    def peek(self, table: str, column: str, key_column: Optional[str] = None, key: Any = None) -> Tuple[int, Any]:
+        """ Gets the pending, not flushed yet, values of a column for a row.
+        :param table: The table of the column.
+        :param column: The column to peek.
+        :param key_column: The column identifying the row. [Optional]
+        :param key: The value of the key column. [Optional]
+        :returns: The pending increment (0 if none) and the pending assigned value (None if none). """
+
+        increment, value = 0, None
+        # Values being written right now are not visible in the database yet either
+        for pending in (self._in_flight, self._pending):
+            increment += pending.get((table, column, key_column, "add"), {}).get(key, 0)
+            value = pending.get((table, column, key_column, "set"), {}).get(key, value)
+        return increment, value
+
+    async def flush(self) -> None:
+        """ Writes all pending values to the database, one statement per table column. """
+
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+
+        async with self._flush_lock:
+            pending, self._pending = self._pending, {}
+            self._in_flight = pending
+            self._entries = 0
+            try:
+                await self._write(pending)
+            finally:
+                self._in_flight = {}
+
+    async def _write(self, pending: Dict[Tuple[str, str, Optional[str], str], Dict[Any, Any]]) -> None:
+        """ Writes a snapshot of pending values to the database.
+        :param pending: The pending groups to write. """
+
+        for (table, column, key_column, operation), entries in pending.items():
+            if not key_column:
+                value = entries[None]
+                if operation == "add":
+                    await self.db.execute_query(f"UPDATE {table} SET {column} = {column} + %s", (value,))
+                else:
+                    await self.db.execute_query(f"UPDATE {table} SET {column} = %s", (value,))
+                continue
+
+            items = list(entries.items())
+            # Chunks the rows so a single statement doesn't grow unbounded
+            for i in range(0, len(items), 500):
+                chunk = items[i:i + 500]
+                cases = " ".join(["WHEN %s THEN %s"] * len(chunk))
+                new_value = f"{column} + CASE {key_column} {cases} ELSE 0 END" if operation == "add" else f"CASE {key_column} {cases} ELSE {column} END"
+                keys = ", ".join(["%s"] * len(chunk))
+                values = [v for item in chunk for v in item] + [key for key, _ in chunk]
+                await self.db.execute_query(
+                    f"UPDATE {table} SET {column} = {new_value} WHERE {key_column} IN ({keys})", values)
+
+    async def close(self) -> None:
+        """ Stops the periodic flushing and drains what is left in the buffer. """
+
+        if self._task and not self._task.done():
+            self._task.cancel()
+        self._task = None
+        await self.flush()
+
 
-        return any(await self.execute_query(
-            query="SHOW TABLE STATUS LIKE %s;",
-            values=(table_name,),
-            fetch="all",
-        ))
+counter_buffer = CounterBuffer()
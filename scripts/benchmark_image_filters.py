@@ -0,0 +1,72 @@
+""" Compares the lookup-table colour filters against the former per-pixel loop on a 1024px avatar.
+
+Usage: python -m scripts.benchmark_image_filters [--size 1024] [--runs 5] """
+
+# import.standard
+import argparse
+import os
+import time
+from typing import Callable
+
+# import.thirdparty
+from PIL import Image
+
+# import.local
+from extra import image_filters
+
+
+def per_pixel_brightness(image: Image.Image, multiplier: float, r: bool = True, g: bool = True, b: bool = True) -> Image.Image:
+    """ The former ImageManipulation.change_image_brightness loop, with the clamping it meant to do. """
+
+    new_image = Image.new('RGB', image.size)
+    new_image_list = []
+    for pixel in image.getdata():
+        new_image_list.append((
+            min(255, max(0, int(pixel[0] * multiplier))) if r else pixel[0],
+            min(255, max(0, int(pixel[1] * multiplier))) if g else pixel[1],
+            min(255, max(0, int(pixel[2] * multiplier))) if b else pixel[2],
+        ))
+    new_image.putdata(new_image_list)
+    return new_image
+
+
+def best_of(runs: int, func: Callable[[], Image.Image]) -> float:
+    """ Gets the fastest of a few runs of a function, in seconds. """
+
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    """ Runs the benchmark. """
+
+    parser = argparse.ArgumentParser(description="Benchmarks the ImageManipulation colour filters.")
+    parser.add_argument('--size', type=int, default=1024, help="The width and height of the avatar. [Default=1024]")
+    parser.add_argument('--runs', type=int, default=5, help="How many runs to take the fastest of. [Default=5]")
+    args = parser.parse_args()
+
+    image = Image.frombytes('RGBA', (args.size, args.size), os.urandom(args.size * args.size * 4))
+    filters = {
+        'lighten': (1.55, True, True, True),
+        'darken': (0.45, True, True, True),
+        'red': (1.55, True, False, False),
+        'light_blue': (1.55, False, True, True),
+    }
+
+    for name, (multiplier, r, g, b) in filters.items():
+        expected = per_pixel_brightness(image, multiplier, r, g, b)
+        result = image_filters.change_brightness(image, multiplier, r, g, b)
+        assert result.convert('RGB').tobytes() == expected.tobytes(), f"{name} doesn't match the per-pixel loop"
+        assert result.getchannel('A').tobytes() == image.getchannel('A').tobytes(), f"{name} didn't keep the alpha"
+
+        before = best_of(1, lambda: per_pixel_brightness(image, multiplier, r, g, b))
+        after = best_of(args.runs, lambda: image_filters.change_brightness(image, multiplier, r, g, b))
+        print(f"{name:<10} per-pixel {before * 1000:8.1f}ms | lookup table {after * 1000:6.2f}ms | {before / after:6.0f}x")
+
+
+if __name__ == '__main__':
+    main()
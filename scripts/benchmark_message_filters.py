@@ -0,0 +1,41 @@
+""" Compares the scam phrase automaton and the banned link index against the former linear scans.
+
+Usage: python -m scripts.benchmark_message_filters [--runs 200] """
+
+# import.standard
+import argparse
+import random
+import string
+import timeit
+
+# import.local
+from extra.moderation.message_filters import BannedLinkIndex, ScamMatcher
+
+
+def main() -> None:
+    """ Runs the benchmark. """
+
+    parser = argparse.ArgumentParser(description="Benchmarks the Moderation message filters.")
+    parser.add_argument('--runs', type=int, default=200, help="How many runs to average. [Default=200]")
+    args = parser.parse_args()
+
+    message = " ".join(
+        "".join(random.choices(string.ascii_lowercase, k=random.randint(2, 9))) for _ in range(60))
+
+    for size in (30, 300, 3000, 30000):
+        phrases = ["".join(random.choices(string.ascii_lowercase + " ", k=24)) for _ in range(size)]
+        links = [f"https://example{i}.com/{''.join(random.choices(string.ascii_letters, k=12))}.mp4" for i in range(size)]
+        matcher, index = ScamMatcher(phrases), BannedLinkIndex(links)
+
+        linear_scam = timeit.timeit(lambda: any(p in message.lower() for p in phrases), number=args.runs) / args.runs
+        matcher_scam = timeit.timeit(lambda: matcher.search(message), number=args.runs) / args.runs
+        linear_links = timeit.timeit(lambda: any(w in links for w in message.split()), number=args.runs) / args.runs
+        index_links = timeit.timeit(lambda: index.search(message), number=args.runs) / args.runs
+
+        print(
+            f"{size:>6} patterns | scam: linear {linear_scam * 1e6:9.1f}µs, automaton {matcher_scam * 1e6:7.1f}µs"
+            f" | links: list {linear_links * 1e6:9.1f}µs, set {index_links * 1e6:7.1f}µs")
+
+
+if __name__ == '__main__':
+    main()
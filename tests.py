@@ -287,7 +287,7 @@ UPDATE TribeMember as OG
 # z!create_table_queues
 # z!create_table_slothboard
 # z!create_table_user_timezones
-# z!create_table_voice_channel_activity
+# z!create_table_voice_presence
 # z!create_table_member_score
 # z!create_table_user_currency
 # z!create_table_user_items